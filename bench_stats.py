@@ -0,0 +1,88 @@
+"""
+Statistics helpers for the benchmark scripts.
+Latency samples are integer nanoseconds from time.perf_counter_ns().
+"""
+
+import math
+import statistics
+import time
+from typing import List, Dict, Any, Callable, Iterable
+
+# Two-sided 95% Student t critical values by degrees of freedom (df > 30 uses 1.96)
+_T_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131,
+    16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086, 21: 2.080, 22: 2.074,
+    23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks"""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    weight = rank - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def summarize_latencies(samples_ns: List[int]) -> Dict[str, Any]:
+    """p50/p90/p99, mean, stdev and a 95% confidence interval of the mean, in milliseconds"""
+    if not samples_ns:
+        return {"count": 0}
+    values = sorted(sample / 1e6 for sample in samples_ns)
+    n = len(values)
+    mean = statistics.fmean(values)
+    stdev = statistics.stdev(values) if n > 1 else 0.0
+    t_value = _T_95.get(n - 1, 1.96)
+    half_width = t_value * stdev / math.sqrt(n) if n > 1 else 0.0
+    return {
+        "count": n,
+        "mean_ms": mean,
+        "stdev_ms": stdev,
+        "min_ms": values[0],
+        "p50_ms": percentile(values, 50),
+        "p90_ms": percentile(values, 90),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1],
+        "ci95_low_ms": mean - half_width,
+        "ci95_high_ms": mean + half_width
+    }
+
+
+def intervals_overlap(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """True if two summaries' 95% CIs of the mean overlap (difference may be noise)"""
+    return a["ci95_low_ms"] <= b["ci95_high_ms"] and b["ci95_low_ms"] <= a["ci95_high_ms"]
+
+
+def time_calls(func: Callable[[Any], Any], inputs: Iterable[Any], warmup: int = 1,
+               repetitions: int = 5) -> List[int]:
+    """
+    Call func once per input, `warmup` untimed passes then `repetitions` timed passes.
+    Returns one nanosecond sample per timed call.
+    """
+    inputs = list(inputs)
+    for _ in range(warmup):
+        for item in inputs:
+            func(item)
+    samples = []
+    for _ in range(repetitions):
+        for item in inputs:
+            start = time.perf_counter_ns()
+            func(item)
+            samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """One-line console rendering of a latency summary"""
+    if not summary.get("count"):
+        return "no samples"
+    return (f"p50 {summary['p50_ms']:.2f}ms  p90 {summary['p90_ms']:.2f}ms  "
+            f"p99 {summary['p99_ms']:.2f}ms  mean {summary['mean_ms']:.2f}ms "
+            f"± {summary['stdev_ms']:.2f}  (95% CI {summary['ci95_low_ms']:.2f}-{summary['ci95_high_ms']:.2f}, "
+            f"n={summary['count']})")
@@ -0,0 +1,260 @@
+"""
+In-process BM25 inverted index, fused with dense search by reciprocal rank.
+
+Postings are kept per term as two parallel array('i') columns (document
+numbers and term frequencies), document lengths as one array, so a corpus costs
+a few bytes per token occurrence instead of a Python object each. Scoring reads
+the posting arrays zero-copy through NumPy. Deleted or replaced documents are
+tombstoned and dropped by compact() once they make up half of the index.
+
+Terms are lowercase alphanumeric runs; parentheses and apostrophes inside a
+word are removed first, so "401(k)" indexes (and matches) as "401k".
+"""
+
+import math
+import re
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+_JOINED = re.compile(r"(?<=\w)[()'’]+(?=\w)")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms of a text"""
+    return _TOKEN.findall(_JOINED.sub("", text.lower()))
+
+
+@dataclass
+class HybridConfig:
+    """
+    Keyword + dense retrieval. Each side contributes its top `candidates`, fused
+    with RRF constant `rrf_k`. With fast_path, a query whose top keyword hit covers
+    at least `min_coverage` of its (IDF-weighted) terms and beats the runner-up by
+    `min_margin` is answered from the keyword index alone, without embedding it
+    """
+    rrf_k: int = 60
+    candidates: int = 20
+    k1: float = 1.2
+    b: float = 0.75
+    fast_path: bool = True
+    min_coverage: float = 0.99
+    min_margin: float = 0.3
+
+
+class _Postings:
+    """Document numbers and term frequencies for one term, as parallel int32 arrays"""
+    __slots__ = ("docs", "tfs")
+
+    def __init__(self):
+        self.docs = array("i")
+        self.tfs = array("i")
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Any]], k: int = 60) -> List[Tuple[Any, float]]:
+    """RRF: each key scores sum(1 / (k + rank)) over the rankings it appears in, best first"""
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """BM25 (Okapi) over chunks keyed by point ID, with per-document access levels for role filtering"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, _Postings] = {}
+        # Live document frequency per term (tombstoned documents excluded)
+        self._df: Dict[str, int] = {}
+        self._doc_len = array("i")
+        self._live = bytearray()
+        self._user_visible = bytearray()
+        self._doc_ids: List[Optional[str]] = []
+        self._payloads: List[Any] = []
+        self._doc_of: Dict[str, int] = {}
+        self._doc_terms: List[Optional[Tuple[str, ...]]] = []
+        self._live_count = 0
+        self._live_length = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def add(self, doc_id: str, payload: Any):
+        """Index a chunk (its "content"); an existing doc_id is replaced"""
+        terms = tokenize(payload["content"])
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        with self._lock:
+            self._remove(doc_id)
+            doc = len(self._doc_len)
+            self._doc_len.append(len(terms))
+            self._live.append(1)
+            self._user_visible.append(payload["access_level"] == "user")
+            self._doc_ids.append(doc_id)
+            self._payloads.append(payload)
+            self._doc_terms.append(tuple(counts))
+            self._doc_of[doc_id] = doc
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                postings.docs.append(doc)
+                postings.tfs.append(tf)
+                self._df[term] = self._df.get(term, 0) + 1
+            self._live_count += 1
+            self._live_length += len(terms)
+
+    def add_many(self, items: Iterable[Tuple[str, Any]]):
+        """Index (doc_id, payload) pairs"""
+        for doc_id, payload in items:
+            self.add(doc_id, payload)
+
+    def remove(self, doc_ids: Iterable[str]):
+        """Drop documents by ID (unknown IDs are ignored)"""
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+            if len(self._doc_len) > 1024 and self._live_count < len(self._doc_len) // 2:
+                self.compact()
+
+    def _remove(self, doc_id: str):
+        doc = self._doc_of.pop(doc_id, None)
+        if doc is None:
+            return
+        self._live[doc] = 0
+        for term in self._doc_terms[doc]:
+            self._df[term] -= 1
+        self._live_count -= 1
+        self._live_length -= self._doc_len[doc]
+        self._doc_ids[doc] = None
+        self._payloads[doc] = None
+        self._doc_terms[doc] = None
+
+    def clear(self):
+        """Remove every document"""
+        with self._lock:
+            self.__init__(self.k1, self.b)
+
+    def compact(self):
+        """Rebuild the arrays without tombstoned documents"""
+        with self._lock:
+            live = [(doc_id, payload) for doc_id, payload in zip(self._doc_ids, self._payloads) if doc_id is not None]
+            self.__init__(self.k1, self.b)
+            self.add_many(live)
+
+    def _idf(self, df: int) -> float:
+        return math.log(1.0 + (self._live_count - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 3, user_role: str = "user") -> List[Tuple[str, Any, float]]:
+        """
+        Best documents for a role as (doc_id, payload, score), highest BM25 score
+        first; only documents containing at least one query term are returned
+        """
+        terms = set(tokenize(query))
+        limit = max(1, limit)
+        with self._lock:
+            if not terms or self._live_count == 0:
+                return []
+            scores = np.zeros(len(self._doc_len), dtype=np.float32)
+            doc_len = np.frombuffer(self._doc_len, dtype=np.int32)
+            avg_len = self._live_length / self._live_count or 1.0
+            k1, b = self.k1, self.b
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None or not self._df.get(term):
+                    continue
+                docs = np.frombuffer(postings.docs, dtype=np.int32)
+                tfs = np.frombuffer(postings.tfs, dtype=np.int32).astype(np.float32)
+                norm = k1 * (1.0 - b + b * doc_len[docs] / avg_len)
+                # A term occurs once per document in its postings, so plain fancy-index += is safe
+                scores[docs] += self._idf(self._df[term]) * tfs * (k1 + 1.0) / (tfs + norm)
+            visible = np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+            if user_role.lower() != "admin":
+                visible &= np.frombuffer(self._user_visible, dtype=np.uint8).astype(bool)
+            scores[~visible] = 0.0
+            matched = np.flatnonzero(scores > 0)
+            if matched.size == 0:
+                return []
+            if matched.size > limit:
+                matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self._doc_ids[doc], self._payloads[doc], float(scores[doc])) for doc in matched]
+
+    def confidence(self, query: str, hits: List[Tuple[str, Any, float]]) -> Dict[str, float]:
+        """
+        How decisive a keyword result is: `coverage` is the IDF-weighted share of the
+        query's terms found in the top hit (a term missing from the whole index counts
+        against it), `margin` is 1 - second score / top score
+        """
+        if not hits:
+            return {"coverage": 0.0, "margin": 0.0}
+        terms = set(tokenize(query))
+        top_terms = set(tokenize(hits[0][1]["content"]))
+        with self._lock:
+            # Terms missing from the index weigh as much as the rarest possible term
+            weights = {term: self._idf(self._df.get(term, 0)) for term in terms}
+        total = sum(weights.values())
+        coverage = sum(weight for term, weight in weights.items() if term in top_terms) / total if total else 0.0
+        margin = 1.0 - hits[1][2] / hits[0][2] if len(hits) > 1 and hits[0][2] > 0 else 1.0
+        return {"coverage": coverage, "margin": margin}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Documents, vocabulary and approximate array memory"""
+        with self._lock:
+            postings = sum(len(p.docs) for p in self._postings.values())
+            return {
+                "documents": self._live_count,
+                "tombstoned": len(self._doc_len) - self._live_count,
+                "terms": sum(1 for df in self._df.values() if df > 0),
+                "postings": postings,
+                "postings_bytes": postings * 8 + len(self._doc_len) * 6,
+                "avg_doc_terms": self._live_length / self._live_count if self._live_count else 0.0
+            }
+
+
+class FastPathStats:
+    """
+    Keyword fast-path counters. Saved latency per fast-path query is the running
+    mean of the full (embedding + dense search) path minus that query's keyword time
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fast_path_queries = 0
+        self.hybrid_queries = 0
+        self._full_path_seconds = 0.0
+        self._fast_path_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def record_full_path(self, seconds: float):
+        with self._lock:
+            self.hybrid_queries += 1
+            self._full_path_seconds += seconds
+
+    def record_fast_path(self, seconds: float):
+        with self._lock:
+            self.fast_path_queries += 1
+            self._fast_path_seconds += seconds
+            if self.hybrid_queries:
+                self.saved_seconds += max(0.0, self._full_path_seconds / self.hybrid_queries - seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.fast_path_queries + self.hybrid_queries
+            return {
+                "fast_path_queries": self.fast_path_queries,
+                "hybrid_queries": self.hybrid_queries,
+                "fast_path_rate": self.fast_path_queries / total if total else 0.0,
+                "mean_full_path_ms": self._full_path_seconds / self.hybrid_queries * 1000 if self.hybrid_queries else 0.0,
+                "mean_fast_path_ms": self._fast_path_seconds / self.fast_path_queries * 1000 if self.fast_path_queries else 0.0,
+                "saved_ms": self.saved_seconds * 1000
+            }
@@ -0,0 +1,386 @@
+"""
+Shared document parser and chunker for every RAG system.
+
+Documents are split into access-controlled sections by `=== ACCESS: <level> ===`
+markers (text before the first marker is dropped; a file without markers is all
+"user" content). Each section is split into paragraphs on blank lines, and
+paragraphs are packed into chunks of at most `max_size` characters or tokens.
+Everything is yielded lazily and in one pass: paragraphs are found with
+str.find, each paragraph is measured once, and chunk text is joined once.
+
+Chunker.parse_file does the same straight from a memory-mapped file: markers
+are found in the mapping, each section is decoded block by block, and pages
+already consumed are released, so memory stays bounded by the chunks produced
+rather than several copies of the file. Decoding matches open(..., 'r'), so
+the chunks are identical to parse(file.read()).
+
+parse_files spreads whole files over a process pool and hands back compact,
+column-oriented ParsedFile records in input order.
+"""
+
+import codecs
+import io
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable, Generator, Iterable, Iterator, Tuple
+
+from records import Chunk
+
+ACCESS_MARKER = re.compile(r'=== ACCESS: (user|admin) ===')
+ACCESS_MARKER_BYTES = re.compile(rb'=== ACCESS: (user|admin) ===')
+UNITS = ("chars", "tokens")
+
+_WORD_PIECE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def get_document_type(filename: str) -> str:
+    """Determine document type from filename"""
+    filename_lower = filename.lower()
+    if "benefits" in filename_lower:
+        return "benefits"
+    elif "handbook" in filename_lower:
+        return "handbook"
+    elif "leave" in filename_lower:
+        return "leave_policy"
+    elif "performance" in filename_lower:
+        return "performance"
+    elif "compensation" in filename_lower:
+        return "compensation"
+    elif "termination" in filename_lower:
+        return "termination"
+    else:
+        return "policy"
+
+
+def approximate_token_count(text: str) -> int:
+    """Words and punctuation marks; close to (slightly under) a WordPiece count"""
+    return len(_WORD_PIECE.findall(text))
+
+
+def make_token_counter(model_name: Optional[str] = None) -> Callable[[str], int]:
+    """
+    Token counter for `model_name` using its Hugging Face tokenizer when the optional
+    `transformers` package is installed, else approximate_token_count
+    """
+    if model_name:
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            print(f"Warning: no tokenizer for {model_name} ({e}); approximating token counts")
+    return approximate_token_count
+
+
+def iter_paragraphs(text: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """Stripped, non-empty paragraphs of text[start:end], split on blank lines"""
+    end = len(text) if end is None else end
+    pos = start
+    while pos <= end:
+        boundary = text.find("\n\n", pos, end)
+        if boundary == -1:
+            boundary = end
+        paragraph = text[pos:boundary].strip()
+        if paragraph:
+            yield paragraph
+        pos = boundary + 2
+
+
+def iter_sections(content: str) -> Iterator[Tuple[str, int, int]]:
+    """(access_level, start, end) spans of each access-controlled section"""
+    markers = list(ACCESS_MARKER.finditer(content))
+    if not markers:
+        # No access markers found, default to user access
+        yield "user", 0, len(content)
+        return
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(content)
+        yield marker.group(1).strip(), marker.end(), end
+
+
+def _release_pages(mapped: mmap.mmap, start: int, end: int):
+    """Drop already-read pages of a read-only mapping from the resident set (Linux; no-op elsewhere)"""
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    start -= start % mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    end = min(end, len(mapped))
+    if end > start:
+        mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def find_mapped_markers(mapped: mmap.mmap, block_size: int = 1 << 24) -> List[Tuple[str, int, int]]:
+    """(access_level, start, end) of every access marker, scanned one block at a time"""
+    markers = []
+    # Blocks overlap by more than a marker's length; a match belongs to the block it starts in
+    overlap = 32
+    for offset in range(0, len(mapped), block_size):
+        block_end = offset + block_size
+        for marker in ACCESS_MARKER_BYTES.finditer(mapped, offset, min(block_end + overlap, len(mapped))):
+            if marker.start() >= block_end:
+                break
+            markers.append((marker.group(1).decode("ascii"), marker.start(), marker.end()))
+        _release_pages(mapped, offset, block_end)
+    return markers
+
+
+def iter_mapped_sections(mapped: mmap.mmap, block_size: int = 1 << 24) -> Iterator[Tuple[str, int, int]]:
+    """(access_level, start, end) byte spans of each section of a memory-mapped UTF-8 file"""
+    markers = find_mapped_markers(mapped, block_size)
+    if not markers:
+        # No access markers found, default to user access
+        yield "user", 0, len(mapped)
+        return
+    for i, (access_level, _, section_start) in enumerate(markers):
+        section_end = markers[i + 1][1] if i + 1 < len(markers) else len(mapped)
+        yield access_level, section_start, section_end
+
+
+def iter_mapped_paragraphs(mapped: mmap.mmap, start: int, end: int, block_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Paragraphs of mapped[start:end], decoded one block at a time. Newlines are
+    translated like text-mode open() (CRLF and lone CR become LF), and a block is
+    only split at its last blank line, so the paragraphs match iter_paragraphs
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+    pending = ""
+    for offset in range(start, end, block_size):
+        block_end = min(offset + block_size, end)
+        text = pending + decoder.decode(mapped[offset:block_end])
+        _release_pages(mapped, offset, block_end)
+        boundary = text.rfind("\n\n")
+        if boundary == -1:
+            pending = text
+            continue
+        yield from iter_paragraphs(text, 0, boundary)
+        pending = text[boundary + 2:]
+    yield from iter_paragraphs(pending + decoder.decode(b"", final=True))
+
+
+class Chunker:
+    def __init__(self, max_size: int = 300, unit: str = "chars", overlap: int = 0,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            max_size: chunk size limit, in `unit`s
+            unit: "chars" or "tokens" (the embedding model's limit is in tokens)
+            overlap: trailing paragraphs of each chunk, up to this many units, are
+                repeated at the start of the next chunk
+            token_counter: text -> token count (default: approximate_token_count)
+        """
+        if unit not in UNITS:
+            raise ValueError(f"unit must be one of {UNITS}, got {unit!r}")
+        if not 0 <= overlap < max_size:
+            raise ValueError("overlap must be >= 0 and smaller than max_size")
+        self.max_size = max_size
+        self.unit = unit
+        self.overlap = overlap
+        self.token_counter = token_counter or approximate_token_count
+        # Chunks are joined with a blank line, which counts towards a character limit
+        self._separator_size = 2 if unit == "chars" else 0
+
+    @property
+    def signature(self) -> str:
+        """Identifies the chunking settings (stored in the ingest manifest)"""
+        return f"chunker=v1,unit={self.unit},max_size={self.max_size},overlap={self.overlap}"
+
+    def measure(self, text: str) -> int:
+        """Size of text in this chunker's unit"""
+        return len(text) if self.unit == "chars" else self.token_counter(text)
+
+    def parse(self, content: str, filename: str) -> Iterator[Chunk]:
+        """Yield chunk dicts for a whole document, section by section"""
+        metadata = {"filename": filename, "document_type": get_document_type(filename)}
+        # chunk_id counts per access level, so two sections of one level never share an ID
+        next_ids: Dict[str, int] = {}
+        for access_level, start, end in iter_sections(content):
+            next_ids[access_level] = yield from self.chunk_paragraphs(
+                iter_paragraphs(content, start, end), access_level, metadata, next_ids.get(access_level, 0)
+            )
+
+    def parse_file(self, path: str, filename: Optional[str] = None,
+                   block_size: int = 1 << 20) -> Iterator[Chunk]:
+        """Yield the chunks of a UTF-8 file, streamed from a memory mapping (same output as parse)"""
+        filename = filename or os.path.basename(path)
+        metadata = {"filename": filename, "document_type": get_document_type(filename)}
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                next_ids: Dict[str, int] = {}
+                for access_level, start, end in iter_mapped_sections(mapped):
+                    paragraphs = iter_mapped_paragraphs(mapped, start, end, block_size)
+                    next_ids[access_level] = yield from self.chunk_paragraphs(
+                        paragraphs, access_level, metadata, next_ids.get(access_level, 0)
+                    )
+
+    def chunk_paragraphs(self, paragraphs: Iterable[str], access_level: str, metadata: Dict[str, Any],
+                         first_id: int = 0) -> Generator[Chunk, None, int]:
+        """Pack stripped, non-empty paragraphs into chunks; returns the next free chunk_id"""
+        max_size = self.max_size
+        separator_size = self._separator_size
+        parts: List[str] = []
+        costs: List[int] = []
+        size = 0
+        chunk_id = first_id
+
+        for piece, piece_size in self._pieces(paragraphs):
+            if parts and size + piece_size > max_size:
+                yield self._make_chunk(parts, access_level, metadata, chunk_id)
+                chunk_id += 1
+                parts, costs, size = self._overlap_tail(parts, costs)
+                # Overlap never pushes the next chunk over the limit
+                while parts and size + piece_size > max_size:
+                    size -= costs.pop(0)
+                    parts.pop(0)
+            cost = piece_size + separator_size
+            parts.append(piece)
+            costs.append(cost)
+            size += cost
+
+        if parts:
+            yield self._make_chunk(parts, access_level, metadata, chunk_id)
+            chunk_id += 1
+        return chunk_id
+
+    def _overlap_tail(self, parts: List[str], costs: List[int]) -> Tuple[List[str], List[int], int]:
+        """Trailing paragraphs that fit in the overlap budget"""
+        if not self.overlap:
+            return [], [], 0
+        keep = 0
+        total = 0
+        for cost in reversed(costs):
+            if total + cost > self.overlap:
+                break
+            total += cost
+            keep += 1
+        if not keep:
+            return [], [], 0
+        return parts[-keep:], costs[-keep:], total
+
+    def _pieces(self, paragraphs: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        """(paragraph, size) pairs; in token mode over-long paragraphs are split to fit"""
+        if self.unit == "chars":
+            return ((paragraph, len(paragraph)) for paragraph in paragraphs)
+        return self._token_pieces(paragraphs)
+
+    def _token_pieces(self, paragraphs: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        for paragraph in paragraphs:
+            paragraph_size = self.token_counter(paragraph)
+            if paragraph_size > self.max_size:
+                yield from self._split_long(paragraph)
+            else:
+                yield paragraph, paragraph_size
+
+    def _split_long(self, paragraph: str) -> Iterator[Tuple[str, int]]:
+        """Greedily regroup a paragraph's sentences (or words, for run-on sentences) under the limit"""
+        group: List[str] = []
+        group_size = 0
+        for sentence in _SENTENCE_END.split(paragraph):
+            sentence_size = self.measure(sentence)
+            pieces = [(sentence, sentence_size)]
+            if sentence_size > self.max_size:
+                pieces = self._word_windows(sentence)
+            for piece, piece_size in pieces:
+                if group and group_size + piece_size > self.max_size:
+                    yield " ".join(group), group_size
+                    group, group_size = [], 0
+                group.append(piece)
+                group_size += piece_size
+        if group:
+            yield " ".join(group), group_size
+
+    def _word_windows(self, sentence: str) -> List[Tuple[str, int]]:
+        """Split a sentence into runs of words under the limit"""
+        windows = []
+        words: List[str] = []
+        words_size = 0
+        for word in sentence.split():
+            word_size = self.measure(word)
+            if words and words_size + word_size > self.max_size:
+                windows.append((" ".join(words), words_size))
+                words, words_size = [], 0
+            words.append(word)
+            words_size += word_size
+        if words:
+            windows.append((" ".join(words), words_size))
+        return windows
+
+    def _make_chunk(self, parts: List[str], access_level: str, metadata: Dict[str, Any],
+                    chunk_id: int) -> Chunk:
+        return Chunk("\n\n".join(parts), metadata["filename"], access_level, chunk_id, metadata["document_type"])
+
+
+@dataclass
+class ParsedFile:
+    """One file's chunks as columns (cheap to pickle back from a worker process)"""
+    path: str
+    filename: str
+    document_type: str
+    access_levels: List[str] = field(default_factory=list)
+    chunk_ids: List[int] = field(default_factory=list)
+    contents: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def to_chunks(self) -> List[Chunk]:
+        """The chunk records the RAG systems ingest"""
+        return [
+            Chunk(content, self.filename, access_level, chunk_id, self.document_type)
+            for content, access_level, chunk_id in zip(self.contents, self.access_levels, self.chunk_ids)
+        ]
+
+
+def parse_file_compact(chunker: Chunker, path: str) -> ParsedFile:
+    """Chunk one file into a ParsedFile; failures are recorded in `error` instead of raised"""
+    filename = os.path.basename(path)
+    parsed = ParsedFile(str(path), filename, get_document_type(filename))
+    try:
+        for chunk in chunker.parse_file(str(path), filename):
+            parsed.access_levels.append(chunk["access_level"])
+            parsed.chunk_ids.append(chunk["chunk_id"])
+            parsed.contents.append(chunk["content"])
+    except Exception as e:
+        parsed.access_levels, parsed.chunk_ids, parsed.contents = [], [], []
+        parsed.error = f"{type(e).__name__}: {e}"
+    return parsed
+
+
+def _parse_task(chunker: Chunker, paths: List[str]) -> List[ParsedFile]:
+    return [parse_file_compact(chunker, path) for path in paths]
+
+
+def parse_files(chunker: Chunker, paths: Iterable[Any], workers: int = 1,
+                files_per_task: int = 4, tasks_in_flight: int = 2) -> Iterator[ParsedFile]:
+    """
+    ParsedFile per path, in input order. With workers > 1 the files are parsed by a
+    process pool (the chunker, including its token_counter, must be picklable); at
+    most workers * tasks_in_flight tasks of files_per_task files are outstanding,
+    so a slow consumer (embedding) bounds memory instead of queueing every result.
+    """
+    paths = [str(path) for path in paths]
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield parse_file_compact(chunker, path)
+        return
+
+    tasks = iter([paths[i:i + files_per_task] for i in range(0, len(paths), files_per_task)])
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_parse_task, chunker, task))
+            if len(pending) >= workers * tasks_in_flight:
+                break
+        while pending:
+            results = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(_parse_task, chunker, task))
+            yield from results
@@ -0,0 +1,202 @@
+"""
+Collection-level settings for the Qdrant backend.
+
+QuantizationConfig chooses how vectors are compressed for search:
+- "none": float32 vectors only (4 bytes per dimension)
+- "scalar": int8 copies (1 byte per dimension, ~4x smaller)
+- "binary": 1 bit per dimension (~32x smaller; works best with high-dimensional
+  embeddings, and needs oversampling + rescoring to keep recall)
+
+With rescore=True Qdrant fetches `oversampling` x limit candidates by the
+quantized score and re-ranks them against the original float32 vectors, which
+can stay on disk (originals_on_disk) while the quantized copies sit in RAM.
+
+IndexConfig holds the HNSW and optimizer settings and the keyword payload
+indexes. With an index on access_level, a filtered search looks matching
+points up in the index instead of loading each candidate's payload during
+graph traversal, and HNSW adds extra links per indexed value so filtered
+traversal stays connected.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+from qdrant_client.models import (
+    Distance, VectorParams, VectorParamsDiff, SearchParams, QuantizationSearchParams, HnswConfigDiff, OptimizersConfigDiff,
+    PayloadSchemaType, ScalarQuantization, ScalarQuantizationConfig, ScalarType, BinaryQuantization, BinaryQuantizationConfig,
+    Disabled
+)
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+PAYLOAD_INDEX_FIELDS = ("access_level", "document_type", "filename")
+
+
+@dataclass
+class QuantizationConfig:
+    """Vector quantization for a Qdrant collection and the matching search-time parameters"""
+    mode: str = "none"
+    quantile: float = 0.99
+    always_ram: bool = True
+    originals_on_disk: bool = False
+    rescore: bool = True
+    oversampling: float = 2.0
+
+    def __post_init__(self):
+        if self.mode not in QUANTIZATION_MODES:
+            raise ValueError(f"mode must be one of {QUANTIZATION_MODES}, got {self.mode!r}")
+        if self.oversampling < 1.0:
+            raise ValueError(f"oversampling must be >= 1.0, got {self.oversampling}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "none"
+
+    def vector_params(self, dimension: int, distance: Distance = Distance.COSINE) -> VectorParams:
+        """Vector parameters for create_collection (originals memory-mapped from disk if requested)"""
+        return VectorParams(size=dimension, distance=distance, on_disk=self.originals_on_disk or None)
+
+    def quantization_config(self) -> Optional[Any]:
+        """quantization_config for create_collection (None when disabled)"""
+        if self.mode == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=self.quantile,
+                                                always_ram=self.always_ram)
+            )
+        if self.mode == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=self.always_ram))
+        return None
+
+    def collection_kwargs(self, dimension: int) -> Dict[str, Any]:
+        """vectors_config and quantization_config keyword arguments for create_collection"""
+        kwargs = {"vectors_config": self.vector_params(dimension)}
+        if self.enabled:
+            kwargs["quantization_config"] = self.quantization_config()
+        return kwargs
+
+    def update_kwargs(self, current: Any) -> Dict[str, Any]:
+        """update_collection arguments that bring an existing collection's config (`current`) to these settings"""
+        kwargs = {}
+        if current.quantization_config != self.quantization_config():
+            kwargs["quantization_config"] = self.quantization_config() if self.enabled else Disabled.DISABLED
+        if bool(current.params.vectors.on_disk) != self.originals_on_disk:
+            # "" is the collection's unnamed vector
+            kwargs["vectors_config"] = {"": VectorParamsDiff(on_disk=self.originals_on_disk)}
+        return kwargs
+
+    def search_params(self) -> Optional[SearchParams]:
+        """Search parameters with oversampling/rescoring (None when disabled)"""
+        if not self.enabled:
+            return None
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                ignore=False,
+                rescore=self.rescore,
+                oversampling=self.oversampling if self.rescore else None
+            )
+        )
+
+    def ram_bytes_per_vector(self, dimension: int) -> float:
+        """
+        Estimated vector storage pinned in RAM per point. Vectors on disk are only
+        paged in on demand (rescoring reads a few per query); the HNSW graph and
+        payloads are not included
+        """
+        originals = 0 if self.originals_on_disk else 4 * dimension
+        if self.mode == "scalar":
+            # int8 values plus a float32 offset per vector
+            quantized = dimension + 4
+        elif self.mode == "binary":
+            quantized = (dimension + 7) // 8
+        else:
+            return float(originals)
+        return float(originals + (quantized if self.always_ram else 0))
+
+    def describe(self) -> str:
+        """Short label such as 'scalar, rescore x2, originals on disk'"""
+        if not self.enabled:
+            return "none (float32)" + (", on disk" if self.originals_on_disk else "")
+        parts = [self.mode]
+        parts.append(f"rescore x{self.oversampling:g}" if self.rescore else "no rescore")
+        if self.originals_on_disk:
+            parts.append("originals on disk")
+        return ", ".join(parts)
+
+
+@dataclass
+class IndexConfig:
+    """HNSW, optimizer and payload-index settings; values left as None use Qdrant's defaults"""
+    payload_indexes: Tuple[str, ...] = PAYLOAD_INDEX_FIELDS
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    full_scan_threshold: Optional[int] = None
+    search_ef: Optional[int] = None
+    indexing_threshold: Optional[int] = None
+    default_segment_number: Optional[int] = None
+
+    def hnsw_config(self) -> Optional[HnswConfigDiff]:
+        """hnsw_config for create_collection (None when every value is left at the default)"""
+        if self.hnsw_m is None and self.hnsw_ef_construct is None and self.full_scan_threshold is None:
+            return None
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct,
+                              full_scan_threshold=self.full_scan_threshold)
+
+    def optimizers_config(self) -> Optional[OptimizersConfigDiff]:
+        """optimizers_config for create_collection (None when every value is left at the default)"""
+        if self.indexing_threshold is None and self.default_segment_number is None:
+            return None
+        return OptimizersConfigDiff(indexing_threshold=self.indexing_threshold,
+                                    default_segment_number=self.default_segment_number)
+
+    def collection_kwargs(self) -> Dict[str, Any]:
+        """hnsw_config and optimizers_config keyword arguments for create_collection"""
+        kwargs = {}
+        if self.hnsw_config() is not None:
+            kwargs["hnsw_config"] = self.hnsw_config()
+        if self.optimizers_config() is not None:
+            kwargs["optimizers_config"] = self.optimizers_config()
+        return kwargs
+
+    def update_kwargs(self, current: Any) -> Dict[str, Any]:
+        """
+        update_collection arguments for the HNSW/optimizer values that an existing
+        collection's config (`current`) doesn't have yet; values left as None are not reverted
+        """
+        kwargs = {}
+        for key, wanted, existing in (("hnsw_config", self.hnsw_config(), current.hnsw_config),
+                                      ("optimizers_config", self.optimizers_config(), current.optimizer_config)):
+            if wanted is not None and any(value is not None and getattr(existing, name, None) != value
+                                          for name, value in wanted.model_dump().items()):
+                kwargs[key] = wanted
+        return kwargs
+
+    def create_payload_indexes(self, client: Any, collection_name: str):
+        """Keyword index on each configured payload field (re-creating an existing one is a no-op)"""
+        for field_name in self.payload_indexes:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD,
+                wait=True
+            )
+
+    def describe(self) -> str:
+        """Short label such as 'm=16, ef_construct=128, indexes: access_level, filename'"""
+        parts = [f"{name}={value}" for name, value in (
+            ("m", self.hnsw_m), ("ef_construct", self.hnsw_ef_construct),
+            ("full_scan_threshold", self.full_scan_threshold), ("ef", self.search_ef),
+            ("indexing_threshold", self.indexing_threshold), ("segments", self.default_segment_number)
+        ) if value is not None]
+        parts.append(f"indexes: {', '.join(self.payload_indexes)}" if self.payload_indexes else "no payload indexes")
+        return ", ".join(parts)
+
+
+def search_params(index: Optional[IndexConfig] = None,
+                  quantization: Optional[QuantizationConfig] = None) -> Optional[SearchParams]:
+    """Search-time parameters for a collection: HNSW ef plus quantization rescoring (None = server defaults)"""
+    hnsw_ef = index.search_ef if index is not None else None
+    params = quantization.search_params() if quantization is not None else None
+    if hnsw_ef is None:
+        return params
+    if params is None:
+        return SearchParams(hnsw_ef=hnsw_ef)
+    return params.model_copy(update={"hnsw_ef": hnsw_ef})
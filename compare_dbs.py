@@ -1,148 +1,308 @@
 """
-Vector Database Comparison: Qdrant vs Weaviate
-This script compares search performance and results quality between the two systems.
+Vector Database Comparison: Qdrant vs Weaviate (vs in-process NumPy)
+This script compares search performance and results quality between the systems.
 """
 
+import argparse
+import asyncio
+import json
 import time
 import statistics
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 
-# Import both RAG systems
+import numpy as np
+
+# Import the RAG systems
 import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
+from bm25_index import FastPathStats, HybridConfig, tokenize
+from bench_stats import summarize_latencies, time_calls, intervals_overlap, format_summary
+from load_generator import run_load_test
+from recall_benchmark import (
+    normalize_rows, sample_corpus_queries, load_qdrant_corpus, load_weaviate_corpus,
+    qdrant_hnsw_sweep, measure_qdrant_search, measure_weaviate_recall, pareto_frontier,
+    role_mask, exact_top_k, expand_corpus, default_quantization_settings, qdrant_quantization_sweep,
+    qdrant_filter_comparison
+)
 from rag_qdrant import QdrantRAGSystem
 from rag_simple import SimpleRAGSystem
+from rag_numpy import NumpyRAGSystem
+from rag_async import AsyncQdrantRAGSystem, AsyncSimpleRAGSystem
+from semantic_cache import SemanticCache
+from records import json_default
+from embedders import EMBEDDER_KINDS, FakeEmbedder, HTTPEmbedder, LocalEmbedder, make_embedder
+from embedding_server import start_server
+from chunker import Chunker
+from ingest_benchmark import (
+    synthetic_document, write_synthetic_file, write_synthetic_corpus, legacy_parse, time_parser,
+    measure_parse_memory_isolated, PARSE_MEMORY_VARIANTS, default_worker_counts, time_parse_files,
+    measure_record_memory, RECORD_MEMORY_VARIANTS
+)
+from metrics import REGISTRY
+from partitioning import LAYOUTS
+from transport import PROTOCOLS, TransportConfig, qdrant_client_from_config, weaviate_client_from_config
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Modes that read or rebuild the single shared collection directly (not through a system's router)
+SHARED_LAYOUT_MODES = ("recall", "transport", "quantization", "filtered-search")
+
+# Test queries - mix of user and admin content
+TEST_QUERIES = [
+    "What are the health insurance benefits?",
+    "How much vacation time do I get?",
+    "What is the salary range for senior engineers?",  # Admin content
+    "How do I request time off?",
+    "What happens during performance reviews?",
+    "Tell me about company policies",
+    "What are the termination procedures?",  # Admin content
+    "How do I enroll in benefits?"
+]
 
-def benchmark_search(rag_system, system_name: str, queries: List[str], user_role: str = "user") -> Dict[str, Any]:
-    """Benchmark search performance for a RAG system"""
-    print(f"\n🔍 Testing {system_name} as {user_role}...")
+# Rewordings of TEST_QUERIES, plus unrelated questions that should never hit the semantic cache
+PARAPHRASE_QUERIES = [
+    "what health insurance do we get",
+    "How many vacation days do I have?",
+    "salary band for a senior engineer",
+    "How can I ask for time off?",
+    "How do performance reviews work?",
+    "What are the company's policies?",
+    "What is the process for terminating an employee?",
+    "How do I sign up for benefits?",
+    "Is there a dress code?",
+    "Where is the office located?"
+]
+
+# Exact-term queries (acronyms, plan names) and the index term a correct top hit must contain
+EXACT_TERM_QUERIES = [
+    ("401(k)", "401k"),
+    ("401k matching", "401k"),
+    ("COBRA", "cobra"),
+    ("COBRA continuation coverage", "cobra"),
+    ("FMLA", "fmla"),
+    ("ESPP", "espp"),
+    ("HIPAA", "hipaa"),
+    ("LASIK", "lasik"),
+    ("PIP", "pip"),
+    ("EAP counseling", "eap")
+]
+
+def benchmark_search(rag_system, system_name: str, queries: List[str], user_role: str = "user",
+                     warmup: int = 2, repetitions: int = 10) -> Dict[str, Any]:
+    """
+    Benchmark search latency for a RAG system
+    
+    Runs `warmup` untimed passes over the query set (cold caches, connection setup),
+    then `repetitions` timed passes with perf_counter_ns.
+    """
+    print(f"\n🔍 Testing {system_name} as {user_role} ({warmup} warm-up + {repetitions} timed passes)...")
     
     results = {
         "system": system_name,
         "role": user_role,
-        "query_times": [],
+        "warmup": warmup,
+        "repetitions": repetitions,
         "total_results": 0,
         "avg_scores": [],
         "all_results": []
     }
     
-    for i, query in enumerate(queries, 1):
-        print(f"  Query {i}/{len(queries)}: {query[:50]}...")
-        
-        start_time = time.time()
-        search_results = rag_system.search(query, user_role=user_role, limit=3)
-        end_time = time.time()
-        
-        query_time = end_time - start_time
-        results["query_times"].append(query_time)
-        results["total_results"] += len(search_results)
-        
-        if search_results:
-            avg_score = sum(r.get('score', 0) for r in search_results) / len(search_results)
-            results["avg_scores"].append(avg_score)
-            results["all_results"].append({
-                "query": query,
-                "results": search_results,
-                "time": query_time
-            })
-        
-        print(f"    - Time: {query_time:.3f}s, Results: {len(search_results)}")
+    for _ in range(warmup):
+        for query in queries:
+            rag_system.search(query, user_role=user_role, limit=3)
+    
+    samples: Dict[str, List[int]] = {query: [] for query in queries}
+    for repetition in range(repetitions):
+        for query in queries:
+            start_ns = time.perf_counter_ns()
+            search_results = rag_system.search(query, user_role=user_role, limit=3)
+            samples[query].append(time.perf_counter_ns() - start_ns)
+            
+            # Result counts and scores are taken from the first timed pass
+            if repetition == 0:
+                results["total_results"] += len(search_results)
+                if search_results:
+                    avg_score = sum(r.get('score', 0) for r in search_results) / len(search_results)
+                    results["avg_scores"].append(avg_score)
+                    results["all_results"].append({
+                        "query": query,
+                        "results": search_results
+                    })
     
     # Calculate statistics
-    results["avg_query_time"] = statistics.mean(results["query_times"])
-    results["min_query_time"] = min(results["query_times"])
-    results["max_query_time"] = max(results["query_times"])
+    all_samples = [sample for query_samples in samples.values() for sample in query_samples]
+    results["latency"] = summarize_latencies(all_samples)
+    results["per_query"] = {query: summarize_latencies(query_samples) for query, query_samples in samples.items()}
     results["avg_result_score"] = statistics.mean(results["avg_scores"]) if results["avg_scores"] else 0
     
+    for i, query in enumerate(queries, 1):
+        per_query = results["per_query"][query]
+        print(f"  Query {i}/{len(queries)}: {query[:50]}... p50 {per_query['p50_ms']:.2f}ms, p99 {per_query['p99_ms']:.2f}ms")
+    
     return results
 
-def compare_systems():
-    """Compare Qdrant and Weaviate systems"""
-    print("🚀 Vector Database Comparison: Qdrant vs Weaviate")
-    print("=" * 60)
+def benchmark_role_filter(rag_system, system_name: str, queries: List[str], user_role: str = "user",
+                          warmup: int = 2, repetitions: int = 10) -> Dict[str, Any]:
+    """Compare server-side role filtering against the legacy over-fetch-and-discard path"""
+    print(f"\n🔎 Testing {system_name} role filtering as {user_role}...")
     
-    # Test queries - mix of user and admin content
-    test_queries = [
-        "What are the health insurance benefits?",
-        "How much vacation time do I get?",
-        "What is the salary range for senior engineers?",  # Admin content
-        "How do I request time off?",
-        "What happens during performance reviews?",
-        "Tell me about company policies",
-        "What are the termination procedures?",  # Admin content
-        "How do I enroll in benefits?"
-    ]
+    results = {"system": system_name, "role": user_role}
+    original_mode = rag_system.server_side_filter
+    
+    try:
+        for mode_name, server_side in (("server_side", True), ("over_fetch", False)):
+            rag_system.server_side_filter = server_side
+            
+            short_queries = sum(
+                1 for query in queries if len(rag_system.search(query, user_role=user_role, limit=3)) < 3
+            )
+            samples = time_calls(
+                lambda query: rag_system.search(query, user_role=user_role, limit=3),
+                queries, warmup=warmup, repetitions=repetitions
+            )
+            
+            results[mode_name] = {
+                "latency": summarize_latencies(samples),
+                "short_queries": short_queries  # queries that returned fewer than `limit` results
+            }
+    finally:
+        rag_system.server_side_filter = original_mode
     
-    systems_to_test = []
+    return results
+
+def init_systems(embedder_kind: str = "http", layout: str = "shared") -> List[Any]:
+    """Connect to every backend that is available, as (name, system) pairs"""
+    # Result caches are off: the benchmarks repeat queries and must measure the backends
+    systems = []
     
     # Initialize Qdrant
     try:
         print("\n📊 Initializing Qdrant system...")
-        qdrant_rag = QdrantRAGSystem()
+        qdrant_rag = QdrantRAGSystem(query_cache_size=0, embedder=make_embedder(embedder_kind), layout=layout)
+        if qdrant_rag.get_stats().get('total_chunks', 0) == 0:
+            qdrant_rag.ingest_documents(DATA_FOLDER)
         qdrant_stats = qdrant_rag.get_stats()
         print(f"Qdrant ready - Total chunks: {qdrant_stats.get('total_chunks', 0)}")
-        systems_to_test.append(("Qdrant", qdrant_rag))
+        systems.append(("Qdrant", qdrant_rag))
     except Exception as e:
         print(f"❌ Failed to initialize Qdrant: {e}")
     
     # Initialize Weaviate
     try:
         print("\n📊 Initializing Weaviate system...")
-        weaviate_rag = SimpleRAGSystem()
+        weaviate_rag = SimpleRAGSystem(query_cache_size=0, layout=layout)
+        if weaviate_rag.get_stats().get('total_chunks', 0) == 0:
+            weaviate_rag.ingest_documents(DATA_FOLDER)
         weaviate_stats = weaviate_rag.get_stats()
         print(f"Weaviate ready - Total chunks: {weaviate_stats.get('total_chunks', 0)}")
-        systems_to_test.append(("Weaviate", weaviate_rag))
+        systems.append(("Weaviate", weaviate_rag))
     except Exception as e:
         print(f"❌ Failed to initialize Weaviate: {e}")
     
+    # Initialize the in-process NumPy backend (in-memory, so it ingests on start)
+    try:
+        print("\n📊 Initializing NumPy system...")
+        numpy_rag = NumpyRAGSystem(query_cache_size=0, embedder=make_embedder(embedder_kind))
+        numpy_rag.ingest_documents(DATA_FOLDER)
+        numpy_stats = numpy_rag.get_stats()
+        print(f"NumPy ready - Total chunks: {numpy_stats.get('total_chunks', 0)}")
+        systems.append(("NumPy", numpy_rag))
+    except Exception as e:
+        print(f"❌ Failed to initialize NumPy: {e}")
+    
+    return systems
+
+def close_systems(systems: List[Any]):
+    """Close every backend, ignoring errors"""
+    for _, rag_system in systems:
+        try:
+            rag_system.close()
+        except:
+            pass
+
+def write_json(path: str, payload: Dict[str, Any]):
+    """Write machine-readable benchmark output next to the console report"""
+    with open(path, "w", encoding="utf-8") as file:
+        # Search results are record Mappings, not dicts; they must still dump as JSON objects
+        json.dump(payload, file, indent=2, default=json_default)
+    print(f"\n💾 Results written to {path}")
+
+def compare_systems(warmup: int = 2, repetitions: int = 10, embedder_kind: str = "http", layout: str = "shared",
+                    json_out: str = "benchmark_results.json"):
+    """Compare Qdrant, Weaviate and the in-process NumPy backend"""
+    print("🚀 Vector Database Comparison: Qdrant vs Weaviate vs NumPy")
+    print("=" * 60)
+    
+    test_queries = TEST_QUERIES
+    systems_to_test = init_systems(embedder_kind, layout)
+    
     if len(systems_to_test) < 2:
-        print("❌ Need both systems running for comparison")
+        print("❌ Need at least two systems running for comparison")
+        close_systems(systems_to_test)
         return
     
-    print(f"\n🎯 Running {len(test_queries)} test queries on both systems...")
+    print(f"\n🎯 Running {len(test_queries)} test queries on {len(systems_to_test)} systems...")
     print("Testing both USER and ADMIN roles for access control")
     
     all_results = []
+    filter_results = []
+    routing_stats = {}
+    stage_stats = {}
     
     # Test each system
     for system_name, rag_system in systems_to_test:
         try:
             # Test as user
-            user_results = benchmark_search(rag_system, system_name, test_queries, "user")
+            user_results = benchmark_search(rag_system, system_name, test_queries, "user", warmup, repetitions)
             all_results.append(user_results)
             
             # Test as admin
-            admin_results = benchmark_search(rag_system, system_name, test_queries, "admin")
+            admin_results = benchmark_search(rag_system, system_name, test_queries, "admin", warmup, repetitions)
             all_results.append(admin_results)
             
+            # Server-side vs over-fetch role filtering (Weaviate, shared layout)
+            if hasattr(rag_system, "server_side_filter") and rag_system.layout == "shared":
+                filter_results.append(
+                    benchmark_role_filter(rag_system, system_name, test_queries, "user", warmup, repetitions)
+                )
+            
+            # Partition sizes and routing/merge cost (partitioned layout)
+            stats = rag_system.get_stats()
+            partitions = stats.get("partitions")
+            if partitions:
+                routing_stats[system_name] = partitions
+            
+            # Where the search time went (both roles, warmup included)
+            if stats.get("metrics"):
+                stage_stats[system_name] = stats["metrics"]["search_stages"]
+            
         except Exception as e:
             print(f"❌ Error testing {system_name}: {e}")
-        finally:
-            try:
-                rag_system.close()
-            except:
-                pass
+    
+    close_systems(systems_to_test)
     
     # Display comparison results
     print("\n" + "=" * 80)
     print("📊 PERFORMANCE COMPARISON RESULTS")
     print("=" * 80)
     
+    print(f"\n{'System':<10} {'Role':<6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'stdev':>7} {'95% CI':>15} {'n':>5} {'results':>8} {'score':>6}")
     for result in all_results:
-        print(f"\n🔹 {result['system']} ({result['role'].upper()} role)")
-        print(f"   Average query time: {result['avg_query_time']:.3f}s")
-        print(f"   Fastest query:      {result['min_query_time']:.3f}s")
-        print(f"   Slowest query:      {result['max_query_time']:.3f}s")
-        print(f"   Total results:      {result['total_results']}")
-        print(f"   Average score:      {result['avg_result_score']:.3f}")
+        latency = result["latency"]
+        ci = f"{latency['ci95_low_ms']:.2f}-{latency['ci95_high_ms']:.2f}"
+        print(f"{result['system']:<10} {result['role']:<6} {latency['p50_ms']:>8.2f} {latency['p90_ms']:>8.2f} "
+              f"{latency['p99_ms']:>8.2f} {latency['mean_ms']:>8.2f} {latency['stdev_ms']:>7.2f} {ci:>15} "
+              f"{latency['count']:>5} {result['total_results']:>8} {result['avg_result_score']:>6.3f}")
     
     # Role-based access comparison
     print(f"\n🔐 ACCESS CONTROL COMPARISON")
     print("-" * 40)
     
-    for system_name in ["Qdrant", "Weaviate"]:
+    for system_name, _ in systems_to_test:
         user_res = next((r for r in all_results if r['system'] == system_name and r['role'] == 'user'), None)
         admin_res = next((r for r in all_results if r['system'] == system_name and r['role'] == 'admin'), None)
         
@@ -152,16 +312,1212 @@ def compare_systems():
             print(f"  Admin results: {admin_res['total_results']}")
             print(f"  Admin sees {admin_res['total_results'] - user_res['total_results']} more results")
     
-    # Speed winner
+    # Role filter latency
+    for result in filter_results:
+        server_side = result["server_side"]
+        over_fetch = result["over_fetch"]
+        change = (server_side["latency"]["p50_ms"] - over_fetch["latency"]["p50_ms"]) / over_fetch["latency"]["p50_ms"]
+        print(f"\n🔎 ROLE FILTER: {result['system']} ({result['role'].upper()} role)")
+        print(f"   Server-side filter: {format_summary(server_side['latency'])}, "
+              f"{server_side['short_queries']} queries under limit")
+        print(f"   Over-fetch + drop:  {format_summary(over_fetch['latency'])}, "
+              f"{over_fetch['short_queries']} queries under limit")
+        print(f"   p50 latency change: {change:+.1%}")
+    
+    # Role-partitioned layout: what routing and the admin fan-out cost
+    for system_name, partitions in routing_stats.items():
+        routing = partitions["routing_latency"]
+        merge = partitions["merge_overhead"]
+        sizes = ", ".join(f"{name} {size}" for name, size in partitions["partition_sizes"].items())
+        print(f"\n🧭 PARTITIONS: {system_name} ({sizes})")
+        print(f"   Requests routed: {partitions['requests']} ({partitions['fan_out_requests']} fanned out)")
+        if routing.get("count"):
+            print(f"   Routing latency: p50 {routing['p50_ms']:.2f}ms, p99 {routing['p99_ms']:.2f}ms")
+        if merge.get("count"):
+            print(f"   Merge overhead:  p50 {merge['p50_ms'] * 1000:.1f}us, p99 {merge['p99_ms'] * 1000:.1f}us")
+    
+    # Per-stage latency breakdown from the metrics histograms
+    if stage_stats:
+        print(f"\n⏱️  SEARCH STAGES (histogram estimates; total includes the result cache)")
+        print(f"   {'System':<10} {'stage':<14} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for system_name, stages in stage_stats.items():
+            for stage, summary in stages.items():
+                print(f"   {system_name:<10} {stage:<14} {summary['count']:>6} {summary['mean_ms']:>8.2f} "
+                      f"{summary['p50_ms']:>8.2f} {summary['p99_ms']:>8.2f}")
+    
+    # Speed winners by median latency; overlapping confidence intervals mean the gap may be noise
     if len(all_results) >= 2:
-        fastest_user = min((r for r in all_results if r['role'] == 'user'), key=lambda x: x['avg_query_time'])
-        fastest_admin = min((r for r in all_results if r['role'] == 'admin'), key=lambda x: x['avg_query_time'])
-        
-        print(f"\n🏆 SPEED WINNERS")
-        print(f"   User queries:  {fastest_user['system']} ({fastest_user['avg_query_time']:.3f}s avg)")
-        print(f"   Admin queries: {fastest_admin['system']} ({fastest_admin['avg_query_time']:.3f}s avg)")
+        print(f"\n🏆 SPEED WINNERS (by p50)")
+        for role in ("user", "admin"):
+            role_results = sorted((r for r in all_results if r['role'] == role), key=lambda x: x['latency']['p50_ms'])
+            if len(role_results) < 2:
+                continue
+            fastest, runner_up = role_results[0], role_results[1]
+            verdict = ("not significant: 95% CIs overlap"
+                       if intervals_overlap(fastest['latency'], runner_up['latency']) else "significant")
+            print(f"   {role.capitalize()} queries: {fastest['system']} ({fastest['latency']['p50_ms']:.2f}ms p50) "
+                  f"vs {runner_up['system']} ({runner_up['latency']['p50_ms']:.2f}ms) - {verdict}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "search",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "queries": test_queries,
+            "warmup": warmup,
+            "repetitions": repetitions,
+            "layout": layout,
+            "results": all_results,
+            "role_filter": filter_results,
+            "partitions": routing_stats,
+            "search_stages": stage_stats
+        })
     
     print(f"\n✅ Comparison complete!")
 
+def run_load_benchmark(load_type: str = "closed", levels: List[float] = None, duration: float = 10.0,
+                       user_role: str = "user", embedder_kind: str = "http", layout: str = "shared",
+                       json_out: str = "benchmark_results_load.json"):
+    """Drive each backend with concurrent load and find where throughput saturates"""
+    levels = levels or ([1, 2, 4, 8, 16, 32] if load_type == "closed" else [5, 10, 20, 50, 100, 200])
+    print(f"🚀 Load test ({load_type} loop, {user_role} role, {duration:g}s per step)")
+    print("=" * 60)
+    
+    systems_to_test = init_systems(embedder_kind, layout)
+    load_results = []
+    
+    for system_name, rag_system in systems_to_test:
+        try:
+            print(f"\n⚡ Loading {system_name}...")
+            for query in TEST_QUERIES:  # warm up
+                rag_system.search(query, user_role=user_role, limit=3)
+            result = run_load_test(
+                lambda query: rag_system.search(query, user_role=user_role, limit=3),
+                TEST_QUERIES, load_type, levels, duration
+            )
+            result["system"] = system_name
+            load_results.append(result)
+        except Exception as e:
+            print(f"❌ Error load testing {system_name}: {e}")
+    
+    close_systems(systems_to_test)
+    
+    print("\n" + "=" * 80)
+    print("📈 THROUGHPUT / LATENCY CURVES")
+    print("=" * 80)
+    unit = "workers" if load_type == "closed" else "target qps"
+    for result in load_results:
+        print(f"\n🔹 {result['system']}")
+        print(f"   {unit:>10} {'qps':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for step in result["steps"]:
+            latency = step["latency"]
+            print(f"   {step['level']:>10g} {step['achieved_qps']:>9.1f} {latency.get('p50_ms', 0):>8.2f} "
+                  f"{latency.get('p90_ms', 0):>8.2f} {latency.get('p99_ms', 0):>8.2f} {step['error_rate']:>7.1%}")
+        saturation = result["saturation"]
+        if saturation:
+            print(f"   Saturation: {saturation['level']:g} {unit} -> {saturation['achieved_qps']:.1f} qps "
+                  f"at p99 {saturation['latency'].get('p99_ms', 0):.2f}ms")
+        else:
+            print("   Saturation: below the first step")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "load",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "load_type": load_type,
+            "role": user_role,
+            "duration_s": duration,
+            "levels": levels,
+            "results": load_results
+        })
+
+def parse_int_list(value: str) -> List[int]:
+    """'8,16,32' -> [8, 16, 32]"""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+def run_recall_benchmark(k: int = 10, user_role: str = "user", m_values: List[int] = None,
+                         ef_construct_values: List[int] = None, ef_values: List[int] = None,
+                         sample_queries: int = 100, repetitions: int = 3,
+                         embedder_kind: str = "http", json_out: str = "benchmark_results_recall.json"):
+    """Recall@k of each backend against exact search, plus a Qdrant HNSW parameter sweep"""
+    m_values = m_values or [8, 16, 32]
+    ef_construct_values = ef_construct_values or [64, 128]
+    ef_values = ef_values or [16, 32, 64, 128]
+    print(f"🚀 Recall@{k} benchmark ({user_role} role)")
+    print("=" * 60)
+    
+    systems_to_test = init_systems(embedder_kind)
+    embedder = next((system for _, system in systems_to_test if hasattr(system, "get_embeddings")), None)
+    if embedder is None:
+        print("❌ Need a backend with client-side embeddings (Qdrant or NumPy) to embed the test queries")
+        close_systems(systems_to_test)
+        return
+    
+    embedded = embedder.get_embeddings(TEST_QUERIES).vectors
+    test_vectors = normalize_rows(np.asarray([vector for vector in embedded if vector is not None], dtype=np.float32))
+    
+    report = {"benchmark": "recall", "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "k": k, "role": user_role,
+              "backends": {}}
+    
+    for system_name, rag_system in systems_to_test:
+        try:
+            if isinstance(rag_system, QdrantRAGSystem):
+                print(f"\n🎯 {system_name}: loading corpus vectors...")
+                ids, vectors, payloads = load_qdrant_corpus(rag_system.client, rag_system.collection_name)
+                queries = np.vstack([test_vectors, sample_corpus_queries(normalize_rows(vectors), sample_queries)])
+                mask = role_mask([payload["access_level"] for payload in payloads], user_role)
+                exact_ids = [[ids[row] for row in rows] for rows in exact_top_k(vectors, queries, k, mask)]
+                
+                current = measure_qdrant_search(
+                    rag_system.client, rag_system.collection_name, queries, exact_ids, k, user_role,
+                    repetitions=repetitions
+                )
+                print(f"  - Current collection: recall@{k} {current['recall']:.3f}, "
+                      f"p50 {current['latency']['p50_ms']:.2f}ms")
+                
+                print(f"  - HNSW sweep over {len(queries)} queries...")
+                sweep = qdrant_hnsw_sweep(
+                    rag_system.client, ids, vectors, payloads, queries, k, user_role,
+                    m_values, ef_construct_values, ef_values, repetitions
+                )
+                report["backends"][system_name] = {
+                    "queries": len(queries), "current": current, "sweep": sweep,
+                    "frontier": pareto_frontier(sweep)
+                }
+            
+            elif isinstance(rag_system, SimpleRAGSystem):
+                print(f"\n🎯 {system_name}: loading corpus vectors...")
+                collection = rag_system.client.collections.get(rag_system.collection_name)
+                ids, vectors, payloads = load_weaviate_corpus(collection)
+                queries = np.vstack([test_vectors, sample_corpus_queries(normalize_rows(vectors), sample_queries)])
+                measured = measure_weaviate_recall(
+                    collection, ids, vectors, payloads, queries, k, user_role, repetitions
+                )
+                print(f"  - recall@{k} {measured['recall']:.3f}, p50 {measured['latency']['p50_ms']:.2f}ms")
+                report["backends"][system_name] = {"queries": len(queries), "current": measured}
+            
+            else:
+                # Brute-force backends are exact by construction
+                report["backends"][system_name] = {"exact": True}
+        except Exception as e:
+            print(f"❌ Error measuring recall for {system_name}: {e}")
+    
+    close_systems(systems_to_test)
+    
+    print("\n" + "=" * 80)
+    print(f"📐 RECALL@{k} vs LATENCY")
+    print("=" * 80)
+    for system_name, backend in report["backends"].items():
+        if backend.get("exact"):
+            print(f"\n🔹 {system_name}: exact search (recall@{k} = 1.000)")
+            continue
+        current = backend["current"]
+        print(f"\n🔹 {system_name}: current settings recall@{k} {current['recall']:.3f}, "
+              f"p50 {current['latency']['p50_ms']:.2f}ms, p99 {current['latency']['p99_ms']:.2f}ms")
+        if backend.get("frontier"):
+            print(f"   Frontier (no setting is both faster and more accurate):")
+            print(f"   {'m':>4} {'ef_con':>7} {'ef':>5} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+            for point in backend["frontier"]:
+                print(f"   {point['m']:>4} {point['ef_construct']:>7} {point['ef']:>5} {point['recall']:>7.3f} "
+                      f"{point['latency']['p50_ms']:>8.2f} {point['latency']['p99_ms']:>8.2f}")
+    
+    if json_out:
+        write_json(json_out, report)
+
+def run_batch_benchmark(warmup: int = 2, repetitions: int = 10, user_role: str = "user",
+                        embedder_kind: str = "http", layout: str = "shared",
+                        json_out: str = "benchmark_results_batch.json"):
+    """Run the query set one search() at a time vs as a single search_batch() call"""
+    print(f"🚀 Per-query vs batched search ({len(TEST_QUERIES)} queries, {user_role} role)")
+    print("=" * 60)
+    
+    systems_to_test = init_systems(embedder_kind, layout)
+    batch_results = []
+    
+    for system_name, rag_system in systems_to_test:
+        if not hasattr(rag_system, "search_batch"):
+            print(f"\n⚠️  {system_name} has no search_batch, skipping")
+            continue
+        try:
+            print(f"\n📦 {system_name}...")
+            one_by_one = lambda _: [rag_system.search(query, user_role=user_role, limit=3) for query in TEST_QUERIES]
+            batched = lambda _: rag_system.search_batch(TEST_QUERIES, user_role=user_role, limit=3)
+            
+            # Both paths should return the same chunks for every query
+            expected = [[(hit["filename"], hit["chunk_id"]) for hit in hits] for hits in one_by_one(None)]
+            actual = [[(hit["filename"], hit["chunk_id"]) for hit in hits] for hits in batched(None)]
+            mismatched = sum(1 for a, b in zip(expected, actual) if a != b)
+            
+            sequential = summarize_latencies(time_calls(one_by_one, [None], warmup, repetitions))
+            batch = summarize_latencies(time_calls(batched, [None], warmup, repetitions))
+            result = {
+                "system": system_name,
+                "queries": len(TEST_QUERIES),
+                "sequential": sequential,
+                "batch": batch,
+                "mismatched_queries": mismatched
+            }
+            print(f"  - one at a time: {format_summary(sequential)}")
+            print(f"  - search_batch:  {format_summary(batch)}")
+            if mismatched:
+                print(f"  ⚠️  {mismatched} queries returned different results in batch mode")
+            batch_results.append(result)
+        except Exception as e:
+            print(f"❌ Error benchmarking {system_name}: {e}")
+    
+    close_systems(systems_to_test)
+    
+    print("\n" + "=" * 80)
+    print("📦 PER-QUERY vs PER-BATCH OVERHEAD (p50 over the whole query set)")
+    print("=" * 80)
+    print(f"{'System':<10} {'sequential ms':>14} {'per query':>10} {'batch ms':>10} {'per query':>10} {'speedup':>8}")
+    for result in batch_results:
+        n = result["queries"]
+        sequential_ms = result["sequential"]["p50_ms"]
+        batch_ms = result["batch"]["p50_ms"]
+        print(f"{result['system']:<10} {sequential_ms:>14.2f} {sequential_ms / n:>10.2f} {batch_ms:>10.2f} "
+              f"{batch_ms / n:>10.2f} {sequential_ms / batch_ms if batch_ms else 0:>7.1f}x")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "batch",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "role": user_role,
+            "warmup": warmup,
+            "repetitions": repetitions,
+            "results": batch_results
+        })
+
+def run_semantic_cache_benchmark(thresholds: List[float] = None, user_role: str = "user",
+                                 embedder_kind: str = "http", layout: str = "shared",
+                                 json_out: str = "benchmark_results_semantic.json"):
+    """
+    Warm the semantic cache with TEST_QUERIES, then send paraphrases. Each paraphrase is
+    also searched with caching bypassed, so every cache hit can be checked against the
+    fresh answer: a hit whose chunks differ from the fresh search is counted as wrong.
+    """
+    thresholds = thresholds or [0.80, 0.85, 0.90, 0.95]
+    print(f"🚀 Semantic cache benchmark ({user_role} role, thresholds {thresholds})")
+    print("=" * 60)
+    
+    systems_to_test = [(name, system) for name, system in init_systems(embedder_kind, layout)
+                       if hasattr(system, "semantic_cache")]
+    cache_results = []
+    
+    for system_name, rag_system in systems_to_test:
+        print(f"\n🧠 {system_name}...")
+        # Only the semantic layer is under test; exact repeats must not be served by the result cache
+        query_cache, rag_system.query_cache = rag_system.query_cache, None
+        try:
+            for threshold in thresholds:
+                rag_system.semantic_cache = SemanticCache(threshold=threshold)
+                for query in TEST_QUERIES:
+                    rag_system.search(query, user_role=user_role, limit=3)
+                
+                hits = wrong = 0
+                cached_ns, fresh_ns, hit_saved_ns = [], [], []
+                for query in PARAPHRASE_QUERIES:
+                    start = time.perf_counter_ns()
+                    fresh = rag_system.search(query, user_role=user_role, limit=3, use_cache=False)
+                    fresh_elapsed = time.perf_counter_ns() - start
+                    
+                    hits_before = rag_system.semantic_cache.hits
+                    start = time.perf_counter_ns()
+                    served = rag_system.search(query, user_role=user_role, limit=3)
+                    cached_elapsed = time.perf_counter_ns() - start
+                    
+                    fresh_ns.append(fresh_elapsed)
+                    cached_ns.append(cached_elapsed)
+                    if rag_system.semantic_cache.hits > hits_before:
+                        hits += 1
+                        hit_saved_ns.append(fresh_elapsed - cached_elapsed)
+                        if [(r["filename"], r["chunk_id"]) for r in served] != [(r["filename"], r["chunk_id"]) for r in fresh]:
+                            wrong += 1
+                
+                result = {
+                    "system": system_name,
+                    "threshold": threshold,
+                    "queries": len(PARAPHRASE_QUERIES),
+                    "hits": hits,
+                    "hit_rate": hits / len(PARAPHRASE_QUERIES),
+                    "wrong_hits": wrong,
+                    "wrong_rate": wrong / hits if hits else 0.0,
+                    "fresh_latency": summarize_latencies(fresh_ns),
+                    "cached_latency": summarize_latencies(cached_ns),
+                    "saved_ms_per_hit": statistics.fmean(hit_saved_ns) / 1e6 if hit_saved_ns else 0.0,
+                    "cache_stats": rag_system.semantic_cache.get_stats()
+                }
+                print(f"  - threshold {threshold:.2f}: {hits}/{len(PARAPHRASE_QUERIES)} hits, "
+                      f"{wrong} wrong, {result['saved_ms_per_hit']:.2f}ms saved per hit")
+                cache_results.append(result)
+        except Exception as e:
+            print(f"❌ Error benchmarking {system_name}: {e}")
+        finally:
+            rag_system.semantic_cache = None
+            rag_system.query_cache = query_cache
+    
+    close_systems(systems_to_test)
+    
+    print("\n" + "=" * 80)
+    print("🧠 SEMANTIC CACHE: HIT RATE vs WRONG ANSWERS")
+    print("=" * 80)
+    print(f"{'System':<10} {'threshold':>9} {'hit rate':>9} {'wrong':>7} {'saved/hit ms':>13} "
+          f"{'fresh p50':>10} {'cached p50':>11}")
+    for result in cache_results:
+        print(f"{result['system']:<10} {result['threshold']:>9.2f} {result['hit_rate']:>9.0%} "
+              f"{result['wrong_rate']:>7.0%} {result['saved_ms_per_hit']:>13.2f} "
+              f"{result['fresh_latency']['p50_ms']:>10.2f} {result['cached_latency']['p50_ms']:>11.2f}")
+    print("\nwrong = share of cache hits whose chunks differ from a fresh search of the same query")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "semantic_cache",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "role": user_role,
+            "thresholds": thresholds,
+            "results": cache_results
+        })
+
+def transport_requests(backend: str, protocol: str, client: Any, large_limit: int):
+    """
+    (small, large) request functions taking a query vector. `small` asks for one hit
+    with no payload, so it is almost pure per-request overhead; `large` asks for
+    `large_limit` hits with payloads and vectors, so the difference is serialization.
+    """
+    if backend == "Qdrant":
+        def small(vector):
+            return client.search(collection_name="documents", query_vector=vector, limit=1, with_payload=False)
+        
+        def large(vector):
+            return client.search(collection_name="documents", query_vector=vector, limit=large_limit,
+                                 with_payload=True, with_vectors=True)
+        return small, large
+    
+    if protocol == "rest":
+        fields = "content filename access_level chunk_id document_type _additional { id vector }"
+        
+        def small(vector):
+            return client.graphql_raw_query(
+                f"{{ Get {{ Document(nearVector: {{vector: {json.dumps(vector)}}}, limit: 1) {{ _additional {{ id }} }} }} }}"
+            )
+        
+        def large(vector):
+            return client.graphql_raw_query(
+                f"{{ Get {{ Document(nearVector: {{vector: {json.dumps(vector)}}}, limit: {large_limit}) {{ {fields} }} }} }}"
+            )
+        return small, large
+    
+    documents_collection = client.collections.get("Document")
+    
+    def small(vector):
+        return documents_collection.query.near_vector(near_vector=vector, limit=1, return_properties=[])
+    
+    def large(vector):
+        return documents_collection.query.near_vector(near_vector=vector, limit=large_limit, include_vector=True)
+    return small, large
+
+def run_transport_benchmark(warmup: int = 2, repetitions: int = 10, large_limit: int = 100,
+                            timeout: float = 30.0, pool_size: int = 16,
+                            embedder_kind: str = "http", json_out: str = "benchmark_results_transport.json"):
+    """Per-request overhead and payload serialization cost of REST vs gRPC for each backend"""
+    print(f"🚀 Transport benchmark (REST vs gRPC, {large_limit}-hit payloads)")
+    print("=" * 60)
+    
+    # Stored vectors make the queries, so embedding time stays out of the measurement
+    query_vectors: Dict[str, List[List[float]]] = {}
+    systems_to_test = init_systems(embedder_kind)
+    for system_name, rag_system in systems_to_test:
+        try:
+            if isinstance(rag_system, QdrantRAGSystem):
+                records, _ = rag_system.client.scroll(
+                    collection_name=rag_system.collection_name, limit=len(TEST_QUERIES), with_vectors=True
+                )
+                query_vectors[system_name] = [list(record.vector) for record in records]
+            elif isinstance(rag_system, SimpleRAGSystem):
+                _, vectors, _ = load_weaviate_corpus(rag_system.client.collections.get(rag_system.collection_name))
+                query_vectors[system_name] = vectors[:len(TEST_QUERIES)].tolist()
+        except Exception as e:
+            print(f"❌ Error sampling query vectors from {system_name}: {e}")
+    close_systems(systems_to_test)
+    
+    transport_results = []
+    for backend, vectors in query_vectors.items():
+        for protocol in PROTOCOLS:
+            config = TransportConfig(protocol=protocol, timeout=timeout, pool_size=pool_size)
+            print(f"\n🔌 {backend} over {config.describe(protocol)}...")
+            client = None
+            try:
+                if backend == "Qdrant":
+                    client = qdrant_client_from_config(config)
+                else:
+                    client = weaviate_client_from_config(config)
+                small, large = transport_requests(backend, protocol, client, large_limit)
+                small_summary = summarize_latencies(time_calls(small, vectors, warmup, repetitions))
+                large_summary = summarize_latencies(time_calls(large, vectors, warmup, repetitions))
+                payload_ms = large_summary["p50_ms"] - small_summary["p50_ms"]
+                result = {
+                    "backend": backend,
+                    "protocol": protocol,
+                    "small": small_summary,
+                    "large": large_summary,
+                    "payload_ms": payload_ms,
+                    "per_hit_us": payload_ms * 1000 / max(1, large_limit - 1)
+                }
+                print(f"  - 1 hit, no payload:   {format_summary(small_summary)}")
+                print(f"  - {large_limit} hits + vectors: {format_summary(large_summary)}")
+                transport_results.append(result)
+            except Exception as e:
+                print(f"❌ Error benchmarking {backend} over {protocol}: {e}")
+            finally:
+                if client is not None:
+                    try:
+                        client.close()
+                    except:
+                        pass
+    
+    print("\n" + "=" * 80)
+    print("🔌 TRANSPORT OVERHEAD (p50)")
+    print("=" * 80)
+    print(f"{'Backend':<10} {'protocol':<9} {'request ms':>11} {'payload ms':>11} {'per hit us':>11}")
+    for result in transport_results:
+        print(f"{result['backend']:<10} {result['protocol']:<9} {result['small']['p50_ms']:>11.2f} "
+              f"{result['payload_ms']:>11.2f} {result['per_hit_us']:>11.1f}")
+    for backend in query_vectors:
+        measured = [result for result in transport_results if result["backend"] == backend]
+        if len(measured) > 1:
+            fastest_small = min(measured, key=lambda result: result["small"]["p50_ms"])
+            fastest_large = min(measured, key=lambda result: result["large"]["p50_ms"])
+            print(f"\n🏆 {backend}: small queries -> {fastest_small['protocol']}, "
+                  f"large payloads -> {fastest_large['protocol']}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "transport",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "large_limit": large_limit,
+            "timeout": timeout,
+            "pool_size": pool_size,
+            "results": transport_results
+        })
+
+def run_embedder_benchmark(warmup: int = 2, repetitions: int = 10, port: int = 18081,
+                           json_out: str = "benchmark_results_embedders.json"):
+    """
+    Ingestion and search throughput of the NumPy backend under each embedder, fully
+    offline: the HTTP case talks to the local stand-in server, so comparing it with
+    the in-process fake isolates the cost of the HTTP hop.
+    """
+    print("🚀 Embedder benchmark (NumPy backend, no docker)")
+    print("=" * 60)
+    
+    server = start_server(FakeEmbedder(), port=port)
+    candidates = [
+        ("fake via HTTP stand-in", lambda: HTTPEmbedder(f"http://127.0.0.1:{port}")),
+        ("fake in-process", FakeEmbedder),
+        ("local MiniLM", LocalEmbedder)
+    ]
+    embedder_results = []
+    
+    try:
+        for label, factory in candidates:
+            try:
+                embedder = factory()
+            except ImportError as e:
+                print(f"\n⚠️  Skipping {label}: {e}")
+                continue
+            
+            print(f"\n🧬 {label} ({embedder.model_name})...")
+            rag_system = NumpyRAGSystem(embedding_cache_path=None, query_cache_size=0, embedder=embedder)
+            try:
+                start = time.perf_counter()
+                rag_system.ingest_documents(DATA_FOLDER)
+                ingest_seconds = time.perf_counter() - start
+                chunks = rag_system.get_stats()["total_chunks"]
+                
+                search = lambda query: rag_system.search(query, user_role="user", limit=3)
+                latency = summarize_latencies(time_calls(search, TEST_QUERIES, warmup, repetitions))
+                embedder_results.append({
+                    "embedder": label,
+                    "model": embedder.model_name,
+                    "chunks": chunks,
+                    "ingest_seconds": ingest_seconds,
+                    "chunks_per_second": chunks / ingest_seconds if ingest_seconds > 0 else 0.0,
+                    "search": latency
+                })
+            except Exception as e:
+                print(f"❌ Error benchmarking {label}: {e}")
+            finally:
+                rag_system.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    print("\n" + "=" * 80)
+    print("🧬 EMBEDDER THROUGHPUT")
+    print("=" * 80)
+    print(f"{'Embedder':<24} {'chunks/s':>10} {'search p50 ms':>14} {'search p99 ms':>14}")
+    for result in embedder_results:
+        print(f"{result['embedder']:<24} {result['chunks_per_second']:>10.1f} "
+              f"{result['search']['p50_ms']:>14.2f} {result['search']['p99_ms']:>14.2f}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "embedders",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "warmup": warmup,
+            "repetitions": repetitions,
+            "results": embedder_results
+        })
+
+def run_chunking_benchmark(sizes_mb: List[float] = None, repetitions: int = 3,
+                           json_out: str = "benchmark_results_chunking.json"):
+    """
+    Parse/chunk throughput on multi-megabyte synthetic documents: the old per-file
+    chunker against the shared Chunker in character, overlap and token modes
+    """
+    sizes_mb = sizes_mb or [4.0, 16.0]
+    variants = [
+        ("legacy 300 chars", lambda content, filename: legacy_parse(content, filename, 300)),
+        ("chunker 300 chars", Chunker(300).parse),
+        ("chunker 1000 chars", Chunker(1000).parse),
+        ("chunker 300 chars, overlap 100", Chunker(300, overlap=100).parse),
+        ("chunker 256 tokens, overlap 32", Chunker(256, unit="tokens", overlap=32).parse)
+    ]
+    print("🚀 Chunking benchmark (no docker)")
+    print("=" * 60)
+    
+    chunking_results = []
+    for size_mb in sizes_mb:
+        content = synthetic_document(DATA_FOLDER, int(size_mb * 1_000_000))
+        print(f"\n📄 {size_mb:g} MB synthetic document...")
+        for label, parse in variants:
+            timing = time_parser(parse, content, "synthetic_handbook.txt", repetitions)
+            chunking_results.append({"size_mb": size_mb, "variant": label, **timing})
+    
+    print("\n" + "=" * 80)
+    print("✂️  CHUNKING THROUGHPUT")
+    print("=" * 80)
+    print(f"{'MB':>6} {'Variant':<32} {'seconds':>9} {'MB/s':>8} {'chunks':>9} {'chunks/s':>11}")
+    for result in chunking_results:
+        print(f"{result['size_mb']:>6g} {result['variant']:<32} {result['seconds']:>9.3f} "
+              f"{result['mb_per_s']:>8.1f} {result['chunks']:>9} {result['chunks_per_s']:>11.0f}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "chunking",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repetitions": repetitions,
+            "results": chunking_results
+        })
+
+def run_parse_memory_benchmark(sizes_mb: List[float] = None, crlf: bool = False,
+                               json_out: str = "benchmark_results_parse_memory.json"):
+    """
+    Peak RSS of parsing one large access-marked file: file.read() + re.split (the old
+    path), the shared chunker on the read string, and the memory-mapped streaming parser
+    """
+    sizes_mb = sizes_mb or [64.0, 256.0]
+    print("🚀 Parser memory benchmark (no docker)")
+    print("=" * 60)
+    
+    memory_results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size_mb in sizes_mb:
+            path = os.path.join(tmp_dir, "synthetic_policy_export.txt")
+            file_mb = write_synthetic_file(DATA_FOLDER, path, int(size_mb * 1_000_000), crlf=crlf) / 1e6
+            print(f"\n📄 {file_mb:.0f} MB synthetic export{' (CRLF)' if crlf else ''}...")
+            for variant in PARSE_MEMORY_VARIANTS:
+                try:
+                    result = measure_parse_memory_isolated(variant, path)
+                except Exception as e:
+                    print(f"❌ Error measuring {variant}: {e}")
+                    continue
+                memory_results.append({"size_mb": file_mb, **result, "peak_per_file_mb": result["peak_delta_mb"] / file_mb})
+            os.remove(path)
+    
+    print("\n" + "=" * 80)
+    print("🧠 PARSER PEAK MEMORY")
+    print("=" * 80)
+    print(f"{'MB':>6} {'Parser':<36} {'seconds':>8} {'chunks':>9} {'peak +RSS MB':>13} {'x file':>7}")
+    for result in memory_results:
+        print(f"{result['size_mb']:>6.0f} {result['variant']:<36} {result['seconds']:>8.2f} {result['chunks']:>9} "
+              f"{result['peak_delta_mb']:>13.1f} {result['peak_per_file_mb']:>7.2f}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "parse_memory",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "crlf": crlf,
+            "results": memory_results
+        })
+
+def run_parse_scaling_benchmark(file_count: int = 1000, file_kb: int = 64, worker_counts: List[int] = None,
+                                json_out: str = "benchmark_results_parse_scaling.json"):
+    """Parse/chunk throughput of ingest_documents' file parsing on 1..N worker processes"""
+    worker_counts = worker_counts or default_worker_counts()
+    chunker = Chunker(300)
+    print("🚀 Parse scaling benchmark (no docker)")
+    print("=" * 60)
+    
+    scaling_results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"\n📄 Writing {file_count} synthetic files of ~{file_kb} KB...")
+        paths = write_synthetic_corpus(DATA_FOLDER, tmp_dir, file_count, file_kb * 1000)
+        corpus_mb = sum(path.stat().st_size for path in paths) / 1e6
+        for workers in worker_counts:
+            print(f"⚙️  {workers} worker(s)...")
+            scaling_results.append(time_parse_files(chunker, paths, workers))
+    
+    baseline = scaling_results[0]
+    print("\n" + "=" * 80)
+    print(f"📈 PARSE SCALING ({file_count} files, {corpus_mb:.0f} MB, {os.cpu_count()} CPUs)")
+    print("=" * 80)
+    print(f"{'workers':>8} {'seconds':>9} {'files/s':>9} {'MB/s':>8} {'speedup':>8} {'efficiency':>11} {'same output':>12}")
+    for result in scaling_results:
+        result["files_per_s"] = file_count / result["seconds"]
+        result["mb_per_s"] = corpus_mb / result["seconds"]
+        result["speedup"] = baseline["seconds"] / result["seconds"]
+        result["efficiency"] = result["speedup"] / result["workers"]
+        result["matches_serial"] = result["digest"] == baseline["digest"]
+        print(f"{result['workers']:>8} {result['seconds']:>9.2f} {result['files_per_s']:>9.0f} {result['mb_per_s']:>8.1f} "
+              f"{result['speedup']:>7.2f}x {result['efficiency']:>10.0%} {'yes' if result['matches_serial'] else 'NO':>12}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "parse_scaling",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": file_count,
+            "corpus_mb": corpus_mb,
+            "cpus": os.cpu_count(),
+            "results": scaling_results
+        })
+
+def run_record_memory_benchmark(count: int = 200000, json_out: str = "benchmark_results_record_memory.json"):
+    """Memory per chunk and per search result: dicts against slotted records and columns"""
+    print("🚀 Record memory benchmark (no docker)")
+    print("=" * 60)
+    
+    record_results = []
+    for variant in RECORD_MEMORY_VARIANTS:
+        print(f"🧮 {variant}...")
+        record_results.append(measure_record_memory(variant, count))
+    
+    print("\n" + "=" * 80)
+    print(f"🧠 MEMORY PER CHUNK ({count} chunks, chunk text excluded)")
+    print("=" * 80)
+    print(f"{'Representation':<32} {'bytes/chunk':>12} {'total MB':>10}")
+    for result in record_results:
+        print(f"{result['variant']:<32} {result['bytes_per_chunk']:>12.0f} {result['total_mb']:>10.1f}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "record_memory",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "chunks": count,
+            "results": record_results
+        })
+
+def run_quantization_benchmark(k: int = 10, user_role: str = "user", points: int = 0, oversampling: float = 2.0,
+                               sample_queries: int = 100, repetitions: int = 3,
+                               embedder_kind: str = "http", json_out: str = "benchmark_results_quantization.json"):
+    """Vector RAM, p99 latency and recall@k of Qdrant with no, scalar and binary quantization"""
+    print(f"🚀 Qdrant quantization benchmark (recall@{k}, {user_role} role)")
+    print("=" * 60)
+    
+    try:
+        qdrant_rag = QdrantRAGSystem(query_cache_size=0, embedder=make_embedder(embedder_kind), incremental=True)
+        if qdrant_rag.get_stats().get('total_chunks', 0) == 0:
+            qdrant_rag.ingest_documents(DATA_FOLDER)
+    except Exception as e:
+        print(f"❌ Failed to initialize Qdrant: {e}")
+        return
+    
+    try:
+        embedded = qdrant_rag.get_embeddings(TEST_QUERIES).vectors
+        test_vectors = normalize_rows(np.asarray([vector for vector in embedded if vector is not None], dtype=np.float32))
+        
+        print("\n🎯 Loading corpus vectors...")
+        _, vectors, payloads = load_qdrant_corpus(qdrant_rag.client, qdrant_rag.collection_name)
+        ids, vectors, payloads = expand_corpus(vectors, payloads, points)
+        queries = np.vstack([test_vectors, sample_corpus_queries(vectors, sample_queries)])
+        print(f"  - {len(ids)} points ({vectors.shape[1]}d), {len(queries)} queries")
+        
+        sweep = qdrant_quantization_sweep(
+            qdrant_rag.client, ids, vectors, payloads, queries, k, user_role,
+            default_quantization_settings(oversampling), repetitions
+        )
+    except Exception as e:
+        print(f"❌ Error running quantization benchmark: {e}")
+        return
+    finally:
+        qdrant_rag.close()
+    
+    baseline = sweep[0]["vector_ram_mb"] if sweep else 0.0
+    print("\n" + "=" * 80)
+    print(f"🗜️ QUANTIZATION ({len(ids)} points): vector RAM vs recall@{k} and latency")
+    print("=" * 80)
+    print(f"{'Setting':<40} {'RAM MB':>8} {'fits':>6} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in sweep:
+        # How many times the corpus fits in the RAM the float32 baseline needs
+        fits = baseline / result["vector_ram_mb"] if result["vector_ram_mb"] else float("inf")
+        result["corpus_multiple_in_baseline_ram"] = fits
+        print(f"{result['setting']:<40} {result['vector_ram_mb']:>8.1f} {fits:>5.1f}x {result['recall']:>7.3f} "
+              f"{result['latency']['p50_ms']:>8.2f} {result['latency']['p99_ms']:>8.2f}")
+    print("\nRAM is the estimated vector storage pinned in memory (HNSW graph and payloads excluded)")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "quantization",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "k": k,
+            "role": user_role,
+            "points": len(ids),
+            "queries": len(queries),
+            "oversampling": oversampling,
+            "results": sweep
+        })
+
+def run_filtered_search_benchmark(k: int = 10, points: int = 0, sample_queries: int = 100, repetitions: int = 3,
+                                  embedder_kind: str = "http",
+                                  json_out: str = "benchmark_results_filtered_search.json"):
+    """Qdrant filtered-search latency before and after payload indexes and the admin no-op filter removal"""
+    print(f"🚀 Qdrant filtered-search benchmark (recall@{k})")
+    print("=" * 60)
+    
+    try:
+        qdrant_rag = QdrantRAGSystem(query_cache_size=0, embedder=make_embedder(embedder_kind), incremental=True)
+        if qdrant_rag.get_stats().get('total_chunks', 0) == 0:
+            qdrant_rag.ingest_documents(DATA_FOLDER)
+    except Exception as e:
+        print(f"❌ Failed to initialize Qdrant: {e}")
+        return
+    
+    index = qdrant_rag.index
+    try:
+        embedded = qdrant_rag.get_embeddings(TEST_QUERIES).vectors
+        test_vectors = normalize_rows(np.asarray([vector for vector in embedded if vector is not None], dtype=np.float32))
+        
+        print("\n🎯 Loading corpus vectors...")
+        _, vectors, payloads = load_qdrant_corpus(qdrant_rag.client, qdrant_rag.collection_name)
+        ids, vectors, payloads = expand_corpus(vectors, payloads, points)
+        queries = np.vstack([test_vectors, sample_corpus_queries(vectors, sample_queries)])
+        user_share = sum(payload["access_level"] == "user" for payload in payloads) / max(1, len(payloads))
+        print(f"  - {len(ids)} points ({user_share:.0%} visible to users), {len(queries)} queries")
+        
+        comparison = qdrant_filter_comparison(
+            qdrant_rag.client, ids, vectors, payloads, queries, k, index, repetitions
+        )
+    except Exception as e:
+        print(f"❌ Error running filtered-search benchmark: {e}")
+        return
+    finally:
+        qdrant_rag.close()
+    
+    by_key = {(result["layout"], result["role"]): result for result in comparison}
+    print("\n" + "=" * 80)
+    print(f"🔎 FILTERED SEARCH ({len(ids)} points): no payload indexes vs {index.describe()}")
+    print("=" * 80)
+    print(f"{'Role':<7} {'before p50':>11} {'before p99':>11} {'after p50':>10} {'after p99':>10} "
+          f"{'p99 speedup':>12} {'recall before/after':>20}")
+    for role in ("user", "admin"):
+        before, after = by_key.get(("before", role)), by_key.get(("after", role))
+        if before is None or after is None:
+            continue
+        speedup = before["latency"]["p99_ms"] / after["latency"]["p99_ms"] if after["latency"]["p99_ms"] else 0.0
+        print(f"{role:<7} {before['latency']['p50_ms']:>9.2f}ms {before['latency']['p99_ms']:>9.2f}ms "
+              f"{after['latency']['p50_ms']:>8.2f}ms {after['latency']['p99_ms']:>8.2f}ms {speedup:>11.2f}x "
+              f"{before['recall']:>10.3f}/{after['recall']:.3f}")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "filtered_search",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "k": k,
+            "points": len(ids),
+            "queries": len(queries),
+            "index": index.describe(),
+            "results": comparison
+        })
+
+def run_hybrid_benchmark(warmup: int = 2, repetitions: int = 10, user_role: str = "user",
+                         embedder_kind: str = "http", layout: str = "shared",
+                         json_out: str = "benchmark_results_hybrid.json"):
+    """
+    Qdrant dense search vs BM25 + dense fused by reciprocal rank, with and without the
+    keyword fast path, over TEST_QUERIES and EXACT_TERM_QUERIES: latency, whether the
+    top hit of each exact-term query contains its term, and the fast-path savings
+    """
+    print(f"🚀 Hybrid retrieval benchmark ({user_role} role)")
+    print("=" * 60)
+    
+    variants = [
+        ("dense", None),
+        ("hybrid (RRF)", HybridConfig(fast_path=False)),
+        ("hybrid + fast path", HybridConfig())
+    ]
+    exact_queries = [query for query, _ in EXACT_TERM_QUERIES]
+    hybrid_results = []
+    
+    for variant_name, hybrid in variants:
+        print(f"\n🔤 {variant_name}...")
+        try:
+            qdrant_rag = QdrantRAGSystem(query_cache_size=0, embedder=make_embedder(embedder_kind), incremental=True,
+                                         layout=layout, hybrid=hybrid)
+            if qdrant_rag.get_stats().get('total_chunks', 0) == 0:
+                qdrant_rag.ingest_documents(DATA_FOLDER)
+        except Exception as e:
+            print(f"❌ Failed to initialize Qdrant ({variant_name}): {e}")
+            continue
+        
+        try:
+            for _ in range(warmup):
+                for query in TEST_QUERIES + exact_queries:
+                    qdrant_rag.search(query, user_role=user_role, limit=3)
+            if qdrant_rag.fast_path_stats is not None:
+                # Count the timed passes only
+                qdrant_rag.fast_path_stats = FastPathStats()
+            
+            search = lambda query: qdrant_rag.search(query, user_role=user_role, limit=3)
+            latencies = {
+                "test": time_calls(search, TEST_QUERIES, warmup=0, repetitions=repetitions),
+                "exact": time_calls(search, exact_queries, warmup=0, repetitions=repetitions)
+            }
+            
+            exact_hits = 0
+            for query, term in EXACT_TERM_QUERIES:
+                top = qdrant_rag.search(query, user_role=user_role, limit=3)
+                exact_hits += bool(top) and term in tokenize(top[0]["content"])
+            
+            stats = qdrant_rag.get_stats()
+            result = {
+                "variant": variant_name,
+                "hybrid": None if hybrid is None else vars(hybrid),
+                "test_latency": summarize_latencies(latencies["test"]),
+                "exact_latency": summarize_latencies(latencies["exact"]),
+                "exact_term_hits": exact_hits,
+                "exact_term_hit_rate": exact_hits / len(EXACT_TERM_QUERIES),
+                "keyword_index": stats.get("keyword_index")
+            }
+            hybrid_results.append(result)
+            print(f"  - exact-term top-1 hits: {exact_hits}/{len(EXACT_TERM_QUERIES)}")
+        except Exception as e:
+            print(f"❌ Error benchmarking {variant_name}: {e}")
+        finally:
+            qdrant_rag.close()
+    
+    print("\n" + "=" * 80)
+    print("🔤 HYBRID RETRIEVAL: DENSE vs BM25 + DENSE (RRF)")
+    print("=" * 80)
+    print(f"{'Variant':<20} {'test p50':>9} {'test p99':>9} {'exact p50':>10} {'exact p99':>10} "
+          f"{'exact hits':>11} {'fast path':>10} {'saved ms':>9}")
+    for result in hybrid_results:
+        keyword = result["keyword_index"] or {}
+        print(f"{result['variant']:<20} {result['test_latency']['p50_ms']:>7.2f}ms "
+              f"{result['test_latency']['p99_ms']:>7.2f}ms {result['exact_latency']['p50_ms']:>8.2f}ms "
+              f"{result['exact_latency']['p99_ms']:>8.2f}ms {result['exact_term_hit_rate']:>11.0%} "
+              f"{keyword.get('fast_path_rate', 0.0):>10.0%} {keyword.get('saved_ms', 0.0):>9.1f}")
+    print("\nexact hits = exact-term queries whose top hit contains the term; "
+          "saved ms = total latency the fast path saved over the timed passes")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "hybrid",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "role": user_role,
+            "layout": layout,
+            "queries": {"test": len(TEST_QUERIES), "exact_term": len(EXACT_TERM_QUERIES)},
+            "results": hybrid_results
+        })
+
+async def open_async_system(system_name: str, concurrency: int, embedder_kind: str = "http",
+                            layout: str = "shared"):
+    """Async counterpart of a sync backend, or None if there is none"""
+    if system_name == "Qdrant":
+        # No embedding cache, so every query pays both network hops
+        # The HTTP service gets the async client; in-process embedders run in a worker thread
+        embedder = None if embedder_kind == "http" else make_embedder(embedder_kind)
+        return AsyncQdrantRAGSystem(max_concurrency=concurrency, embedding_cache_path=None, layout=layout,
+                                    embedder=embedder)
+    if system_name == "Weaviate":
+        rag_system = AsyncSimpleRAGSystem(max_concurrency=concurrency, layout=layout)
+        await rag_system.connect()
+        return rag_system
+    return None
+
+async def time_async_search_many(system_name: str, queries: List[str], user_role: str,
+                                 concurrency: int, rounds: int, embedder_kind: str = "http",
+                                 layout: str = "shared") -> Dict[str, Any]:
+    """Wall time of search_many() over the query set, best of `rounds`"""
+    rag_system = await open_async_system(system_name, concurrency, embedder_kind, layout)
+    if rag_system is None:
+        return {}
+    try:
+        await rag_system.search_many(TEST_QUERIES, user_role)  # warm up
+        walls = []
+        empty = 0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            results = await rag_system.search_many(queries, user_role)
+            walls.append(time.perf_counter() - start)
+            empty += sum(1 for hits in results if not hits)
+        return {"wall_s": min(walls), "qps": len(queries) / min(walls), "empty_results": empty}
+    finally:
+        await rag_system.close()
+
+def run_async_benchmark(query_count: int = 200, concurrency: int = 32, rounds: int = 3,
+                        user_role: str = "user", embedder_kind: str = "http", layout: str = "shared",
+                        json_out: str = "benchmark_results_async.json"):
+    """Sync one-at-a-time vs sync thread pool vs async search_many over the same queries"""
+    print(f"🚀 Sync vs async search ({query_count} queries, concurrency {concurrency}, {user_role} role)")
+    print("=" * 60)
+    queries = [TEST_QUERIES[i % len(TEST_QUERIES)] for i in range(query_count)]
+    
+    systems_to_test = init_systems(embedder_kind, layout)
+    async_results = []
+    
+    for system_name, rag_system in systems_to_test:
+        if system_name not in ("Qdrant", "Weaviate"):
+            continue
+        # Same conditions for the sync runs: both network hops on every query
+        embedding_cache = getattr(rag_system, "embedding_cache", None)
+        if embedding_cache is not None:
+            rag_system.embedding_cache = None
+        try:
+            print(f"\n⚡ {system_name}...")
+            search = lambda query: rag_system.search(query, user_role=user_role, limit=3)
+            for query in TEST_QUERIES:  # warm up
+                search(query)
+            
+            sequential = []
+            threaded = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for query in queries:
+                    search(query)
+                sequential.append(time.perf_counter() - start)
+                
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    start = time.perf_counter()
+                    list(executor.map(search, queries))
+                    threaded.append(time.perf_counter() - start)
+            
+            async_run = asyncio.run(time_async_search_many(system_name, queries, user_role, concurrency, rounds,
+                                                           embedder_kind, layout))
+            result = {
+                "system": system_name,
+                "sync_sequential": {"wall_s": min(sequential), "qps": query_count / min(sequential)},
+                "sync_threads": {"wall_s": min(threaded), "qps": query_count / min(threaded)},
+                "async_search_many": async_run
+            }
+            for label, key in (("sync, one at a time", "sync_sequential"), (f"sync, {concurrency} threads", "sync_threads"),
+                               ("async search_many", "async_search_many")):
+                if result[key]:
+                    print(f"  - {label:<22} {result[key]['wall_s'] * 1000:9.1f}ms  {result[key]['qps']:8.1f} qps")
+            async_results.append(result)
+        except Exception as e:
+            print(f"❌ Error benchmarking {system_name}: {e}")
+        finally:
+            if embedding_cache is not None:
+                rag_system.embedding_cache = embedding_cache
+    
+    close_systems(systems_to_test)
+    
+    print("\n" + "=" * 80)
+    print("🔀 SYNC vs ASYNC THROUGHPUT (best of {} rounds)".format(rounds))
+    print("=" * 80)
+    for result in async_results:
+        base = result["sync_sequential"]["qps"]
+        print(f"\n🔹 {result['system']}")
+        print(f"   threads: {result['sync_threads']['qps'] / base:.1f}x sequential")
+        if result["async_search_many"]:
+            print(f"   async:   {result['async_search_many']['qps'] / base:.1f}x sequential")
+    
+    if json_out:
+        write_json(json_out, {
+            "benchmark": "async",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "queries": query_count,
+            "concurrency": concurrency,
+            "rounds": rounds,
+            "role": user_role,
+            "results": async_results
+        })
+
+def main():
+    """Parse command-line options and run the selected benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the RAG vector database backends")
+    parser.add_argument("--mode", choices=["search", "load", "recall", "async", "batch", "semantic", "transport",
+                                           "embedders", "chunking", "parse-memory", "parse-scaling", "record-memory",
+                                           "quantization", "filtered-search", "hybrid"],
+                        default="search",
+                        help="search: per-query latency percentiles; load: concurrent throughput/latency curves; "
+                             "recall: recall@k vs exact search with a Qdrant HNSW sweep; "
+                             "async: sync vs async search_many throughput; batch: search() loop vs search_batch(); "
+                             "semantic: semantic cache hit rate, saved latency and wrong answers; "
+                             "transport: REST vs gRPC request overhead and payload cost; "
+                             "embedders: offline ingest/search throughput per embedder; "
+                             "chunking: parse/chunk throughput on multi-MB documents; "
+                             "parse-memory: peak RSS of parsing one large file; "
+                             "parse-scaling: multi-file parsing on 1..N worker processes; "
+                             "record-memory: bytes per chunk/result for dicts vs slotted records; "
+                             "quantization: Qdrant vector RAM, p99 latency and recall@k per quantization setting; "
+                             "filtered-search: Qdrant role-filtered latency with and without payload indexes; "
+                             "hybrid: Qdrant dense vs BM25 + dense (RRF) with the keyword fast path")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed passes over the query set")
+    parser.add_argument("--repetitions", type=int, default=10, help="timed passes over the query set")
+    parser.add_argument("--json-out", default=None, help="JSON output path ('' to skip)")
+    parser.add_argument("--load-type", choices=["closed", "open"], default="closed",
+                        help="closed: fixed concurrency; open: fixed arrival rate")
+    parser.add_argument("--levels", default=None,
+                        help="comma-separated concurrency levels (closed) or target QPS values (open)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per load step")
+    parser.add_argument("--role", choices=["user", "admin"], default="user", help="role for the non-search modes")
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--hnsw-m", default="8,16,32", help="HNSW m values to sweep")
+    parser.add_argument("--hnsw-ef-construct", default="64,128", help="HNSW ef_construct values to sweep")
+    parser.add_argument("--search-ef", default="16,32,64,128", help="search-time ef values to sweep")
+    parser.add_argument("--sample-queries", type=int, default=100,
+                        help="corpus vectors reused as extra recall queries")
+    parser.add_argument("--queries", type=int, default=200, help="queries per round in async mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="queries in flight in async mode")
+    parser.add_argument("--thresholds", default=None, help="comma-separated semantic cache similarity thresholds")
+    parser.add_argument("--large-limit", type=int, default=100, help="hits per request for the transport payload test")
+    parser.add_argument("--timeout", type=float, default=30.0, help="client timeout (seconds) in transport mode")
+    parser.add_argument("--pool-size", type=int, default=16, help="HTTP connection pool size in transport mode")
+    parser.add_argument("--embedder", choices=EMBEDDER_KINDS, default="http",
+                        help="embedder for Qdrant/NumPy: http (/vectors service), local (in-process MiniLM), fake")
+    parser.add_argument("--layout", choices=LAYOUTS, default="shared",
+                        help="Qdrant/Weaviate storage: shared (one collection, role filter per point) or "
+                             "partitioned (one collection/tenant per access level; not in recall, transport, "
+                             "quantization or filtered-search mode)")
+    parser.add_argument("--embedding-port", type=int, default=18081, help="stand-in server port in embedders mode")
+    parser.add_argument("--corpus-mb", default=None,
+                        help="comma-separated synthetic document sizes in MB (chunking: 4,16; parse-memory: 64,256)")
+    parser.add_argument("--files", type=int, default=1000, help="synthetic files in parse-scaling mode")
+    parser.add_argument("--file-kb", type=int, default=64, help="size of each synthetic file (KB) in parse-scaling mode")
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts in parse-scaling mode (default 1,2,4..cores)")
+    parser.add_argument("--chunks", type=int, default=200000, help="records built in record-memory mode")
+    parser.add_argument("--points", type=int, default=0,
+                        help="grow the corpus to this many points (jittered copies) in quantization/filtered-search mode")
+    parser.add_argument("--oversampling", type=float, default=2.0,
+                        help="candidates fetched per result before rescoring in quantization mode")
+    parser.add_argument("--crlf", action="store_true", help="write the parse-memory test file with CRLF line endings")
+    parser.add_argument("--metrics-out", default=None,
+                        help="write the per-stage search/ingest metrics here (Prometheus text format) when done")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve the metrics at http://localhost:PORT/metrics while the benchmark runs")
+    args = parser.parse_args()
+    if args.layout == "partitioned" and args.mode in SHARED_LAYOUT_MODES:
+        parser.error(f"--mode {args.mode} measures the shared collection directly; "
+                     f"it does not support --layout partitioned")
+    
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = REGISTRY.serve(args.metrics_port)
+        print(f"📈 Metrics at http://localhost:{args.metrics_port}/metrics")
+    
+    sizes_mb = [float(value) for value in args.corpus_mb.split(",")] if args.corpus_mb else None
+    
+    if args.mode == "hybrid":
+        run_hybrid_benchmark(
+            warmup=args.warmup, repetitions=args.repetitions, user_role=args.role,
+            embedder_kind=args.embedder, layout=args.layout,
+            json_out="benchmark_results_hybrid.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "filtered-search":
+        run_filtered_search_benchmark(
+            k=args.k, points=args.points, sample_queries=args.sample_queries,
+            repetitions=max(1, args.repetitions // 3),
+            embedder_kind=args.embedder,
+            json_out="benchmark_results_filtered_search.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "quantization":
+        run_quantization_benchmark(
+            k=args.k, user_role=args.role, points=args.points, oversampling=args.oversampling,
+            sample_queries=args.sample_queries, repetitions=max(1, args.repetitions // 3),
+            embedder_kind=args.embedder,
+            json_out="benchmark_results_quantization.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "record-memory":
+        run_record_memory_benchmark(
+            count=args.chunks,
+            json_out="benchmark_results_record_memory.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "parse-scaling":
+        run_parse_scaling_benchmark(
+            file_count=args.files, file_kb=args.file_kb,
+            worker_counts=parse_int_list(args.workers) if args.workers else None,
+            json_out="benchmark_results_parse_scaling.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "parse-memory":
+        run_parse_memory_benchmark(
+            sizes_mb=sizes_mb, crlf=args.crlf,
+            json_out="benchmark_results_parse_memory.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "chunking":
+        run_chunking_benchmark(
+            sizes_mb=sizes_mb, repetitions=max(1, args.repetitions // 3),
+            json_out="benchmark_results_chunking.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "embedders":
+        run_embedder_benchmark(
+            warmup=args.warmup, repetitions=args.repetitions, port=args.embedding_port,
+            json_out="benchmark_results_embedders.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "transport":
+        run_transport_benchmark(
+            warmup=args.warmup, repetitions=args.repetitions, large_limit=args.large_limit,
+            timeout=args.timeout, pool_size=args.pool_size,
+            embedder_kind=args.embedder,
+            json_out="benchmark_results_transport.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "semantic":
+        thresholds = [float(value) for value in args.thresholds.split(",")] if args.thresholds else None
+        run_semantic_cache_benchmark(
+            thresholds=thresholds, user_role=args.role,
+            embedder_kind=args.embedder, layout=args.layout,
+            json_out="benchmark_results_semantic.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "batch":
+        run_batch_benchmark(
+            warmup=args.warmup, repetitions=args.repetitions, user_role=args.role,
+            embedder_kind=args.embedder, layout=args.layout,
+            json_out="benchmark_results_batch.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "async":
+        run_async_benchmark(
+            query_count=args.queries, concurrency=args.concurrency, rounds=max(1, args.repetitions // 3),
+            user_role=args.role,
+            embedder_kind=args.embedder, layout=args.layout,
+            json_out="benchmark_results_async.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "recall":
+        run_recall_benchmark(
+            k=args.k, user_role=args.role, m_values=parse_int_list(args.hnsw_m),
+            ef_construct_values=parse_int_list(args.hnsw_ef_construct), ef_values=parse_int_list(args.search_ef),
+            sample_queries=args.sample_queries, repetitions=max(1, args.repetitions // 3),
+            embedder_kind=args.embedder,
+            json_out="benchmark_results_recall.json" if args.json_out is None else args.json_out
+        )
+    elif args.mode == "load":
+        levels = [float(level) for level in args.levels.split(",")] if args.levels else None
+        run_load_benchmark(
+            load_type=args.load_type, levels=levels, duration=args.duration, user_role=args.role,
+            embedder_kind=args.embedder, layout=args.layout,
+            json_out="benchmark_results_load.json" if args.json_out is None else args.json_out
+        )
+    else:
+        compare_systems(
+            warmup=args.warmup, repetitions=args.repetitions,
+            embedder_kind=args.embedder, layout=args.layout,
+            json_out="benchmark_results.json" if args.json_out is None else args.json_out
+        )
+    
+    if args.metrics_out:
+        REGISTRY.write(args.metrics_out)
+        print(f"\n📈 Metrics written to {args.metrics_out}")
+    if metrics_server is not None:
+        metrics_server.shutdown()
+        metrics_server.server_close()
+
 if __name__ == "__main__":
-    compare_systems() 
\ No newline at end of file
+    main()
@@ -0,0 +1,139 @@
+"""
+Pluggable embedders for the client-side-embedding backends (Qdrant, NumPy).
+
+- HTTPEmbedder: the transformers-inference `/vectors` service (the docker stack)
+- LocalEmbedder: the same MiniLM model run in-process with batched CPU inference
+  (needs the optional `sentence-transformers` package)
+- FakeEmbedder: deterministic hashed bag-of-words vectors, no model and no network
+
+Every embedder returns an EmbeddingBatch aligned with its input, so they plug into
+embed_with_cache and the RAG systems interchangeably.
+"""
+
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+
+from embedding_client import EmbeddingBatch, EmbeddingClient
+
+EMBEDDER_KINDS = ("http", "local", "fake")
+
+
+class Embedder:
+    """Base class: turns texts into vectors"""
+    model_name = "unknown"
+    dimension = 0
+
+    def embed(self, texts: List[str]) -> EmbeddingBatch:
+        """Embed texts; failed texts get a None vector and an error entry"""
+        raise NotImplementedError
+
+    def embed_one(self, text: str) -> List[float]:
+        """Embed a single text, raising on failure"""
+        batch = self.embed([text])
+        if batch.errors:
+            raise RuntimeError(batch.errors[0])
+        return batch.vectors[0]
+
+    @property
+    def signature(self) -> str:
+        """Identifies the vectors this embedder produces (stored in the ingest manifest)"""
+        return f"embedder={self.model_name},dimension={self.dimension}"
+
+    def close(self):
+        """Release any resources held by the embedder"""
+
+
+class HTTPEmbedder(Embedder):
+    """The t2v-transformers `/vectors` endpoint, via the pooled EmbeddingClient"""
+    model_name = "sentence-transformers-all-MiniLM-L6-v2"
+    dimension = 384
+
+    def __init__(self, base_url: str = "http://localhost:8081", max_workers: int = 8, **client_options):
+        self.base_url = base_url
+        self.client = EmbeddingClient(base_url, max_workers=max_workers, **client_options)
+
+    def embed(self, texts: List[str]) -> EmbeddingBatch:
+        return self.client.embed(texts)
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.client.embed_one(text)
+
+    def close(self):
+        self.client.close()
+
+
+class LocalEmbedder(Embedder):
+    """sentence-transformers model run in this process, batched on CPU"""
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", batch_size: int = 32,
+                 device: str = "cpu", normalize: bool = True):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "LocalEmbedder needs the optional 'sentence-transformers' package "
+                "(pip install sentence-transformers)"
+            ) from e
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> EmbeddingBatch:
+        if not texts:
+            return EmbeddingBatch(vectors=[])
+        try:
+            matrix = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize,
+                show_progress_bar=False
+            )
+            return EmbeddingBatch(vectors=matrix.astype(np.float32).tolist())
+        except Exception as e:
+            # One bad batch fails every text in it, matching the HTTP client's contract
+            return EmbeddingBatch(vectors=[None] * len(texts), errors={i: str(e) for i in range(len(texts))})
+
+
+class FakeEmbedder(Embedder):
+    """
+    Deterministic hashed bag-of-words vectors. Texts sharing words get similar
+    vectors, so search results are meaningful enough for offline throughput tests.
+    """
+    _TOKEN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.model_name = f"fake-hashed-bow-{dimension}"
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in self._TOKEN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimension] += 1.0 if (value >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = 1.0
+        else:
+            vector /= norm
+        return vector.tolist()
+
+    def embed(self, texts: List[str]) -> EmbeddingBatch:
+        return EmbeddingBatch(vectors=[self._vector(text) for text in texts])
+
+
+def make_embedder(kind: str = "http", **options) -> Embedder:
+    """Build an embedder by name: 'http', 'local' or 'fake'"""
+    if kind == "http":
+        return HTTPEmbedder(**options)
+    if kind == "local":
+        return LocalEmbedder(**options)
+    if kind == "fake":
+        return FakeEmbedder(**options)
+    raise ValueError(f"Unknown embedder {kind!r}; expected one of {EMBEDDER_KINDS}")
@@ -0,0 +1,201 @@
+"""
+Persistent, content-addressed embedding cache.
+Vectors are stored in SQLite keyed by sha256(model name + text) and evicted
+least-recently-used once the cache grows past its size cap.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Dict, Any, Optional, Tuple
+
+from embedding_client import EmbeddingBatch
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = ".embedding_cache.sqlite3", max_entries: int = 200_000,
+                 touch_flush_size: int = 1024):
+        """
+        Open (or create) the cache database
+        
+        Args:
+            path: SQLite file
+            max_entries: size cap; the least recently used entries are evicted past it
+            touch_flush_size: hits whose last-used times are buffered in memory before they are
+                written in one transaction (they are also written before evicting and on close)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_flush_size = touch_flush_size
+        # key -> last-used time of hits not yet written, so a read-only lookup does no write
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Content address for a (model, text) pair"""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for texts; misses come back as None"""
+        if not texts:
+            return []
+        keys = [self.make_key(model, text) for text in texts]
+        found: Dict[str, bytes] = {}
+
+        with self._lock:
+            unique_keys = list(set(keys))
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(unique_keys), 500):
+                part = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._touched.update((key, now) for key in found)
+                if len(self._touched) >= self.touch_flush_size:
+                    self._flush_touched()
+                    self._conn.commit()
+
+            vectors = []
+            for key in keys:
+                blob = found.get(key)
+                if blob is None:
+                    self.misses += 1
+                    vectors.append(None)
+                else:
+                    self.hits += 1
+                    vectors.append(array("f", blob).tolist())
+        return vectors
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store vectors for texts, evicting the least recently used entries if over the cap"""
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._count += self._conn.total_changes - before
+            # Same transaction as the insert; eviction also needs the current access times
+            self._flush_touched()
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+            self._conn.commit()
+
+    def _flush_touched(self):
+        """Write the buffered last-used times (caller holds the lock and commits)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self, n: int):
+        """Drop the n least recently used entries (caller holds the lock)"""
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (n,)
+        )
+        self.evictions += n
+        self._count -= n
+
+    def clear(self):
+        """Remove every cached vector"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched.clear()
+            self._count = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+    def close(self):
+        """Write the buffered access times and close the underlying database"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+def _fill_misses(texts: List[str], vectors: List[Optional[List[float]]], missing: List[int],
+                 fetched: EmbeddingBatch) -> Tuple[EmbeddingBatch, List[str], List[List[float]]]:
+    """Merge the fetched misses into the cached vectors; also returns the new (text, vector) pairs to cache"""
+    errors = {}
+    new_texts, new_vectors = [], []
+    for j, i in enumerate(missing):
+        if j in fetched.errors:
+            errors[i] = fetched.errors[j]
+        else:
+            vectors[i] = fetched.vectors[j]
+            new_texts.append(texts[i])
+            new_vectors.append(fetched.vectors[j])
+    return EmbeddingBatch(vectors=vectors, errors=errors), new_texts, new_vectors
+
+
+def embed_with_cache(client: Any, cache: Optional[EmbeddingCache], model: str, texts: List[str]) -> EmbeddingBatch:
+    """Serve texts from the cache and send only the misses to the embedding client"""
+    if cache is None:
+        return client.embed(texts)
+
+    vectors = cache.get_many(model, texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    fetched = client.embed([texts[i] for i in missing])
+
+    batch, new_texts, new_vectors = _fill_misses(texts, vectors, missing, fetched)
+    cache.put_many(model, new_texts, new_vectors)
+    return batch
+
+
+async def async_embed_with_cache(client: Any, cache: Optional[EmbeddingCache], model: str,
+                                 texts: List[str]) -> EmbeddingBatch:
+    """embed_with_cache for a client with an async embed(); SQLite calls run in a worker thread"""
+    if cache is None:
+        return await client.embed(texts)
+
+    vectors = await asyncio.to_thread(cache.get_many, model, texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    fetched = await client.embed([texts[i] for i in missing])
+
+    batch, new_texts, new_vectors = _fill_misses(texts, vectors, missing, fetched)
+    if new_texts:
+        await asyncio.to_thread(cache.put_many, model, new_texts, new_vectors)
+    return batch
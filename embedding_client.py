@@ -0,0 +1,145 @@
+"""
+Embedding client for the transformers-inference `/vectors` endpoint.
+Keeps one pooled keep-alive session and embeds texts concurrently.
+AsyncEmbeddingClient is the asyncio counterpart built on aiohttp.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+@dataclass
+class EmbeddingBatch:
+    """Embeddings for a batch of texts, aligned with the input order"""
+    vectors: List[Optional[List[float]]]
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+
+class EmbeddingClient:
+    def __init__(self, base_url: str = "http://localhost:8081", max_workers: int = 8,
+                 pool_size: Optional[int] = None, timeout: float = 30.0, max_retries: int = 2):
+        """Create a pooled HTTP session and a bounded worker pool"""
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        pool_size = pool_size or self.max_workers
+
+        # The /vectors POST is idempotent, so transient failures are safe to retry
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"POST"})
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embed")
+
+    def embed_one(self, text: str) -> List[float]:
+        """Embed a single text, raising on failure"""
+        # The API expects a single string per request, not a list
+        response = self.session.post(
+            f"{self.base_url}/vectors",
+            json={"text": text},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["vector"]
+
+    def embed(self, texts: List[str]) -> EmbeddingBatch:
+        """Embed texts concurrently; failed texts get a None vector and an error entry"""
+        if not texts:
+            return EmbeddingBatch(vectors=[])
+        if len(texts) == 1:
+            # Skip the pool hop for single queries
+            futures = None
+        else:
+            futures = [self.executor.submit(self.embed_one, text) for text in texts]
+
+        vectors: List[Optional[List[float]]] = []
+        errors: Dict[int, str] = {}
+        for i, text in enumerate(texts):
+            try:
+                vectors.append(futures[i].result() if futures else self.embed_one(text))
+            except Exception as e:
+                vectors.append(None)
+                errors[i] = str(e)
+
+        return EmbeddingBatch(vectors=vectors, errors=errors)
+
+    def close(self):
+        """Shut down the worker pool and release pooled connections"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+
+
+class AsyncEmbeddingClient:
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, base_url: str = "http://localhost:8081", max_concurrency: int = 32,
+                 timeout: float = 30.0, max_retries: int = 2):
+        """Settings only; the aiohttp session is created lazily inside the running event loop"""
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def embed_one(self, text: str) -> List[float]:
+        """Embed a single text, raising on failure"""
+        session = self._get_session()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                async with session.post(f"{self.base_url}/vectors", json={"text": text}) as response:
+                    if response.status in self.RETRY_STATUSES and attempt < self.max_retries:
+                        await asyncio.sleep(0.2 * (2 ** attempt))
+                        continue
+                    response.raise_for_status()
+                    return (await response.json())["vector"]
+
+    async def embed(self, texts: List[str]) -> EmbeddingBatch:
+        """Embed texts concurrently; failed texts get a None vector and an error entry"""
+        results = await asyncio.gather(*(self.embed_one(text) for text in texts), return_exceptions=True)
+        vectors: List[Optional[List[float]]] = []
+        errors: Dict[int, str] = {}
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                vectors.append(None)
+                errors[i] = str(result)
+            else:
+                vectors.append(result)
+        return EmbeddingBatch(vectors=vectors, errors=errors)
+
+    async def close(self):
+        """Release pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
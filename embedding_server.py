@@ -0,0 +1,97 @@
+"""
+Stand-in for the t2v-transformers inference container.
+Implements the `/vectors` contract (POST {"text": ...} -> {"text", "vector", "dim"})
+plus `/meta` and `/.well-known/ready`, backed by any Embedder. Point
+EmbeddingClient/HTTPEmbedder at it to run ingestion and search without docker.
+
+    python embedding_server.py --port 8081 --embedder fake
+"""
+
+import argparse
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+
+from embedders import EMBEDDER_KINDS, Embedder, make_embedder
+
+
+class _Handler(BaseHTTPRequestHandler):
+    embedder: Embedder = None
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real container
+    # Headers and body go out in separate writes; without TCP_NODELAY, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/.well-known/ready" or self.path == "/.well-known/live":
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/meta":
+            self._send_json(200, {"model": {"name": self.embedder.model_name, "dimension": self.embedder.dimension}})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/vectors":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            text = json.loads(self.rfile.read(length))["text"]
+        except Exception as e:
+            self._send_json(422, {"error": f"invalid request: {e}"})
+            return
+        try:
+            vector = self.embedder.embed_one(text)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"text": text, "vector": vector, "dim": len(vector)})
+
+
+def start_server(embedder: Optional[Embedder] = None, host: str = "127.0.0.1", port: int = 8081) -> ThreadingHTTPServer:
+    """Serve `/vectors` on a background thread; call shutdown() and server_close() on the result to stop"""
+    handler = type("EmbeddingHandler", (_Handler,), {"embedder": embedder or make_embedder("fake")})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="embedding-server", daemon=True).start()
+    return server
+
+
+def main():
+    """Run the stand-in server in the foreground"""
+    parser = argparse.ArgumentParser(description="Local stand-in for the /vectors embedding service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--embedder", choices=[kind for kind in EMBEDDER_KINDS if kind != "http"], default="fake",
+                        help="fake: hashed bag-of-words vectors; local: in-process sentence-transformers model")
+    args = parser.parse_args()
+
+    embedder = make_embedder(args.embedder)
+    server = start_server(embedder, args.host, args.port)
+    print(f"🚀 Serving {embedder.model_name} ({embedder.dimension}d) on http://{args.host}:{args.port}/vectors")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.shutdown()
+        server.server_close()
+        embedder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Helpers for the CPU-side ingest benchmarks (parsing and chunking).
+Synthetic corpora are built by repeating the sample documents, access markers
+included, until they reach the requested size. Peak memory is measured in a
+fresh process per parser, so one run's high-water mark never hides another's.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+from chunker import Chunker, get_document_type, parse_files
+from records import Chunk, ChunkBatch, SearchResult
+
+RECORD_MEMORY_VARIANTS = ("chunk dicts, shared strings", "chunk dicts, per-row strings", "Chunk records",
+                          "ChunkBatch columns", "result dicts", "SearchResult records")
+PARSE_MEMORY_VARIANTS = ("legacy read + re.split", "read + Chunker.parse", "mmap Chunker.parse_file",
+                         "mmap Chunker.parse_file, streamed")
+
+
+def synthetic_document(data_folder: str, target_bytes: int) -> str:
+    """The sample documents concatenated (and repeated) to at least target_bytes characters"""
+    texts = [path.read_text(encoding="utf-8") for path in sorted(Path(data_folder).glob("*.txt"))]
+    if not texts:
+        raise ValueError(f"No .txt files in {data_folder}")
+    parts = []
+    size = 0
+    while size < target_bytes:
+        for text in texts:
+            parts.append(text)
+            size += len(text) + 2
+            if size >= target_bytes:
+                break
+    return "\n\n".join(parts)
+
+
+def write_synthetic_file(data_folder: str, path: str, target_bytes: int, crlf: bool = False) -> int:
+    """Stream repeated sample documents to `path` without building the text in memory; returns its size"""
+    texts = [path_.read_text(encoding="utf-8") for path_ in sorted(Path(data_folder).glob("*.txt"))]
+    if not texts:
+        raise ValueError(f"No .txt files in {data_folder}")
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="\r\n" if crlf else "\n") as file:
+        while written < target_bytes:
+            for text in texts:
+                file.write(text + "\n\n")
+                written += len(text.encode("utf-8")) + 2
+                if written >= target_bytes:
+                    break
+    return os.path.getsize(path)
+
+
+def write_synthetic_corpus(data_folder: str, directory: str, file_count: int, file_bytes: int) -> List[Path]:
+    """file_count synthetic documents of about file_bytes each, named after the sample files"""
+    stems = [path.stem for path in sorted(Path(data_folder).glob("*.txt"))]
+    paths = []
+    for i in range(file_count):
+        path = Path(directory) / f"{stems[i % len(stems)]}_{i:05d}.txt"
+        write_synthetic_file(data_folder, str(path), file_bytes)
+        paths.append(path)
+    return paths
+
+
+def default_worker_counts() -> List[int]:
+    """1, 2, 4, ... up to the usable core count (always including it)"""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def time_parse_files(chunker: Chunker, paths: List[Path], workers: int) -> Dict[str, Any]:
+    """Wall time of parse_files over a corpus, with a digest of the ordered output"""
+    digest = hashlib.sha256()
+    chunk_count = 0
+    errors = 0
+    start = time.perf_counter()
+    for parsed in parse_files(chunker, paths, workers):
+        errors += parsed.error is not None
+        chunk_count += len(parsed)
+        for access_level, chunk_id, content in zip(parsed.access_levels, parsed.chunk_ids, parsed.contents):
+            digest.update(f"{parsed.filename}/{access_level}/{chunk_id}\0{content}\0".encode("utf-8"))
+    seconds = time.perf_counter() - start
+    return {"workers": workers, "seconds": seconds, "chunks": chunk_count, "errors": errors,
+            "digest": digest.hexdigest()}
+
+
+def legacy_parse(content: str, filename: str, chunk_size: int = 300) -> List[Dict[str, Any]]:
+    """
+    The chunker the RAG systems used before chunker.Chunker (re.split into section
+    strings, string concatenation, document type looked up per chunk); the baseline
+    """
+    documents = []
+    sections = re.split(r'=== ACCESS: (user|admin) ===', content)
+    if len(sections) == 1:
+        sections = ["", "user", sections[0]]
+    for i in range(1, len(sections) - 1, 2):
+        access_level = sections[i].strip()
+        section_content = sections[i + 1].strip()
+        if not section_content:
+            continue
+        paragraphs = [p.strip() for p in section_content.split('\n\n') if p.strip()]
+        current_chunk = ""
+        chunk_id = 0
+        for paragraph in paragraphs:
+            if len(current_chunk) + len(paragraph) > chunk_size and current_chunk.strip():
+                documents.append({
+                    "content": current_chunk.strip(),
+                    "filename": filename,
+                    "access_level": access_level,
+                    "chunk_id": chunk_id,
+                    "document_type": get_document_type(filename)
+                })
+                chunk_id += 1
+                current_chunk = paragraph + "\n\n"
+            else:
+                current_chunk += paragraph + "\n\n"
+        if current_chunk.strip():
+            documents.append({
+                "content": current_chunk.strip(),
+                "filename": filename,
+                "access_level": access_level,
+                "chunk_id": chunk_id,
+                "document_type": get_document_type(filename)
+            })
+    return documents
+
+
+def time_parser(parse_fn: Callable[[str, str], Any], content: str, filename: str,
+                repetitions: int = 3) -> Dict[str, Any]:
+    """Best-of-N wall time for parse_fn(content, filename), with MB/s and chunks/s"""
+    best = float("inf")
+    chunk_count = 0
+    total_chars = 0
+    for _ in range(max(1, repetitions)):
+        start = time.perf_counter()
+        chunk_count = 0
+        total_chars = 0
+        for chunk in parse_fn(content, filename):
+            chunk_count += 1
+            total_chars += len(chunk["content"])
+        best = min(best, time.perf_counter() - start)
+    megabytes = len(content.encode("utf-8")) / 1e6
+    return {
+        "seconds": best,
+        "mb_per_s": megabytes / best if best > 0 else 0.0,
+        "chunks": chunk_count,
+        "chunks_per_s": chunk_count / best if best > 0 else 0.0,
+        "avg_chunk_chars": total_chars / chunk_count if chunk_count else 0.0
+    }
+
+
+def _current_rss_mb() -> float:
+    """Resident set size now (Linux /proc), falling back to the peak so far"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def measure_parse_memory(variant: str, path: str, chunk_size: int = 300) -> Dict[str, Any]:
+    """Parse `path` with one of PARSE_MEMORY_VARIANTS; run in a fresh process for a meaningful peak RSS"""
+    filename = os.path.basename(path)
+    chunker = Chunker(chunk_size)
+    baseline = _current_rss_mb()
+    start = time.perf_counter()
+    if variant == "legacy read + re.split":
+        with open(path, "r", encoding="utf-8") as file:
+            chunks = legacy_parse(file.read(), filename, chunk_size)
+        chunk_count = len(chunks)
+    elif variant == "read + Chunker.parse":
+        with open(path, "r", encoding="utf-8") as file:
+            chunks = list(chunker.parse(file.read(), filename))
+        chunk_count = len(chunks)
+    elif variant == "mmap Chunker.parse_file":
+        chunks = list(chunker.parse_file(path, filename))
+        chunk_count = len(chunks)
+    elif variant == "mmap Chunker.parse_file, streamed":
+        chunk_count = sum(1 for _ in chunker.parse_file(path, filename))
+    else:
+        raise ValueError(f"Unknown variant {variant!r}; expected one of {PARSE_MEMORY_VARIANTS}")
+    seconds = time.perf_counter() - start
+    return {
+        "variant": variant,
+        "seconds": seconds,
+        "chunks": chunk_count,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_delta_mb": max(0.0, _peak_rss_mb() - baseline)
+    }
+
+
+def measure_parse_memory_isolated(variant: str, path: str, chunk_size: int = 300) -> Dict[str, Any]:
+    """measure_parse_memory in a freshly spawned process"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(measure_parse_memory, variant, path, chunk_size).result()
+
+
+def _build_records(variant: str, contents: List[str], filenames: List[str]) -> Any:
+    """Chunks (or search results) over the given contents in one of RECORD_MEMORY_VARIANTS"""
+    n_files = len(filenames)
+    if variant == "chunk dicts, shared strings":
+        return [{"content": content, "filename": filenames[i % n_files], "access_level": "user",
+                 "chunk_id": i, "document_type": "policy"} for i, content in enumerate(contents)]
+    if variant == "chunk dicts, per-row strings":
+        # What decoding payloads from JSON or a database client gives: fresh strings per row
+        return [{"content": content, "filename": "".join(filenames[i % n_files]), "access_level": "".join("user"),
+                 "chunk_id": i, "document_type": "".join("policy")} for i, content in enumerate(contents)]
+    if variant == "Chunk records":
+        return [Chunk(content, "".join(filenames[i % n_files]), "".join("user"), i, "".join("policy"))
+                for i, content in enumerate(contents)]
+    if variant == "ChunkBatch columns":
+        batch = ChunkBatch()
+        for i, content in enumerate(contents):
+            batch.append({"content": content, "filename": "".join(filenames[i % n_files]),
+                          "access_level": "".join("user"), "chunk_id": i, "document_type": "".join("policy")})
+        return batch
+    search_time = 0.0123
+    if variant == "result dicts":
+        return [{"content": content, "filename": "".join(filenames[i % n_files]), "access_level": "".join("user"),
+                 "chunk_id": i, "document_type": "".join("policy"), "score": 0.5 + i * 1e-9,
+                 "search_time": search_time + 0.0}
+                for i, content in enumerate(contents)]
+    if variant == "SearchResult records":
+        return [SearchResult(content, "".join(filenames[i % n_files]), "".join("user"), i, "".join("policy"),
+                             0.5 + i * 1e-9, search_time) for i, content in enumerate(contents)]
+    raise ValueError(f"Unknown variant {variant!r}; expected one of {RECORD_MEMORY_VARIANTS}")
+
+
+def measure_record_memory(variant: str, count: int, file_count: int = 1000) -> Dict[str, Any]:
+    """
+    Bytes per chunk held by one representation, measured with tracemalloc. Chunk text
+    is allocated before tracing starts, so this is the per-chunk overhead on top of it
+    """
+    contents = [f"chunk text {i}" for i in range(count)]
+    filenames = [f"policy_export_{i:05d}.txt" for i in range(file_count)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = _build_records(variant, contents, filenames)
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del records
+    return {
+        "variant": variant,
+        "chunks": count,
+        "bytes_per_chunk": held / count,
+        "total_mb": held / 1e6
+    }
@@ -0,0 +1,197 @@
+"""
+Change manifest for incremental ingestion.
+Tracks a hash per source file and per chunk so re-ingestion only touches
+new or changed chunks and deletes the ones that disappeared.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Tuple, Iterable, Optional
+
+# Fixed namespace so point IDs are stable across runs and machines
+POINT_ID_NAMESPACE = uuid.UUID("6f1c3a52-8d4e-4b7a-9a35-2f0e5c8b7d11")
+
+
+def point_id(filename: str, access_level: str, chunk_id: int) -> str:
+    """Deterministic point/object ID for a chunk"""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{filename}/{access_level}/{chunk_id}"))
+
+
+def content_hash(data: Any) -> str:
+    """sha256 of a string or bytes"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    sha256 of a file's bytes, read in blocks; equals content_hash of its text for
+    UTF-8 files with LF line endings
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(chunk: Dict[str, Any]) -> str:
+    """Hash of everything stored for a chunk, so metadata changes are picked up too"""
+    return content_hash(json.dumps(dict(chunk), sort_keys=True, ensure_ascii=False))
+
+
+@dataclass
+class FilePlan:
+    """
+    What has to be written and deleted to bring one file up to date. A streamed
+    plan (add_chunk per parsed chunk, then finish) leaves `upserts` empty and
+    hands each new or changed chunk back to the caller instead
+    """
+    filename: str
+    file_hash: str
+    upserts: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    stale_ids: List[str] = field(default_factory=list)
+    chunk_hashes: Dict[str, str] = field(default_factory=dict)
+    existing_ids: set = field(default_factory=set)
+    previous_hashes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def unchanged(self) -> int:
+        return len(self.chunk_hashes) - len(self.upserts)
+
+    def add_chunk(self, chunk: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Record a parsed chunk; returns its (point ID, chunk) if it is new or changed"""
+        pid = point_id(self.filename, chunk["access_level"], chunk["chunk_id"])
+        digest = chunk_hash(chunk)
+        self.chunk_hashes[pid] = digest
+        if self.previous_hashes.get(pid) != digest:
+            return pid, chunk
+        return None
+
+    def finish(self):
+        """Once every chunk is added: the recorded chunks that were not seen again are stale"""
+        self.stale_ids = [pid for pid in self.previous_hashes if pid not in self.chunk_hashes]
+
+
+class IngestManifest:
+    def __init__(self, path: str, signature: str = "", embedding: str = ""):
+        """
+        Load the manifest; `signature` identifies the chunking settings it was built with
+        and `embedding` the embedder whose vectors were stored (see Embedder.signature)
+        """
+        self.path = path
+        self.signature = signature
+        self.embedding = embedding
+        # Set when the stored vectors came from another embedder; nothing recorded is reusable then
+        self.embedding_changed = False
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+                self.files = data.get("files", {})
+                if self.files and data.get("embedding", "") != embedding:
+                    # Unchanged chunks would keep the old model's vectors, so start over
+                    self.embedding_changed = True
+                    self.files = {}
+                elif data.get("signature") != signature:
+                    # Chunking changed: keep chunk hashes but force every file to be re-chunked
+                    for entry in self.files.values():
+                        entry["file_hash"] = None
+            except Exception as e:
+                print(f"Error loading ingest manifest {path}: {e}")
+                self.files = {}
+
+    def reset(self):
+        """Forget everything (the target collection was recreated)"""
+        self.files = {}
+
+    def is_unchanged(self, filename: str, file_hash: str) -> bool:
+        """True if the file was fully ingested with exactly this content"""
+        entry = self.files.get(filename)
+        return entry is not None and entry.get("file_hash") == file_hash
+
+    def changed_files(self, paths: Iterable[Any]) -> Tuple[List[Tuple[Any, str]], int]:
+        """(path, file_hash) of every file that is new or changed, and how many were unchanged"""
+        changed = []
+        unchanged = 0
+        for path in paths:
+            try:
+                file_hash = hash_file(path)
+            except OSError as e:
+                print(f"Error reading {os.path.basename(path)}: {e}")
+                continue
+            if self.is_unchanged(os.path.basename(path), file_hash):
+                unchanged += 1
+            else:
+                changed.append((path, file_hash))
+        return changed, unchanged
+
+    def start_plan(self, filename: str, file_hash: str) -> FilePlan:
+        """Empty plan for a file, diffed against its recorded chunk hashes as chunks are added"""
+        previous = self.files.get(filename, {}).get("chunks", {})
+        return FilePlan(filename=filename, file_hash=file_hash, existing_ids=set(previous), previous_hashes=previous)
+
+    def plan_file(self, filename: str, file_hash: str, chunks: Iterable[Dict[str, Any]]) -> FilePlan:
+        """Diff freshly parsed chunks against the recorded chunk hashes"""
+        plan = self.start_plan(filename, file_hash)
+        for chunk in chunks:
+            upsert = plan.add_chunk(chunk)
+            if upsert is not None:
+                plan.upserts.append(upsert)
+        plan.finish()
+        return plan
+
+    def commit(self, plan: FilePlan, failed_ids: Iterable[str] = ()):
+        """Record a written plan; failed chunks are left out so the next run retries them"""
+        failed = set(failed_ids)
+        previous = self.files.get(plan.filename, {}).get("chunks", {})
+        chunks = {}
+        for pid, digest in plan.chunk_hashes.items():
+            if pid not in failed:
+                chunks[pid] = digest
+            elif pid in previous:
+                # The old version of this chunk is still stored
+                chunks[pid] = previous[pid]
+        self.files[plan.filename] = {
+            "file_hash": None if failed else plan.file_hash,
+            "chunks": chunks
+        }
+
+    def removed_files(self, current_filenames: Iterable[str]) -> List[str]:
+        """Files in the manifest that are no longer in the data folder"""
+        current = set(current_filenames)
+        return [name for name in self.files if name not in current]
+
+    def forget_file(self, filename: str) -> List[str]:
+        """Drop a file from the manifest and return the IDs that must be deleted"""
+        entry = self.files.pop(filename, None)
+        return list(entry["chunks"]) if entry else []
+
+    def save(self):
+        """Write the manifest atomically"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump({"signature": self.signature, "embedding": self.embedding, "files": self.files}, file)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving ingest manifest {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Number of tracked files and chunks"""
+        return {
+            "files": len(self.files),
+            "chunks": sum(len(entry["chunks"]) for entry in self.files.values())
+        }
+
+
+def default_manifest_path(backend: str, collection_name: str) -> str:
+    """Per-collection manifest file in the working directory"""
+    return f".ingest_manifest_{backend}_{collection_name.lower()}.json"
+
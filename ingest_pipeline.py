@@ -0,0 +1,353 @@
+"""
+Staged streaming pipeline for document ingestion.
+Stages run in their own worker threads and are connected by bounded queues,
+so a slow stage applies backpressure upstream and memory stays flat.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+from ingest_manifest import hash_file
+
+_DONE = object()
+
+
+@dataclass
+class StageConfig:
+    """Worker count and input queue size for one stage"""
+    workers: int = 1
+    queue_size: int = 8
+
+
+@dataclass
+class PipelineConfig:
+    """Per-stage settings for streaming ingestion"""
+    read: StageConfig = field(default_factory=lambda: StageConfig(workers=2, queue_size=16))
+    parse: StageConfig = field(default_factory=lambda: StageConfig(workers=2, queue_size=8))
+    embed: StageConfig = field(default_factory=lambda: StageConfig(workers=4, queue_size=8))
+    upsert: StageConfig = field(default_factory=lambda: StageConfig(workers=2, queue_size=8))
+    batch_size: int = 64
+
+
+@dataclass
+class Stage:
+    """A pipeline stage; `func` maps one item to zero or more output items"""
+    name: str
+    func: Callable[[Any], Optional[Iterable[Any]]]
+    config: StageConfig
+
+
+class StageStats:
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._lock = threading.Lock()
+
+    def record(self, outputs: int, busy: float, depth: int, failed: bool = False):
+        with self._lock:
+            self.items_in += 1
+            self.items_out += outputs
+            self.busy_seconds += busy
+            self.errors += int(failed)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self._depth_total += depth
+            self._depth_samples += 1
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "throughput_per_s": self.items_in / wall_seconds if wall_seconds > 0 else 0.0,
+            "busy_seconds": self.busy_seconds,
+            # Fraction of the stage's worker capacity spent working
+            "utilization": self.busy_seconds / (wall_seconds * self.workers) if wall_seconds > 0 else 0.0,
+            "avg_queue_depth": self._depth_total / self._depth_samples if self._depth_samples else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_size": self.queue_size
+        }
+
+
+class StreamingPipeline:
+    def __init__(self, stages: List[Stage]):
+        """Connect stages in order with bounded queues"""
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, stage.config.queue_size)) for stage in stages]
+        self.stats = [StageStats(stage.name, stage.config.workers, stage.config.queue_size) for stage in stages]
+        self.wall_seconds = 0.0
+
+    def _worker(self, index: int, remaining: List[int], lock: threading.Lock):
+        stage = self.stages[index]
+        stats = self.stats[index]
+        in_queue = self.queues[index]
+        out_queue = self.queues[index + 1] if index + 1 < len(self.queues) else None
+
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            depth = in_queue.qsize()
+            outputs = 0
+            failed = False
+            start = time.perf_counter()
+            try:
+                results = stage.func(item)
+                for result in results or ():
+                    outputs += 1
+                    if out_queue is not None:
+                        # Blocks while the next stage is behind (backpressure)
+                        out_queue.put(result)
+            except Exception as e:
+                failed = True
+                print(f"Error in {stage.name} stage: {e}")
+            stats.record(outputs, time.perf_counter() - start, depth, failed)
+
+        # The last worker of a stage to finish tells every worker of the next stage to stop
+        with lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last and out_queue is not None:
+            for _ in range(self.stages[index + 1].config.workers):
+                out_queue.put(_DONE)
+
+    def run(self, source: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Feed `source` through every stage and return per-stage statistics"""
+        lock = threading.Lock()
+        remaining = [max(1, stage.config.workers) for stage in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(remaining[index]):
+                thread = threading.Thread(
+                    target=self._worker, args=(index, remaining, lock),
+                    name=f"{stage.name}-{n}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        start = time.perf_counter()
+        for item in source:
+            self.queues[0].put(item)
+        for _ in range(remaining[0]):
+            self.queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        self.wall_seconds = time.perf_counter() - start
+
+        return [stats.to_dict(self.wall_seconds) for stats in self.stats]
+
+
+def print_pipeline_report(report: List[Dict[str, Any]], wall_seconds: float):
+    """Print per-stage throughput and queue depth"""
+    print(f"\nPipeline stages ({wall_seconds:.2f}s wall time):")
+    print(f"  {'stage':<8} {'workers':>7} {'items':>7} {'items/s':>9} {'util':>6} {'avg q':>6} {'max q':>6} {'errors':>6}")
+    for stage in report:
+        print(f"  {stage['stage']:<8} {stage['workers']:>7} {stage['items_in']:>7} "
+              f"{stage['throughput_per_s']:>9.1f} {stage['utilization']:>6.0%} "
+              f"{stage['avg_queue_depth']:>6.1f} {stage['max_queue_depth']:>3}/{stage['queue_size']:<2} "
+              f"{stage['errors']:>6}")
+
+
+class FileTracker:
+    """
+    Counts outstanding batches per file so a file's manifest entry is only
+    committed once every one of its batches has been written.
+    """
+
+    def __init__(self, on_complete: Callable[[Any, List[str]], None]):
+        self.on_complete = on_complete
+        self._pending: Dict[str, int] = {}
+        self._failed: Dict[str, List[str]] = {}
+        self._plans: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def start(self, plan: Any):
+        """Track a file whose batches are still being produced; the producer holds one pending slot"""
+        with self._lock:
+            self._plans[plan.filename] = plan
+            self._pending[plan.filename] = 1
+            self._failed[plan.filename] = []
+
+    def add_batch(self, filename: str):
+        with self._lock:
+            self._pending[filename] += 1
+
+    def finish(self, filename: str, failed_ids: List[str]):
+        """A batch is written (or the producer is done); the last one commits the file"""
+        with self._lock:
+            self._failed[filename].extend(failed_ids)
+            self._pending[filename] -= 1
+            if self._pending[filename] > 0:
+                return
+            plan = self._plans.pop(filename)
+            failed = self._failed.pop(filename)
+            del self._pending[filename]
+        if plan is not None:
+            self.on_complete(plan, failed)
+
+    def abandon(self, filename: str):
+        """The producer failed: forget the file once its in-flight batches are done, without committing"""
+        with self._lock:
+            self._plans[filename] = None
+        self.finish(filename, [])
+
+
+class StreamingIngest:
+    """
+    read -> parse/chunk -> [embed] -> write, with incremental-manifest bookkeeping.
+
+    parse_fn(file_path) returns or yields the file's chunks (a generator is
+    consumed a batch at a time, so a large file is never held whole), embed_fn(batch) turns
+    [(id, chunk)] into (items to write, failed ids), write_fn(items) writes them
+    and returns failed ids, and delete_fn(ids) removes stale chunks. Without an
+    embed_fn the (id, chunk) pairs go straight to write_fn.
+    """
+
+    def __init__(self, manifest: Any, parse_fn: Callable, write_fn: Callable, delete_fn: Callable,
+                 embed_fn: Optional[Callable] = None, config: Optional[PipelineConfig] = None):
+        self.manifest = manifest
+        self.parse_fn = parse_fn
+        self.write_fn = write_fn
+        self.delete_fn = delete_fn
+        self.embed_fn = embed_fn
+        self.config = config or PipelineConfig()
+        self._lock = threading.Lock()
+        self.counts = {"files": 0, "skipped_files": 0, "chunks": 0, "written": 0, "failed": 0, "deleted": 0}
+        self.tracker = FileTracker(self._commit)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counts[key] += n
+
+    def _commit(self, plan: Any, failed_ids: List[str]):
+        with self._lock:
+            self.manifest.commit(plan, failed_ids)
+
+    def _read(self, file_path):
+        file_hash = hash_file(file_path)
+        with self._lock:
+            unchanged = self.manifest.is_unchanged(file_path.name, file_hash)
+        if unchanged:
+            self._count("skipped_files")
+            return
+        yield file_path, file_hash
+
+    def _parse(self, item):
+        file_path, file_hash = item
+        filename = file_path.name
+        with self._lock:
+            plan = self.manifest.start_plan(filename, file_hash)
+        self.tracker.start(plan)
+        self._count("files")
+
+        size = self.config.batch_size
+        batch = []
+        chunks = 0
+        try:
+            # Diff and batch chunks as the parser yields them; a full queue pauses the parser
+            for chunk in self.parse_fn(file_path):
+                chunks += 1
+                upsert = plan.add_chunk(chunk)
+                if upsert is not None:
+                    batch.append(upsert)
+                if len(batch) == size:
+                    self.tracker.add_batch(filename)
+                    yield filename, batch, []
+                    batch = []
+            if batch:
+                self.tracker.add_batch(filename)
+                yield filename, batch, []
+
+            # Stale chunks are only known once the whole file has been seen
+            plan.finish()
+            if plan.stale_ids:
+                self.delete_fn(plan.stale_ids)
+                self._count("deleted", len(plan.stale_ids))
+        except Exception:
+            # Left out of the manifest, so the next run redoes the whole file
+            self.tracker.abandon(filename)
+            raise
+        finally:
+            self._count("chunks", chunks)
+        self.tracker.finish(filename, [])
+
+    def _embed(self, item):
+        filename, batch, failed_ids = item
+        try:
+            items, embed_failed = self.embed_fn(batch)
+        except Exception as e:
+            print(f"Error embedding batch from {filename}: {e}")
+            items, embed_failed = [], [object_id for object_id, _ in batch]
+        yield filename, items, failed_ids + list(embed_failed)
+
+    def _write(self, item):
+        filename, items, failed_ids = item
+        write_failed = []
+        try:
+            if items:
+                write_failed = list(self.write_fn(items) or [])
+        except Exception as e:
+            print(f"Error writing batch from {filename}: {e}")
+            write_failed = [self._item_id(written) for written in items]
+        self._count("written", len(items) - len(write_failed))
+        self._count("failed", len(failed_ids) + len(write_failed))
+        self.tracker.finish(filename, failed_ids + write_failed)
+        return ()
+
+    @staticmethod
+    def _item_id(item: Any) -> str:
+        """IDs of written items: (id, chunk) pairs or objects with an `id` attribute"""
+        return str(item[0]) if isinstance(item, tuple) else str(item.id)
+
+    def run(self, txt_files: List[Any]) -> Dict[str, Any]:
+        """Ingest the given files and print the summary and per-stage report"""
+        config = self.config
+        stages = [
+            Stage("read", self._read, config.read),
+            Stage("parse", self._parse, config.parse),
+        ]
+        if self.embed_fn is not None:
+            stages.append(Stage("embed", self._embed, config.embed))
+        stages.append(Stage("upsert", self._write, config.upsert))
+
+        pipeline = StreamingPipeline(stages)
+        report = pipeline.run(txt_files)
+
+        # Remove chunks of files that were deleted from the folder
+        for filename in self.manifest.removed_files(f.name for f in txt_files):
+            stale_ids = self.manifest.forget_file(filename)
+            try:
+                self.delete_fn(stale_ids)
+                self._count("deleted", len(stale_ids))
+                print(f"Removed {len(stale_ids)} chunks of deleted file {filename}")
+            except Exception as e:
+                print(f"Error removing chunks of {filename}: {e}")
+        self.manifest.save()
+
+        counts = self.counts
+        wall = pipeline.wall_seconds
+        print(f"\nIngestion complete!")
+        print(f"Files processed: {counts['files']} (unchanged skipped: {counts['skipped_files']})")
+        print(f"Total chunks processed: {counts['chunks']}")
+        print(f"Chunks written: {counts['written']}")
+        if counts["deleted"]:
+            print(f"Stale chunks deleted: {counts['deleted']}")
+        if counts["failed"]:
+            print(f"Chunks failed: {counts['failed']}")
+        print(f"Time taken: {wall:.2f} seconds")
+        print(f"Speed: {counts['chunks'] / wall if wall > 0 else 0:.2f} chunks/second")
+        print_pipeline_report(report, wall)
+
+        return {**counts, "seconds": wall, "stages": report}
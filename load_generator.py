@@ -0,0 +1,139 @@
+"""
+Concurrent load generator for search() backends.
+Closed loop: N workers issue queries back to back at fixed concurrency.
+Open loop: queries are scheduled at a target QPS regardless of how fast the
+backend answers; latency is measured from the scheduled start so queueing
+delay is included (no coordinated omission).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+
+from bench_stats import summarize_latencies
+
+
+class _Recorder:
+    def __init__(self):
+        self.samples: List[int] = []
+        self.errors = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def call(self, search_fn: Callable[[str], Any], query: str, start_ns: Optional[int] = None):
+        start_ns = start_ns or time.perf_counter_ns()
+        failed = False
+        try:
+            # search() swallows backend errors and returns [], so empty results count as errors
+            failed = not search_fn(query)
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter_ns() - start_ns
+        with self._lock:
+            self.requests += 1
+            self.errors += int(failed)
+            self.samples.append(elapsed)
+
+    def result(self, mode: str, level: float, duration_s: float) -> Dict[str, Any]:
+        return {
+            "mode": mode,
+            "level": level,
+            "duration_s": duration_s,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "achieved_qps": self.requests / duration_s if duration_s > 0 else 0.0,
+            "latency": summarize_latencies(self.samples)
+        }
+
+
+def run_closed_loop(search_fn: Callable[[str], Any], queries: List[str], concurrency: int,
+                    duration_s: float) -> Dict[str, Any]:
+    """Run `concurrency` workers that each issue the next query as soon as the last one returns"""
+    recorder = _Recorder()
+    deadline = time.perf_counter() + duration_s
+
+    def worker(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            recorder.call(search_fn, queries[i % len(queries)])
+            i += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.result("closed", concurrency, time.perf_counter() - start)
+
+
+def run_open_loop(search_fn: Callable[[str], Any], queries: List[str], target_qps: float,
+                  duration_s: float, max_workers: int = 64) -> Dict[str, Any]:
+    """Issue queries at a fixed arrival rate and measure latency from each scheduled start"""
+    recorder = _Recorder()
+    interval_ns = int(1e9 / target_qps)
+    total = max(1, int(target_qps * duration_s))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        t0 = time.perf_counter_ns()
+        for i in range(total):
+            scheduled = t0 + i * interval_ns
+            delay = scheduled - time.perf_counter_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            executor.submit(recorder.call, search_fn, queries[i % len(queries)], scheduled)
+    result = recorder.result("open", target_qps, time.perf_counter() - start)
+    result["target_qps"] = target_qps
+    return result
+
+
+def find_saturation(steps: List[Dict[str, Any]], min_gain: float = 0.05,
+                    p99_growth: float = 3.0) -> Optional[Dict[str, Any]]:
+    """
+    The step where the system stops scaling.
+
+    Closed loop: the first step after which adding concurrency raises throughput by
+    less than `min_gain`. Open loop: the last step whose achieved QPS still kept up
+    with the target (within 10%) and whose p99 stayed under `p99_growth` times the
+    first step's p99.
+    """
+    if not steps:
+        return None
+
+    if steps[0]["mode"] == "closed":
+        for previous, current in zip(steps, steps[1:]):
+            if previous["achieved_qps"] <= 0:
+                return previous
+            if (current["achieved_qps"] - previous["achieved_qps"]) / previous["achieved_qps"] < min_gain:
+                return previous
+        return steps[-1]
+
+    baseline_p99 = steps[0]["latency"].get("p99_ms", 0.0)
+    saturated = None
+    for step in steps:
+        kept_up = step["achieved_qps"] >= 0.9 * step["target_qps"]
+        p99_ok = step["latency"].get("p99_ms", 0.0) <= p99_growth * baseline_p99
+        if not (kept_up and p99_ok):
+            break
+        saturated = step
+    return saturated
+
+
+def run_load_test(search_fn: Callable[[str], Any], queries: List[str], mode: str, levels: List[float],
+                  duration_s: float, max_workers: int = 64) -> Dict[str, Any]:
+    """Step through concurrency levels (closed) or target QPS values (open)"""
+    steps = []
+    for level in levels:
+        if mode == "closed":
+            step = run_closed_loop(search_fn, queries, int(level), duration_s)
+        else:
+            step = run_open_loop(search_fn, queries, float(level), duration_s, max_workers)
+        latency = step["latency"]
+        print(f"    {mode} {level:>6g}: {step['achieved_qps']:8.1f} qps, "
+              f"p50 {latency.get('p50_ms', 0):7.2f}ms, p99 {latency.get('p99_ms', 0):7.2f}ms, "
+              f"errors {step['error_rate']:.1%}")
+        steps.append(step)
+    return {"mode": mode, "steps": steps, "saturation": find_saturation(steps)}
@@ -0,0 +1,320 @@
+"""
+Lightweight in-process metrics: counters and fixed-bucket latency histograms,
+exported in the Prometheus text format as a file dump or from a /metrics HTTP
+endpoint.
+
+Every RAG system records the same families, labelled with its name:
+- rag_search_stage_seconds{system, stage}: keyword, embed, cache_lookup,
+  vector_search, postprocess, and total (the whole search() call, result cache included);
+  search_batch() records batch_keyword, batch_embed, batch_vector_search,
+  batch_postprocess and batch_total once per batch
+- rag_search_requests_total{system, path}: how each search was answered
+  (result_cache, semantic_cache, keyword, vector, empty, error), per query for batches too
+- rag_ingest_stage_seconds{system, stage}: parse, embed, upsert, delete (per file
+  or batch), flush (Weaviate's batch drain) and total (per ingest run)
+- rag_ingest_chunks_total{system, result}: written, failed, deleted
+
+Weaviate vectorizes server-side, so its embedding time is part of vector_search
+(search) and of upsert/flush (ingest).
+
+    python -c "from metrics import REGISTRY; print(REGISTRY.render())"
+"""
+
+import bisect
+import collections
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
+
+# Seconds; 100us to 30s covers a cached lookup up to a slow embedding batch
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in sorted(self.values().items())]
+
+
+class _Series:
+    """Bucket counts (last one is +Inf), sum and count for one label combination"""
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Fixed-bucket histogram per label combination; quantiles are interpolated within a bucket"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        # First bucket whose upper bound is >= value (Prometheus buckets are "le")
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = _Series(len(self.buckets))
+            series.counts[index] += 1
+            series.total += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observe the wall time of the with-block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        rank = q * series.count
+        cumulative = 0
+        for index, count in enumerate(series.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    # Past the last bound there is nothing to interpolate towards
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return 0.0
+
+    def summaries(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """count, mean and estimated p50/p99 (ms) per label combination"""
+        with self._lock:
+            return {
+                labels: {
+                    "count": series.count,
+                    "total_ms": series.total * 1000,
+                    "mean_ms": series.total / series.count * 1000 if series.count else 0.0,
+                    "p50_ms": self._quantile(series, 0.50) * 1000,
+                    "p99_ms": self._quantile(series, 0.99) * 1000
+                }
+                for labels, series in self._series.items()
+            }
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((labels, list(series.counts), series.total, series.count)
+                              for labels, series in self._series.items())
+        lines = []
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: "MetricsRegistry" = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsRegistry:
+    """Named counters and histograms; asking for an existing name returns the same metric"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, label_names: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, label_names, **kwargs)
+            elif not isinstance(metric, cls) or metric.label_names != tuple(label_names):
+                raise ValueError(f"metric {name!r} already registered as a {metric.kind} "
+                                 f"with labels {metric.label_names}")
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Dump render() to a file, replaced atomically (e.g. for node_exporter's textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int = 9464, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serve GET /metrics from a background thread; stop it with shutdown() and server_close()"""
+        handler = type("_RegistryHandler", (_MetricsHandler,), {"registry": self})
+        server = ThreadingHTTPServer((host, port), handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+# Process-wide registry the RAG systems record into by default
+REGISTRY = MetricsRegistry()
+
+
+class RAGMetrics:
+    """
+    The search and ingest metric families, bound to one system label. Instances of
+    the same system share their series (as in Prometheus), so get_stats covers all of them
+    """
+
+    def __init__(self, system: str, registry: Optional[MetricsRegistry] = None):
+        registry = registry or REGISTRY
+        self.system = system
+        self.search_seconds = registry.histogram(
+            "rag_search_stage_seconds", "Search latency per stage", ("system", "stage"))
+        self.search_requests = registry.counter(
+            "rag_search_requests_total", "Searches by how they were answered", ("system", "path"))
+        self.ingest_seconds = registry.histogram(
+            "rag_ingest_stage_seconds", "Ingest latency per stage (per file or batch; total per run)",
+            ("system", "stage"))
+        self.ingest_chunks = registry.counter(
+            "rag_ingest_chunks_total", "Chunks handled by ingest, by result", ("system", "result"))
+
+    def search_stage(self, stage: str):
+        """Context manager timing one search stage"""
+        return self.search_seconds.time(self.system, stage)
+
+    def ingest_stage(self, stage: str):
+        """Context manager timing one ingest stage"""
+        return self.ingest_seconds.time(self.system, stage)
+
+    def observe_ingest(self, stage: str, seconds: float):
+        self.ingest_seconds.observe(seconds, self.system, stage)
+
+    def count_search(self, path: str, count: int = 1):
+        if count:
+            self.search_requests.inc(self.system, path, amount=count)
+
+    def count_searches(self, paths: Iterable[str]):
+        """count_search for each query of a batch"""
+        for path, count in collections.Counter(paths).items():
+            self.count_search(path, count)
+
+    def count_chunks(self, result: str, count: int):
+        if count:
+            self.ingest_chunks.inc(self.system, result, amount=count)
+
+    def timed_iter(self, stage: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield from `items`, timing each step as an ingest stage (e.g. waiting on a parser pool)"""
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe_ingest(stage, time.perf_counter() - start)
+            yield item
+
+    def timed_stream(self, stage: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield from `items`, observing the total time spent producing them as one ingest stage sample"""
+        iterator = iter(items)
+        total = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    total += time.perf_counter() - start
+                yield item
+        finally:
+            self.observe_ingest(stage, total)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-stage count, mean and estimated p50/p99 for search and ingest, plus the counters"""
+        def for_system(values: Dict[Tuple[str, ...], Any]) -> Dict[str, Any]:
+            return {labels[1]: value for labels, value in sorted(values.items()) if labels[0] == self.system}
+
+        return {
+            "search_stages": for_system(self.search_seconds.summaries()),
+            "search_requests": for_system(self.search_requests.values()),
+            "ingest_stages": for_system(self.ingest_seconds.summaries()),
+            "ingest_chunks": for_system(self.ingest_chunks.values())
+        }
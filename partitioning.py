@@ -0,0 +1,106 @@
+"""
+Role-partitioned storage layout.
+
+In the "shared" layout every chunk lives in one collection and each query is
+filtered per point on access_level. In the "partitioned" layout each access level
+has its own partition (a Qdrant collection, a Weaviate tenant): a user query
+searches only the user partition with no filter at all, and an admin query fans
+out to every partition and merges the per-partition top-k lists by score.
+"""
+
+import heapq
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
+
+from bench_stats import summarize_latencies
+
+LAYOUTS = ("shared", "partitioned")
+ACCESS_LEVELS = ("user", "admin")
+
+
+def check_layout(layout: str) -> str:
+    """Validate a layout name"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}, got {layout!r}")
+    return layout
+
+
+def partitions_for_role(user_role: str) -> Tuple[str, ...]:
+    """Partitions a role may read: admins see every access level, everyone else only 'user'"""
+    if user_role.lower() == "admin":
+        return ACCESS_LEVELS
+    return ("user",)
+
+
+def merge_top_k(result_lists: Iterable[Sequence[Any]], limit: int, key: Callable[[Any], float]) -> List[Any]:
+    """The `limit` best items (highest key first) across per-partition result lists"""
+    return heapq.nlargest(limit, (item for results in result_lists for item in results), key=key)
+
+
+class PartitionRouter:
+    """
+    Runs one search per partition (concurrently when a request fans out) and keeps
+    routing statistics: searches per partition, routing latency (dispatch until
+    every partition has answered) and merge time
+    """
+
+    def __init__(self, window: int = 1024):
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._route_ns = deque(maxlen=window)
+        self._merge_ns = deque(maxlen=window)
+        self._searches = Counter()
+        self._requests = 0
+        self._fan_out_requests = 0
+
+    def search(self, partitions: Sequence[str], search_fn: Callable[[str], Any]) -> List[Any]:
+        """search_fn(partition) for each partition, results in partition order"""
+        start_ns = time.perf_counter_ns()
+        if len(partitions) == 1:
+            results = [search_fn(partitions[0])]
+        else:
+            if self._pool is None:
+                with self._lock:
+                    if self._pool is None:
+                        self._pool = ThreadPoolExecutor(max_workers=len(ACCESS_LEVELS),
+                                                        thread_name_prefix="partition-search")
+            results = list(self._pool.map(search_fn, partitions))
+        elapsed = time.perf_counter_ns() - start_ns
+        with self._lock:
+            self._requests += 1
+            self._fan_out_requests += len(partitions) > 1
+            self._searches.update(partitions)
+            self._route_ns.append(elapsed)
+        return results
+
+    def merge(self, result_lists: Sequence[Sequence[Any]], limit: int, key: Callable[[Any], float]) -> List[Any]:
+        """merge_top_k, timed; a single partition's list is returned as is"""
+        if len(result_lists) == 1:
+            return list(result_lists[0][:limit])
+        start_ns = time.perf_counter_ns()
+        merged = merge_top_k(result_lists, limit, key)
+        elapsed = time.perf_counter_ns() - start_ns
+        with self._lock:
+            self._merge_ns.append(elapsed)
+        return merged
+
+    def get_stats(self, partition_sizes: Dict[str, int]) -> Dict[str, Any]:
+        """Partition sizes, searches per partition and routing/merge latency (recent window)"""
+        with self._lock:
+            return {
+                "partition_sizes": dict(partition_sizes),
+                "requests": self._requests,
+                "fan_out_requests": self._fan_out_requests,
+                "searches_per_partition": dict(self._searches),
+                "routing_latency": summarize_latencies(list(self._route_ns)),
+                "merge_overhead": summarize_latencies(list(self._merge_ns))
+            }
+
+    def close(self):
+        """Stop the fan-out threads"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -0,0 +1,125 @@
+"""
+In-process cache of search() results.
+Entries are keyed by (normalized query, role, limit) and bounded by LRU size and
+a TTL. Any ingestion bumps the generation counter, which drops every entry at
+once; results computed under an older generation are never stored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from records import copy_results
+
+
+class QueryResultCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        """Empty cache; ttl_seconds <= 0 means entries only expire by LRU or generation"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        # key -> (stored_at, compute_seconds, results)
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Case- and whitespace-insensitive form of a query"""
+        return " ".join(query.lower().split())
+
+    def make_key(self, query: str, user_role: str, limit: int) -> Tuple[str, str, int]:
+        """The role is part of the key so admin results are never served to users"""
+        return (self.normalize_query(query), user_role.lower(), limit)
+
+    def get(self, query: str, user_role: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Cached results, or None on a miss"""
+        key = self.make_key(query, user_role, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, compute_seconds, results = entry
+                if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_seconds += compute_seconds
+                    return copy_results(results)
+            self.misses += 1
+            return None
+
+    def put(self, query: str, user_role: str, limit: int, results: List[Dict[str, Any]],
+            generation: int, compute_seconds: float):
+        """
+        Store results computed under `generation`. Results computed before an
+        ingestion finished are dropped rather than cached as if they were current.
+        """
+        key = self.make_key(query, user_role, limit)
+        with self._lock:
+            if generation != self.generation or self.max_entries <= 0:
+                return
+            self._entries[key] = (time.monotonic(), compute_seconds, copy_results(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump_generation(self):
+        """Invalidate every cached result (call after the collection changes)"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def clear(self):
+        """Drop every entry without changing the generation"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit ratio, saved latency and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "saved_seconds": self.saved_seconds,
+            "avg_saved_ms": self.saved_seconds * 1000 / self.hits if self.hits else 0.0
+        }
+
+
+def search_with_cache(cache: Optional[QueryResultCache], search_fn: Callable[[str, str, int], List[Dict[str, Any]]],
+                      query: str, user_role: str, limit: int, use_cache: bool = True,
+                      on_hit: Optional[Callable[[], None]] = None) -> List[Dict[str, Any]]:
+    """Serve a search from the cache, or run it and cache non-empty results; on_hit() is called per cache hit"""
+    if cache is None or not use_cache:
+        return search_fn(query, user_role, limit)
+
+    cached = cache.get(query, user_role, limit)
+    if cached is not None:
+        if on_hit is not None:
+            on_hit()
+        return cached
+
+    generation = cache.generation
+    start = time.perf_counter()
+    results = search_fn(query, user_role, limit)
+    # search() returns [] on backend errors, so empty results are never cached
+    if results:
+        cache.put(query, user_role, limit, results, generation, time.perf_counter() - start)
+    return results
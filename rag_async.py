@@ -0,0 +1,316 @@
+"""
+Asyncio counterparts of QdrantRAGSystem and SimpleRAGSystem for the query path.
+
+Each query waits on two network hops (embedding service, then vector DB). With
+async HTTP and the async DB clients, search_many() keeps many queries in flight
+from one thread, so one query's DB round trip overlaps another's embedding call.
+Ingestion stays on the sync systems; these classes search an existing collection
+(or, in the partitioned layout, the same per-role partitions the sync systems write).
+"""
+
+import asyncio
+import time
+from typing import List, Dict, Any, Optional
+
+import weaviate.classes as wvc
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+
+from collection_config import IndexConfig, QuantizationConfig, search_params
+from embedding_cache import EmbeddingCache, async_embed_with_cache
+from embedders import Embedder, HTTPEmbedder
+from embedding_client import AsyncEmbeddingClient, EmbeddingBatch
+from partitioning import ACCESS_LEVELS, check_layout, merge_top_k, partitions_for_role
+from records import SearchResult
+from transport import TransportConfig, qdrant_client_from_config, weaviate_client_from_config
+
+
+class AsyncQdrantRAGSystem:
+    def __init__(self, max_concurrency: int = 32, embedding_cache_path: Optional[str] = ".embedding_cache.sqlite3",
+                 transport: Optional[TransportConfig] = None, quantization: Optional[QuantizationConfig] = None,
+                 index: Optional[IndexConfig] = None, layout: str = "shared",
+                 embedder: Optional[Embedder] = None, embedding_url: str = "http://localhost:8081",
+                 embedding_timeout: float = 30.0, embedding_max_retries: int = 2):
+        """
+        Initialize the async Qdrant client and embedding client
+        
+        Args:
+            max_concurrency: queries (and embedding requests) in flight at once
+            embedding_cache_path: SQLite embedding cache shared with QdrantRAGSystem (None disables it)
+            transport: REST or gRPC, ports, timeout and connection pool size (default: REST on 6333)
+            quantization: the collection's quantization settings, for oversampling/rescoring at search time
+            index: the collection's index settings, for the search-time HNSW ef
+            layout: "shared" or "partitioned", as the collection was written by QdrantRAGSystem
+            embedder: an in-process embedder (local or fake) the collection was written with, run
+                in a worker thread; None calls the HTTP embedding service with async requests
+            embedding_url, embedding_timeout, embedding_max_retries: async HTTP embedding client settings
+        """
+        self.transport = transport or TransportConfig(protocol="rest")
+        self.client = qdrant_client_from_config(self.transport, async_client=True)
+        self.search_params = search_params(index, quantization)
+        if isinstance(embedder, HTTPEmbedder):
+            # Its pooled sync client can't serve the event loop; configure the async one directly
+            raise ValueError("pass embedding_url (and the timeout/retry settings) instead of an HTTPEmbedder")
+        self.embedder = embedder
+        # embedding_model is the cache key, the same as QdrantRAGSystem's for the same model
+        if embedder is None:
+            self.embedding_client = AsyncEmbeddingClient(embedding_url, max_concurrency=max_concurrency,
+                                                         timeout=embedding_timeout, max_retries=embedding_max_retries)
+            self.embedding_model = HTTPEmbedder.model_name
+        else:
+            self.embedding_client = _ThreadedEmbedder(embedder)
+            self.embedding_model = embedder.model_name
+        self.embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
+        self.collection_name = "documents"
+        self.layout = check_layout(layout)
+        self.partition_collections = (
+            {level: f"{self.collection_name}_{level}" for level in ACCESS_LEVELS}
+            if self.layout == "partitioned" else {}
+        )
+        self.max_concurrency = max_concurrency
+    
+    async def get_embeddings(self, texts: List[str]) -> EmbeddingBatch:
+        """Get embeddings, serving repeats from the cache"""
+        return await async_embed_with_cache(self.embedding_client, self.embedding_cache, self.embedding_model, texts)
+    
+    def _role_filter(self, user_role: str) -> Optional[Filter]:
+        """Same access_level filter as QdrantRAGSystem.search (none for admins)"""
+        if user_role.lower() == "admin":
+            return None
+        return Filter(must=[FieldCondition(key="access_level", match=MatchValue(value="user"))])
+    
+    async def search(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
+        """Perform search with role-based access control"""
+        try:
+            start_time = time.time()
+            
+            query_embedding = (await self.get_embeddings([query])).vectors
+            if not query_embedding or query_embedding[0] is None:
+                return []
+            
+            search_results = await self._search_vector(query_embedding[0], user_role, limit)
+            
+            search_time = time.time() - start_time
+            
+            processed_results = []
+            for result in search_results:
+                processed_results.append(SearchResult.from_payload(result.payload, result.score, search_time))
+            
+            return processed_results
+        
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
+    
+    async def _search_vector(self, query_vector: List[float], user_role: str, limit: int) -> List[Any]:
+        """Nearest points for a role: one filtered search, or the role's partitions searched concurrently"""
+        if self.layout == "shared":
+            return await self.client.search(
+                collection_name=self.collection_name,
+                query_vector=query_vector,
+                query_filter=self._role_filter(user_role),
+                search_params=self.search_params,
+                limit=limit,
+                with_payload=True
+            )
+        # Each partition holds a single access level, so no payload filter is needed
+        per_partition = await asyncio.gather(*(
+            self.client.search(
+                collection_name=self.partition_collections[level],
+                query_vector=query_vector,
+                search_params=self.search_params,
+                limit=limit,
+                with_payload=True
+            )
+            for level in partitions_for_role(user_role)
+        ))
+        return merge_top_k(per_partition, limit, key=lambda hit: hit.score)
+    
+    async def search_many(self, queries: List[str], user_role: str = "user", limit: int = 3) -> List[List[Dict[str, Any]]]:
+        """Run many searches concurrently; results are aligned with `queries`"""
+        return await _gather_bounded(self.search, queries, user_role, limit, self.max_concurrency)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get simple statistics"""
+        try:
+            names = list(self.partition_collections.values()) or [self.collection_name]
+            infos = await asyncio.gather(*(self.client.get_collection(name) for name in names))
+            return {
+                "total_chunks": sum(info.points_count or 0 for info in infos),
+                "vector_dimension": infos[0].config.params.vectors.size,
+                "layout": self.layout
+            }
+        except Exception as e:
+            print(f"Error getting stats: {e}")
+            return {"total_chunks": 0}
+    
+    async def close(self):
+        """Close the Qdrant and embedding connections"""
+        await self.embedding_client.close()
+        if self.embedder is not None:
+            self.embedder.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        await self.client.close()
+
+
+class _ThreadedEmbedder:
+    """Async embed() for an in-process Embedder: each batch runs in a worker thread"""
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+
+    async def embed(self, texts: List[str]) -> EmbeddingBatch:
+        return await asyncio.to_thread(self.embedder.embed, texts)
+
+    async def close(self):
+        pass
+
+
+class AsyncSimpleRAGSystem:
+    def __init__(self, max_concurrency: int = 32, transport: Optional[TransportConfig] = None,
+                 layout: str = "shared"):
+        """
+        Create the async Weaviate client; call `await connect()` before searching
+        
+        Args:
+            max_concurrency: queries in flight at once in search_many
+            transport: ports, timeouts and pool size (queries always use the gRPC API)
+            layout: "shared" or "partitioned" (one tenant per access level), as written by SimpleRAGSystem
+        """
+        self.transport = transport or TransportConfig(protocol="grpc")
+        self.client = weaviate_client_from_config(self.transport, async_client=True)
+        self.max_concurrency = max_concurrency
+        self.layout = check_layout(layout)
+        # Same collection names as SimpleRAGSystem
+        self.collection_name = "Document" if self.layout == "shared" else "DocumentPartitioned"
+    
+    async def connect(self):
+        """Open the Weaviate connection"""
+        print("Connecting to Weaviate (async)...")
+        await self.client.connect()
+        print("Connected successfully!")
+    
+    def _role_filter(self, user_role: str):
+        """Server-side access_level filter for a role; admins see everything"""
+        if user_role.lower() == "admin":
+            return None
+        return wvc.query.Filter.by_property("access_level").equal("user")
+    
+    def _documents(self, tenant: Optional[str] = None):
+        """The Document collection, scoped to a tenant in the partitioned layout"""
+        documents_collection = self.client.collections.get(self.collection_name)
+        return documents_collection.with_tenant(tenant) if tenant else documents_collection
+    
+    def _partitions(self) -> List[Optional[str]]:
+        """Tenants to visit for collection-wide operations ([None] in the shared layout)"""
+        return list(ACCESS_LEVELS) if self.layout == "partitioned" else [None]
+    
+    async def search(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
+        """Perform search with role-based access control"""
+        if self.layout == "partitioned":
+            return await self._search_partitions(query, user_role, limit)
+        try:
+            documents_collection = self._documents()
+            response = await documents_collection.query.near_text(
+                query=query,
+                limit=limit,
+                filters=self._role_filter(user_role),
+                return_metadata=wvc.query.MetadataQuery(score=True)
+            )
+            
+            processed_results = []
+            for item in response.objects:
+                processed_results.append(SearchResult.from_payload(item.properties, item.metadata.score if item.metadata.score else 0))
+            
+            return processed_results
+        
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
+    
+    async def _search_partitions(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
+        """Search the role's tenants concurrently (unfiltered: each holds one access level) and merge by distance"""
+        try:
+            responses = await asyncio.gather(*(
+                self._documents(tenant).query.near_text(
+                    query=query,
+                    limit=limit,
+                    return_metadata=wvc.query.MetadataQuery(score=True, distance=True)
+                )
+                for tenant in partitions_for_role(user_role)
+            ))
+            merged = merge_top_k([response.objects for response in responses], limit, key=_closeness)
+            return [
+                SearchResult.from_payload(item.properties, item.metadata.score if item.metadata.score else 0)
+                for item in merged
+            ]
+        
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
+    
+    async def search_many(self, queries: List[str], user_role: str = "user", limit: int = 3) -> List[List[Dict[str, Any]]]:
+        """Run many searches concurrently; results are aligned with `queries`"""
+        return await _gather_bounded(self.search, queries, user_role, limit, self.max_concurrency)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get simple statistics"""
+        try:
+            responses = await asyncio.gather(*(
+                self._documents(tenant).aggregate.over_all(total_count=True) for tenant in self._partitions()
+            ))
+            return {"total_chunks": sum(response.total_count for response in responses), "layout": self.layout}
+        except Exception as e:
+            print(f"Error getting stats: {e}")
+            return {"total_chunks": 0}
+    
+    async def close(self):
+        """Close the Weaviate client connection"""
+        await self.client.close()
+
+
+def _closeness(item: Any) -> float:
+    """Merge key for near_text hits from different tenants (smaller distance is better)"""
+    distance = item.metadata.distance
+    return -distance if distance is not None else float("-inf")
+
+
+async def _gather_bounded(search, queries: List[str], user_role: str, limit: int,
+                          max_concurrency: int) -> List[List[Dict[str, Any]]]:
+    """Run search() for every query with at most `max_concurrency` in flight"""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def run(query: str):
+        async with semaphore:
+            return await search(query, user_role, limit)
+
+    return await asyncio.gather(*(run(query) for query in queries))
+
+
+async def _demo():
+    """Search a handful of queries concurrently against both backends"""
+    queries = [
+        "What is Waveaite?",
+        "How do I contact customer support?",
+        "What are the company policies?",
+        "Tell me about the team members"
+    ]
+
+    qdrant = AsyncQdrantRAGSystem()
+    weaviate_rag = AsyncSimpleRAGSystem()
+    try:
+        await weaviate_rag.connect()
+        for name, rag in (("Qdrant", qdrant), ("Weaviate", weaviate_rag)):
+            start = time.perf_counter()
+            results = await rag.search_many(queries)
+            elapsed = time.perf_counter() - start
+            print(f"\n🔍 {name}: {len(queries)} queries in {elapsed * 1000:.1f}ms")
+            for query, hits in zip(queries, results):
+                print(f"  - {query}: {len(hits)} results")
+    finally:
+        await qdrant.close()
+        await weaviate_rag.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -0,0 +1,429 @@
+import time
+from functools import partial
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+
+import numpy as np
+
+from chunker import Chunker, parse_files
+from embedding_cache import EmbeddingCache, embed_with_cache
+from embedders import Embedder, HTTPEmbedder
+from embedding_client import EmbeddingBatch
+from ingest_manifest import point_id
+from metrics import MetricsRegistry, RAGMetrics
+from query_cache import QueryResultCache, search_with_cache
+from records import ChunkBatch, SearchResult
+from semantic_cache import SemanticCache
+
+class NumpyRAGSystem:
+    """
+    In-process vector store: normalized float32 vectors in one contiguous matrix,
+    cosine top-k as a single matmul + argpartition. Same surface as QdrantRAGSystem.
+    """
+    
+    def __init__(self, embedding_workers: int = 8, embedding_batch_size: int = 64,
+                 embedding_cache_path: Optional[str] = ".embedding_cache.sqlite3",
+                 dimension: Optional[int] = None, initial_capacity: int = 1024,
+                 query_cache_size: int = 1024, query_cache_ttl: float = 300.0,
+                 semantic_cache_threshold: Optional[float] = None, semantic_cache_size: int = 256,
+                 embedder: Optional[Embedder] = None, chunker: Optional[Chunker] = None,
+                 parse_workers: int = 1, metrics: Optional[MetricsRegistry] = None):
+        """
+        Initialize the in-memory store, the embedding client and the search result caches.
+        The matrix width is `dimension`, or the embedder's dimension when None; per-stage
+        timings go to `metrics` (default: the process-wide metrics.REGISTRY)
+        """
+        self.embedder = embedder or HTTPEmbedder("http://localhost:8081", max_workers=embedding_workers)
+        # Cache keys include the model name, so vectors from different embedders never mix
+        self.embedding_model = self.embedder.model_name
+        self.embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
+        self.embedding_batch_size = embedding_batch_size
+        self.chunker = chunker or Chunker(max_size=300)
+        self.parse_workers = parse_workers
+        self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl) if query_cache_size > 0 else None
+        self.semantic_cache = (
+            SemanticCache(semantic_cache_threshold, semantic_cache_size, query_cache_ttl)
+            if semantic_cache_threshold is not None else None
+        )
+        self.metrics = RAGMetrics("numpy", metrics)
+        
+        if dimension is None:
+            dimension = self.embedder.dimension
+        elif self.embedder.dimension and dimension != self.embedder.dimension:
+            raise ValueError(f"dimension {dimension} does not match the embedder "
+                             f"({self.embedding_model}: {self.embedder.dimension})")
+        if not dimension:
+            raise ValueError(f"embedder {self.embedding_model} does not declare a dimension; pass dimension=")
+        self.dimension = dimension
+        self._vectors = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        # Rows visible to the "user" role; admins see every row
+        self._user_mask = np.zeros(initial_capacity, dtype=bool)
+        self._size = 0
+        self._ids: List[str] = []
+        # Chunk fields as columns, row-aligned with _vectors
+        self._payloads = ChunkBatch()
+        self._row_of: Dict[str, int] = {}
+    
+    def get_embeddings(self, texts: List[str]) -> EmbeddingBatch:
+        """Get embeddings from the cache or the transformer service, aligned with the input texts"""
+        batch = embed_with_cache(self.embedder, self.embedding_cache, self.embedding_model, texts)
+        if batch.errors:
+            first_index, first_error = next(iter(batch.errors.items()))
+            print(f"Error getting embeddings for {len(batch.errors)}/{len(texts)} texts "
+                  f"(text {first_index}: {first_error})")
+        return batch
+    
+    def parse_document_content(self, content: str, filename: str) -> List[Dict[str, Any]]:
+        """Parse document content into access-controlled chunks"""
+        return list(self.chunker.parse(content, filename))
+    
+    def parse_document_file(self, file_path: Path) -> List[Dict[str, Any]]:
+        """Parse a document straight from disk, memory-mapped (same chunks as parse_document_content)"""
+        return list(self.chunker.parse_file(str(file_path), Path(file_path).name))
+    
+    def _grow(self, needed: int):
+        """Double the matrix capacity until `needed` rows fit"""
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        user_mask = np.zeros(capacity, dtype=bool)
+        user_mask[:self._size] = self._user_mask[:self._size]
+        self._vectors = vectors
+        self._user_mask = user_mask
+    
+    def upsert(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict[str, Any]]):
+        """Insert or replace rows; vectors are L2-normalized on the way in"""
+        if not ids:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        # Validate before touching any state, so a bad batch leaves no half-registered rows
+        if matrix.shape != (len(ids), self.dimension) or len(payloads) != len(ids):
+            raise ValueError(f"expected {len(ids)} vectors of dimension {self.dimension} and as many payloads, "
+                             f"got vectors of shape {matrix.shape} and {len(payloads)} payloads")
+        # A new array: the caller's float32 ndarray must not be normalized in place
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        
+        self._grow(self._size + len(ids))
+        for vector, item_id, payload in zip(matrix, ids, payloads):
+            row = self._row_of.get(item_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._ids.append(item_id)
+                self._payloads.append(payload)
+                self._row_of[item_id] = row
+            else:
+                self._payloads[row] = payload
+            self._vectors[row] = vector
+            self._user_mask[row] = payload["access_level"] == "user"
+        
+        self._invalidate_search_caches()
+    
+    def _invalidate_search_caches(self):
+        """Drop cached search results; they may reference replaced or deleted chunks"""
+        for cache in (self.query_cache, self.semantic_cache):
+            if cache is not None:
+                cache.bump_generation()
+    
+    def delete(self, ids: List[str]):
+        """Remove rows by moving the last row into each freed slot"""
+        for item_id in ids:
+            row = self._row_of.pop(item_id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                self._vectors[row] = self._vectors[last]
+                self._user_mask[row] = self._user_mask[last]
+                self._ids[row] = self._ids[last]
+                self._payloads[row] = self._payloads[last]
+                self._row_of[self._ids[row]] = row
+            self._ids.pop()
+            self._payloads.pop()
+            self._size = last
+        
+        self._invalidate_search_caches()
+    
+    def ingest_documents(self, data_folder: str):
+        """Ingest all documents from the data folder"""
+        data_path = Path(data_folder)
+        
+        if not data_path.exists():
+            print(f"Data folder {data_folder} does not exist!")
+            return
+        
+        # Process all .txt files in the data folder
+        txt_files = list(data_path.glob("*.txt"))
+        
+        if not txt_files:
+            print("No .txt files found in the data folder!")
+            return
+        
+        print(f"Found {len(txt_files)} text files to process...")
+        
+        total_chunks = 0
+        failed_chunks = 0
+        start_time = time.time()
+        
+        # Chunk files in order, on parse_workers processes when > 1
+        parsed_files = self.metrics.timed_iter("parse", parse_files(self.chunker, txt_files, self.parse_workers))
+        
+        for file_path, parsed in zip(txt_files, parsed_files):
+            try:
+                if parsed.error:
+                    raise RuntimeError(parsed.error)
+                
+                print(f"Processing {file_path.name}...")
+                
+                chunks = parsed.to_chunks()
+                print(f"  - Created {len(chunks)} chunks")
+                
+                batch_size = self.embedding_batch_size
+                for i in range(0, len(chunks), batch_size):
+                    batch_chunks = chunks[i:i + batch_size]
+                    with self.metrics.ingest_stage("embed"):
+                        embeddings = self.get_embeddings([chunk["content"] for chunk in batch_chunks])
+                    
+                    ids, vectors, payloads = [], [], []
+                    for chunk, embedding in zip(batch_chunks, embeddings.vectors):
+                        if embedding is None:
+                            continue
+                        ids.append(point_id(chunk["filename"], chunk["access_level"], chunk["chunk_id"]))
+                        vectors.append(embedding)
+                        payloads.append(chunk)
+                    with self.metrics.ingest_stage("upsert"):
+                        self.upsert(ids, vectors, payloads)
+                    failed_chunks += len(embeddings.errors)
+                    self.metrics.count_chunks("written", len(ids))
+                    self.metrics.count_chunks("failed", len(embeddings.errors))
+                
+                total_chunks += len(chunks)
+                print(f"  - Completed {file_path.name}")
+                
+            except Exception as e:
+                print(f"Error processing {file_path.name}: {e}")
+        
+        end_time = time.time()
+        self.metrics.observe_ingest("total", end_time - start_time)
+        print(f"\nIngestion complete!")
+        print(f"Total chunks processed: {total_chunks}")
+        if failed_chunks:
+            print(f"Chunks skipped (embedding failed): {failed_chunks}")
+        print(f"Time taken: {end_time - start_time:.2f} seconds")
+        print(f"Speed: {total_chunks / (end_time - start_time):.2f} chunks/second")
+    
+    def search(self, query: str, user_role: str = "user", limit: int = 3, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Perform search with role-based access control, served from the result cache when possible"""
+        search = partial(self._search, use_semantic_cache=use_cache)
+        with self.metrics.search_stage("total"):
+            return search_with_cache(self.query_cache, search, query, user_role, limit, use_cache,
+                                     on_hit=partial(self.metrics.count_search, "result_cache"))
+    
+    def _search(self, query: str, user_role: str = "user", limit: int = 3,
+                use_semantic_cache: bool = True) -> List[Dict[str, Any]]:
+        """Search without the exact-match result cache"""
+        try:
+            start_time = time.time()
+            
+            # Get query embedding
+            with self.metrics.search_stage("embed"):
+                query_embedding = self.get_embeddings([query]).vectors
+            if not query_embedding or query_embedding[0] is None or self._size == 0:
+                self.metrics.count_search("empty")
+                return []
+            
+            # A near-duplicate of a recent query reuses its results and skips the vector search
+            semantic_cache = self.semantic_cache if use_semantic_cache else None
+            if semantic_cache is not None:
+                with self.metrics.search_stage("cache_lookup"):
+                    cached = semantic_cache.lookup(query_embedding[0], user_role, limit)
+                if cached is not None:
+                    self.metrics.count_search("semantic_cache")
+                    return cached["results"]
+                generation = semantic_cache.generation
+            search_start = time.time()
+            
+            with self.metrics.search_stage("vector_search"):
+                query_vector = np.asarray(query_embedding[0], dtype=np.float32)
+                norm = np.linalg.norm(query_vector)
+                if norm > 0:
+                    query_vector /= norm
+                
+                # Cosine similarity against every row in one matmul
+                scores = self._vectors[:self._size] @ query_vector
+                if user_role.lower() != "admin":
+                    # Regular users can only see user content
+                    scores = np.where(self._user_mask[:self._size], scores, -np.inf)
+            
+            end_time = time.time()
+            
+            # Process results
+            with self.metrics.search_stage("postprocess"):
+                processed_results = self._top_k_results(scores, limit, end_time - start_time)
+                
+                if semantic_cache is not None and processed_results:
+                    semantic_cache.put(query_embedding[0], query, user_role, limit, processed_results,
+                                       generation, end_time - search_start)
+            
+            self.metrics.count_search("vector")
+            return processed_results
+            
+        except Exception as e:
+            self.metrics.count_search("error")
+            print(f"Error during search: {e}")
+            return []
+    
+    def search_batch(self, queries: List[str], user_role: str = "user", limit: int = 3) -> List[List[Dict[str, Any]]]:
+        """Search many queries with one embedding pass and one matrix-matrix product"""
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not queries:
+            return results
+        # How each query was answered; whatever is still "error" when we leave failed
+        paths = ["error"] * len(queries)
+        try:
+            with self.metrics.search_stage("batch_total"):
+                if self._size == 0:
+                    paths = ["empty"] * len(queries)
+                    return results
+                start_time = time.time()
+                
+                with self.metrics.search_stage("batch_embed"):
+                    embeddings = self.get_embeddings(queries).vectors
+                embedded = [i for i, vector in enumerate(embeddings) if vector is not None]
+                for i, vector in enumerate(embeddings):
+                    if vector is None:
+                        paths[i] = "empty"
+                if not embedded:
+                    return results
+                
+                with self.metrics.search_stage("batch_vector_search"):
+                    query_matrix = np.asarray([embeddings[i] for i in embedded], dtype=np.float32)
+                    norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+                    query_matrix /= np.where(norms == 0, 1.0, norms)
+                    
+                    scores = query_matrix @ self._vectors[:self._size].T
+                    if user_role.lower() != "admin":
+                        scores[:, ~self._user_mask[:self._size]] = -np.inf
+                
+                elapsed = time.time() - start_time
+                with self.metrics.search_stage("batch_postprocess"):
+                    for row, i in enumerate(embedded):
+                        results[i] = self._top_k_results(scores[row], limit, elapsed)
+                        paths[i] = "vector"
+            return results
+            
+        except Exception as e:
+            print(f"Error during batch search: {e}")
+            return results
+        finally:
+            self.metrics.count_searches(paths)
+    
+    def _top_k_results(self, scores: np.ndarray, limit: int, search_time: float) -> List[Dict[str, Any]]:
+        """Search results for the `limit` best rows, skipping masked (-inf) rows"""
+        # Top-k without a full sort, then order just those k
+        k = min(limit, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        processed_results = []
+        for row in top:
+            if scores[row] == -np.inf:
+                break
+            payload = self._payloads[row]
+            processed_results.append(SearchResult.from_payload(payload, float(scores[row]), search_time))
+        return processed_results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get simple statistics"""
+        stats = {
+            "total_chunks": self._size,
+            "vector_dimension": self.dimension,
+            "user_chunks": int(self._user_mask[:self._size].sum()),
+            "matrix_bytes": int(self._vectors.nbytes)
+        }
+        if self.embedding_cache is not None:
+            stats["embedding_cache"] = self.embedding_cache.get_stats()
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.get_stats()
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.get_stats()
+        stats["metrics"] = self.metrics.get_stats()
+        return stats
+    
+    def close(self):
+        """Release the embedding client and cache"""
+        self.embedder.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+
+
+def main():
+    """Main function to demonstrate the RAG system"""
+    print("🚀 Starting NumPy RAG System...")
+    
+    rag = NumpyRAGSystem()
+    
+    try:
+        # Ingest documents
+        print("\n📚 Ingesting documents...")
+        data_folder = "E:/waveaite test/data"
+        rag.ingest_documents(data_folder)
+        
+        # Show statistics
+        print("\n📊 Statistics:")
+        stats = rag.get_stats()
+        print(f"Total chunks: {stats['total_chunks']}")
+        if 'vector_dimension' in stats:
+            print(f"Vector dimension: {stats['vector_dimension']}")
+        
+        # Interactive search loop
+        print("\n🔍 Interactive Search (type 'quit' to exit, 'switch' to change role)")
+        current_role = "user"
+        
+        while True:
+            print(f"\nCurrent role: {current_role}")
+            query = input("Enter your question: ").strip()
+            
+            if query.lower() == 'quit':
+                break
+            elif query.lower() == 'switch':
+                current_role = "admin" if current_role == "user" else "user"
+                print(f"Switched to {current_role} role")
+                continue
+            elif not query:
+                continue
+            
+            print(f"\n🔍 Searching as {current_role}...")
+            results = rag.search(query, user_role=current_role, limit=3)
+            
+            if not results:
+                print("No relevant documents found.")
+                continue
+            
+            search_time = results[0].get('search_time', 0) if results else 0
+            print(f"Search completed in {search_time:.3f} seconds")
+            print(f"\nFound {len(results)} relevant documents:")
+            
+            for i, result in enumerate(results, 1):
+                print(f"\n--- Result {i} ---")
+                print(f"Source: {result['filename']} (Chunk {result['chunk_id']})")
+                print(f"Document Type: {result['document_type']}")
+                print(f"Access Level: {result['access_level']}")
+                print(f"Score: {result['score']:.3f}")
+                print(f"Content: {result['content'][:200]}...")
+    
+    except KeyboardInterrupt:
+        print("\n\nShutting down...")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        rag.close()
+
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file
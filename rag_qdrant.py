@@ -1,137 +1,227 @@
-import requests
-import re
 import time
-import uuid
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Optional
 from pathlib import Path
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    PointStruct, Filter, FieldCondition, MatchValue, PointIdsList, SearchRequest, FilterSelector, HasIdCondition
+)
+
+from bm25_index import BM25Index, FastPathStats, HybridConfig, reciprocal_rank_fusion
+from chunker import Chunker, parse_files
+from collection_config import IndexConfig, QuantizationConfig, search_params
+from embedding_cache import EmbeddingCache, embed_with_cache
+from embedders import Embedder, HTTPEmbedder
+from embedding_client import EmbeddingBatch
+from ingest_manifest import IngestManifest, default_manifest_path
+from ingest_pipeline import PipelineConfig, StreamingIngest
+from metrics import MetricsRegistry, RAGMetrics
+from partitioning import ACCESS_LEVELS, PartitionRouter, check_layout, partitions_for_role
+from query_cache import QueryResultCache, search_with_cache
+from records import Chunk, SearchResult
+from semantic_cache import SemanticCache
+from transport import TransportConfig, qdrant_client_from_config
 
 class QdrantRAGSystem:
-    def __init__(self):
-        """Initialize the RAG system with Qdrant client"""
+    def __init__(self, embedding_workers: int = 8, embedding_batch_size: int = 64,
+                 embedding_cache_path: Optional[str] = ".embedding_cache.sqlite3",
+                 incremental: bool = False, manifest_path: Optional[str] = None,
+                 query_cache_size: int = 1024, query_cache_ttl: float = 300.0,
+                 semantic_cache_threshold: Optional[float] = None, semantic_cache_size: int = 256,
+                 embedder: Optional[Embedder] = None, transport: Optional[TransportConfig] = None,
+                 chunker: Optional[Chunker] = None, parse_workers: int = 1,
+                 quantization: Optional[QuantizationConfig] = None, index: Optional[IndexConfig] = None,
+                 layout: str = "shared", hybrid: Optional[HybridConfig] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Initialize the RAG system with Qdrant client
+        
+        Args:
+            incremental: keep the existing collection and only re-ingest changed chunks
+            manifest_path: where file/chunk hashes are tracked between runs
+            query_cache_size: search results kept in the in-process result cache (0 disables it)
+            query_cache_ttl: seconds a cached search result stays valid
+            semantic_cache_threshold: cosine similarity at which a near-duplicate query reuses
+                cached results (None disables the semantic cache)
+            embedder: how texts become vectors (default: the HTTP /vectors service)
+            transport: REST or gRPC, ports, timeout and connection pool size (default: REST on 6333)
+            chunker: how documents are split (default: paragraphs packed into 300-character chunks)
+            parse_workers: processes that parse and chunk files during ingest_documents
+            quantization: scalar/binary vector quantization with oversampling and rescoring
+                (default: plain float32 vectors in RAM)
+            index: HNSW/optimizer settings and keyword payload indexes (default: Qdrant's HNSW
+                defaults, with indexes on access_level, document_type and filename)
+            layout: "shared" (one collection, filtered per point) or "partitioned" (one
+                collection per access level; user queries search only documents_user,
+                admin queries fan out to every partition and merge the top-k)
+            hybrid: keep an in-process BM25 index of the chunks and fuse keyword and dense
+                results with reciprocal-rank fusion, answering decisive exact-term queries
+                from the keyword index alone (None: dense search only)
+            metrics: registry for the per-stage search/ingest histograms and counters
+                (default: the process-wide metrics.REGISTRY)
+        """
         print("Connecting to Qdrant...")
-        self.client = QdrantClient(host="localhost", port=6333)
-        self.embedding_url = "http://localhost:8081"
+        self.transport = transport or TransportConfig(protocol="rest")
+        self.client = qdrant_client_from_config(self.transport)
+        self.embedder = embedder or HTTPEmbedder("http://localhost:8081", max_workers=embedding_workers)
+        # Cache keys include the model name, so vectors from different embedders never mix
+        self.embedding_model = self.embedder.model_name
+        self.embedding_cache = EmbeddingCache(embedding_cache_path) if embedding_cache_path else None
+        self.embedding_batch_size = embedding_batch_size
         self.collection_name = "documents"
+        self.layout = check_layout(layout)
+        self.partition_collections = (
+            {level: f"{self.collection_name}_{level}" for level in ACCESS_LEVELS}
+            if self.layout == "partitioned" else {}
+        )
+        self.router = PartitionRouter() if self.layout == "partitioned" else None
+        self.hybrid = hybrid
+        self.keyword_index = BM25Index(hybrid.k1, hybrid.b) if hybrid is not None else None
+        self.fast_path_stats = FastPathStats() if hybrid is not None else None
+        self.metrics = RAGMetrics("qdrant", metrics)
+        self.incremental = incremental
+        self.chunker = chunker or Chunker(max_size=300)
+        self.parse_workers = parse_workers
+        self.quantization = quantization or QuantizationConfig()
+        self.index = index or IndexConfig()
+        self.search_params = search_params(self.index, self.quantization)
+        self.manifest = IngestManifest(
+            manifest_path or default_manifest_path(
+                "qdrant", self.collection_name if self.layout == "shared" else f"{self.collection_name}_partitioned"
+            ),
+            signature=self.chunker.signature,
+            embedding=self.embedder.signature
+        )
+        self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl) if query_cache_size > 0 else None
+        self.semantic_cache = (
+            SemanticCache(semantic_cache_threshold, semantic_cache_size, query_cache_ttl)
+            if semantic_cache_threshold is not None else None
+        )
         
         print("Connected successfully!")
         self.initialize_collection()
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Get embeddings from the transformer service"""
-        try:
-            # Call the API for each text individually as it expects a string, not a list
-            embeddings = []
-            for text in texts:
-                response = requests.post(
-                    f"{self.embedding_url}/vectors",
-                    json={"text": text}
-                )
-                response.raise_for_status()
-                embeddings.append(response.json()["vector"])
-            return embeddings
-        except Exception as e:
-            print(f"Error getting embeddings: {e}")
-            return []
+    def get_embeddings(self, texts: List[str]) -> EmbeddingBatch:
+        """Get embeddings from the cache or the transformer service, aligned with the input texts"""
+        batch = embed_with_cache(self.embedder, self.embedding_cache, self.embedding_model, texts)
+        if batch.errors:
+            first_index, first_error = next(iter(batch.errors.items()))
+            print(f"Error getting embeddings for {len(batch.errors)}/{len(texts)} texts "
+                  f"(text {first_index}: {first_error})")
+        return batch
     
     def initialize_collection(self):
-        """Initialize the Qdrant collection"""
+        """Initialize the Qdrant collection (one per access level in the partitioned layout)"""
         try:
-            # Delete collection if it exists
-            try:
-                self.client.delete_collection(self.collection_name)
-                print("Deleted existing collection")
-            except:
-                pass
+            keep = self.incremental and self._collection_exists()
+            if keep:
+                stale_reason = self._stale_vectors_reason()
+                if stale_reason is None and not self._update_collection_config():
+                    stale_reason = "Qdrant did not apply the requested quantization/index settings"
+                if stale_reason is not None:
+                    print(f"Recreating the collection: {stale_reason}")
+                    keep = False
+            if keep:
+                print("Keeping existing collection (incremental mode)")
+                # Collections created before payload indexing was added get their indexes here
+                for collection_name in self._collection_names():
+                    self.index.create_payload_indexes(self.client, collection_name)
+                self._rebuild_keyword_index()
+                return
             
-            # Create collection with vector configuration
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(size=384, distance=Distance.COSINE)
-            )
+            for collection_name in self._collection_names():
+                # Delete collection if it exists
+                try:
+                    self.client.delete_collection(collection_name)
+                    print(f"Deleted existing collection {collection_name}")
+                except:
+                    pass
+                
+                # Create collection with vector (and quantization) configuration
+                self.client.create_collection(
+                    collection_name=collection_name,
+                    **self.quantization.collection_kwargs(self.embedder.dimension),
+                    **self.index.collection_kwargs()
+                )
+                # Filtered searches look access_level up in the index instead of checking payloads
+                self.index.create_payload_indexes(self.client, collection_name)
+            # Everything in the old manifest refers to points that no longer exist
+            self.manifest.reset()
+            self.manifest.save()
+            if self.keyword_index is not None:
+                self.keyword_index.clear()
             print("Document collection created successfully!")
             
         except Exception as e:
             print(f"Error initializing collection: {e}")
     
-    def parse_document_content(self, content: str, filename: str) -> List[Dict[str, Any]]:
-        """Parse document content and extract access-controlled sections"""
-        documents = []
-        
-        # Split content by access level markers
-        sections = re.split(r'=== ACCESS: (user|admin) ===', content)
-        
-        if len(sections) == 1:
-            # No access markers found, default to user access
-            return self._chunk_content(sections[0].strip(), filename, "user")
-        
-        for i in range(1, len(sections), 2):
-            if i < len(sections):
-                access_level = sections[i].strip()
-                if i + 1 < len(sections):
-                    section_content = sections[i + 1].strip()
-                    if section_content:
-                        documents.extend(self._chunk_content(section_content, filename, access_level))
-        
-        return documents
+    def _rebuild_keyword_index(self):
+        """Index the stored chunks again (the keyword index is in memory, so a kept collection starts unindexed)"""
+        if self.keyword_index is None:
+            return
+        self.keyword_index.clear()
+        for collection_name in self._collection_names():
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=collection_name,
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False
+                )
+                self.keyword_index.add_many((str(record.id), Chunk.from_mapping(record.payload)) for record in records)
+                if offset is None:
+                    break
+        print(f"Keyword index rebuilt: {len(self.keyword_index)} chunks")
     
-    def _chunk_content(self, content: str, filename: str, access_level: str, chunk_size: int = 300) -> List[Dict[str, Any]]:
-        """Split content into smaller, manageable chunks"""
-        chunks = []
-        
-        # Split by paragraphs first
-        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-        current_chunk = ""
-        chunk_id = 0
-        
-        for paragraph in paragraphs:
-            # If adding this paragraph would exceed chunk size, save current chunk
-            if len(current_chunk) + len(paragraph) > chunk_size and current_chunk.strip():
-                chunks.append({
-                    "content": current_chunk.strip(),
-                    "filename": filename,
-                    "access_level": access_level,
-                    "chunk_id": chunk_id,
-                    "document_type": self._get_document_type(filename)
-                })
-                chunk_id += 1
-                current_chunk = paragraph + "\n\n"
-            else:
-                current_chunk += paragraph + "\n\n"
-        
-        # Add the last chunk
-        if current_chunk.strip():
-            chunks.append({
-                "content": current_chunk.strip(),
-                "filename": filename,
-                "access_level": access_level,
-                "chunk_id": chunk_id,
-                "document_type": self._get_document_type(filename)
-            })
-        
-        return chunks
+    def _collection_names(self) -> List[str]:
+        """The collection, or every partition's collection"""
+        if self.layout == "partitioned":
+            return list(self.partition_collections.values())
+        return [self.collection_name]
     
-    def _get_document_type(self, filename: str) -> str:
-        """Determine document type from filename"""
-        filename_lower = filename.lower()
-        if "benefits" in filename_lower:
-            return "benefits"
-        elif "handbook" in filename_lower:
-            return "handbook"
-        elif "leave" in filename_lower:
-            return "leave_policy"
-        elif "performance" in filename_lower:
-            return "performance"
-        elif "compensation" in filename_lower:
-            return "compensation"
-        elif "termination" in filename_lower:
-            return "termination"
-        else:
-            return "policy"
+    def _stale_vectors_reason(self) -> Optional[str]:
+        """Why the stored vectors can't be searched with this system's embedder (None if they can)"""
+        if self.manifest.embedding_changed:
+            return f"it was ingested with a different embedder (now {self.embedder.signature})"
+        for collection_name in self._collection_names():
+            size = self.client.get_collection(collection_name).config.params.vectors.size
+            if size != self.embedder.dimension:
+                return f"{collection_name} has {size}-d vectors, the embedder makes {self.embedder.dimension}-d"
+        return None
+    
+    def _update_collection_config(self) -> bool:
+        """Apply the requested quantization and HNSW/optimizer settings to kept collections; False if refused"""
+        for collection_name in self._collection_names():
+            config = self.client.get_collection(collection_name).config
+            update = {**self.quantization.update_kwargs(config), **self.index.update_kwargs(config)}
+            if not update:
+                continue
+            # Qdrant re-quantizes/re-indexes the stored points in the background
+            print(f"Updating {', '.join(update)} of {collection_name}")
+            if not self.client.update_collection(collection_name=collection_name, **update):
+                return False
+        return True
+    
+    def _collection_exists(self) -> bool:
+        """Check whether the collection (or every partition) is already present"""
+        try:
+            for collection_name in self._collection_names():
+                self.client.get_collection(collection_name)
+            return True
+        except Exception:
+            return False
+    
+    def parse_document_content(self, content: str, filename: str) -> List[Dict[str, Any]]:
+        """Parse document content into access-controlled chunks"""
+        return list(self.chunker.parse(content, filename))
+    
+    def parse_document_file(self, file_path: Path) -> List[Dict[str, Any]]:
+        """Parse a document straight from disk, memory-mapped (same chunks as parse_document_content)"""
+        return list(self.chunker.parse_file(str(file_path), Path(file_path).name))
     
     def ingest_documents(self, data_folder: str):
-        """Ingest all documents from the data folder"""
+        """Ingest new and changed documents from the data folder"""
         data_path = Path(data_folder)
         
         if not data_path.exists():
@@ -148,139 +238,485 @@ class QdrantRAGSystem:
         print(f"Found {len(txt_files)} text files to process...")
         
         total_chunks = 0
+        written_chunks = 0
+        failed_chunks = 0
+        deleted_points = 0
         start_time = time.time()
         
-        for file_path in txt_files:
+        # Hash every file first so unchanged files are never parsed; the rest are
+        # chunked in order, on parse_workers processes when > 1
+        changed_files, skipped_files = self.manifest.changed_files(txt_files)
+        parsed_files = self.metrics.timed_iter(
+            "parse", parse_files(self.chunker, [file_path for file_path, _ in changed_files], self.parse_workers)
+        )
+        
+        for (file_path, file_hash), parsed in zip(changed_files, parsed_files):
             try:
-                print(f"Processing {file_path.name}...")
-                
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
+                if parsed.error:
+                    raise RuntimeError(parsed.error)
                 
-                # Parse and chunk the document
-                chunks = self.parse_document_content(content, file_path.name)
-                print(f"  - Created {len(chunks)} chunks")
+                print(f"Processing {file_path.name}...")
                 
-                # Prepare texts for embedding
-                texts = [chunk["content"] for chunk in chunks]
+                # Diff the parsed chunks against the manifest
+                chunks = parsed.to_chunks()
+                plan = self.manifest.plan_file(file_path.name, file_hash, chunks)
+                print(f"  - Created {len(chunks)} chunks ({len(plan.upserts)} new or changed)")
                 
-                # Get embeddings in batches
-                batch_size = 10
+                # Get embeddings in batches; each batch is embedded concurrently
+                batch_size = self.embedding_batch_size
                 points = []
+                failed_ids = []
                 
-                for i in range(0, len(texts), batch_size):
-                    batch_texts = texts[i:i + batch_size]
-                    batch_chunks = chunks[i:i + batch_size]
+                for i in range(0, len(plan.upserts), batch_size):
+                    batch = plan.upserts[i:i + batch_size]
                     
-                    embeddings = self.get_embeddings(batch_texts)
+                    with self.metrics.ingest_stage("embed"):
+                        embeddings = self.get_embeddings([chunk["content"] for _, chunk in batch])
                     
-                    if embeddings:
-                        for j, (chunk, embedding) in enumerate(zip(batch_chunks, embeddings)):
-                            point_id = str(uuid.uuid4())
-                            points.append(
-                                PointStruct(
-                                    id=point_id,
-                                    vector=embedding,
-                                    payload=chunk
-                                )
+                    for (point_id, chunk), embedding in zip(batch, embeddings.vectors):
+                        if embedding is None:
+                            failed_ids.append(point_id)
+                            continue
+                        points.append(
+                            PointStruct(
+                                id=point_id,
+                                vector=embedding,
+                                payload=dict(chunk)
                             )
-                        
-                        if (i + batch_size) % 20 == 0:  # Progress every 20 chunks
-                            print(f"    - Processed {min(i + batch_size, len(texts))}/{len(texts)} chunks")
+                        )
+                    
+                    for j, error in embeddings.errors.items():
+                        chunk = batch[j][1]
+                        print(f"    - Failed to embed chunk {chunk['chunk_id']} "
+                              f"({chunk['access_level']}): {error}")
+                    
+                    print(f"    - Embedded {min(i + batch_size, len(plan.upserts))}/{len(plan.upserts)} chunks")
                 
-                # Insert all points for this file
+                # Insert new and changed points, then drop chunks that no longer exist
                 if points:
-                    self.client.upsert(
-                        collection_name=self.collection_name,
-                        points=points
-                    )
+                    with self.metrics.ingest_stage("upsert"):
+                        self._upsert_points(points)
+                if plan.stale_ids:
+                    with self.metrics.ingest_stage("delete"):
+                        self._delete_points(plan.stale_ids)
+                    deleted_points += len(plan.stale_ids)
                 
+                self.manifest.commit(plan, failed_ids)
                 total_chunks += len(chunks)
+                written_chunks += len(points)
+                failed_chunks += len(failed_ids)
+                self.metrics.count_chunks("written", len(points))
+                self.metrics.count_chunks("failed", len(failed_ids))
                 print(f"  - Completed {file_path.name}")
                 
             except Exception as e:
                 print(f"Error processing {file_path.name}: {e}")
         
+        # Remove points for files that were deleted from the folder
+        for filename in self.manifest.removed_files(f.name for f in txt_files):
+            stale_ids = self.manifest.forget_file(filename)
+            try:
+                with self.metrics.ingest_stage("delete"):
+                    self._delete_points(stale_ids)
+                deleted_points += len(stale_ids)
+                print(f"Removed {len(stale_ids)} chunks of deleted file {filename}")
+            except Exception as e:
+                print(f"Error removing chunks of {filename}: {e}")
+        
+        self.manifest.save()
+        self._invalidate_search_caches()
+        
         end_time = time.time()
+        self.metrics.observe_ingest("total", end_time - start_time)
+        self.metrics.count_chunks("deleted", deleted_points)
         print(f"\nIngestion complete!")
         print(f"Total chunks processed: {total_chunks}")
+        print(f"Chunks embedded and upserted: {written_chunks}")
+        if skipped_files:
+            print(f"Unchanged files skipped: {skipped_files}")
+        if deleted_points:
+            print(f"Stale chunks deleted: {deleted_points}")
+        if failed_chunks:
+            print(f"Chunks skipped (embedding failed): {failed_chunks}")
+        if self.embedding_cache is not None:
+            cache_stats = self.embedding_cache.get_stats()
+            print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                  f"({cache_stats['entries']} entries)")
         print(f"Time taken: {end_time - start_time:.2f} seconds")
         print(f"Speed: {total_chunks / (end_time - start_time):.2f} chunks/second")
     
-    def search(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
-        """Perform search with role-based access control"""
+    def ingest_documents_streaming(self, data_folder: str, config: Optional[PipelineConfig] = None) -> Dict[str, Any]:
+        """
+        Ingest with overlapping stages: file reads, chunking, embedding and upserts run
+        concurrently with bounded queues in between. Honors the incremental manifest.
+        """
+        data_path = Path(data_folder)
+        
+        if not data_path.exists():
+            print(f"Data folder {data_folder} does not exist!")
+            return {}
+        
+        txt_files = list(data_path.glob("*.txt"))
+        
+        if not txt_files:
+            print("No .txt files found in the data folder!")
+            return {}
+        
+        print(f"Found {len(txt_files)} text files to stream...")
+        
+        def parse(file_path):
+            # Streamed: the pipeline pulls chunks a batch at a time; parse time is recorded per file
+            return self.metrics.timed_stream("parse", self.chunker.parse_file(str(file_path), file_path.name))
+        
+        def embed(batch):
+            with self.metrics.ingest_stage("embed"):
+                embeddings = self.get_embeddings([chunk["content"] for _, chunk in batch])
+            points = [
+                PointStruct(id=point_id, vector=embedding, payload=dict(chunk))
+                for (point_id, chunk), embedding in zip(batch, embeddings.vectors)
+                if embedding is not None
+            ]
+            return points, [batch[j][0] for j in embeddings.errors]
+        
+        def upsert(points):
+            with self.metrics.ingest_stage("upsert"):
+                self._upsert_points(points)
+            return []
+        
+        def delete(point_ids):
+            with self.metrics.ingest_stage("delete"):
+                self._delete_points(point_ids)
+        
+        ingest = StreamingIngest(self.manifest, parse, upsert, delete, embed_fn=embed, config=config)
+        result = ingest.run(txt_files)
+        self._invalidate_search_caches()
+        self.metrics.observe_ingest("total", result["seconds"])
+        for key in ("written", "failed", "deleted"):
+            self.metrics.count_chunks(key, result[key])
+        return result
+    
+    def _invalidate_search_caches(self):
+        """Drop cached search results; they may reference replaced or deleted chunks"""
+        for cache in (self.query_cache, self.semantic_cache):
+            if cache is not None:
+                cache.bump_generation()
+    
+    def _upsert_points(self, points: List[PointStruct]):
+        """Upsert points into the collection, or each into its access level's partition"""
+        if self.layout == "shared":
+            self.client.upsert(collection_name=self.collection_name, points=points)
+        else:
+            by_level: Dict[str, List[PointStruct]] = {}
+            for point in points:
+                by_level.setdefault(point.payload["access_level"], []).append(point)
+            for level, level_points in by_level.items():
+                self.client.upsert(collection_name=self.partition_collections[level], points=level_points)
+        if self.keyword_index is not None:
+            self.keyword_index.add_many((str(point.id), Chunk.from_mapping(point.payload)) for point in points)
+    
+    def _delete_points(self, point_ids: List[str]):
+        """Delete points by ID"""
+        if self.keyword_index is not None:
+            self.keyword_index.remove(point_ids)
+        if self.layout == "shared":
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=point_ids)
+            )
+            return
+        # A point lives in only one partition; an ID filter skips the IDs a partition doesn't hold
+        for collection_name in self._collection_names():
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=FilterSelector(filter=Filter(must=[HasIdCondition(has_id=point_ids)]))
+            )
+    
+    def search(self, query: str, user_role: str = "user", limit: int = 3, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Perform search with role-based access control, served from the result cache when possible"""
+        search = partial(self._search, use_semantic_cache=use_cache)
+        with self.metrics.search_stage("total"):
+            return search_with_cache(self.query_cache, search, query, user_role, limit, use_cache,
+                                     on_hit=partial(self.metrics.count_search, "result_cache"))
+    
+    def _search(self, query: str, user_role: str = "user", limit: int = 3,
+                use_semantic_cache: bool = True) -> List[Dict[str, Any]]:
+        """Search without the exact-match result cache"""
         try:
             start_time = time.time()
             
+            # Keyword side first: a decisive exact-term match needs no embedding at all
+            keyword_hits = None
+            if self.keyword_index is not None:
+                with self.metrics.search_stage("keyword"):
+                    keyword_hits = self.keyword_index.search(query, max(limit, self.hybrid.candidates), user_role)
+                    decisive = self._keyword_decisive(query, keyword_hits)
+                if decisive:
+                    elapsed = time.time() - start_time
+                    self.fast_path_stats.record_fast_path(elapsed)
+                    self.metrics.count_search("keyword")
+                    return self._keyword_results(keyword_hits[:limit], elapsed)
+            
             # Get query embedding
-            query_embedding = self.get_embeddings([query])
-            if not query_embedding:
+            with self.metrics.search_stage("embed"):
+                query_embedding = self.get_embeddings([query]).vectors
+            if not query_embedding or query_embedding[0] is None:
+                self.metrics.count_search("empty")
                 return []
             
-            # Create filter based on user role
-            if user_role.lower() == "admin":
-                # Admin can see both user and admin content
-                filter_condition = Filter(
-                    should=[
-                        FieldCondition(key="access_level", match=MatchValue(value="user")),
-                        FieldCondition(key="access_level", match=MatchValue(value="admin"))
-                    ]
-                )
-            else:
-                # Regular users can only see user content
-                filter_condition = Filter(
-                    must=[
-                        FieldCondition(key="access_level", match=MatchValue(value="user"))
-                    ]
-                )
+            # A near-duplicate of a recent query reuses its results and skips the vector search
+            semantic_cache = self.semantic_cache if use_semantic_cache else None
+            if semantic_cache is not None:
+                with self.metrics.search_stage("cache_lookup"):
+                    cached = semantic_cache.lookup(query_embedding[0], user_role, limit)
+                if cached is not None:
+                    self.metrics.count_search("semantic_cache")
+                    return cached["results"]
+                generation = semantic_cache.generation
+            search_start = time.time()
             
             # Perform search
-            search_results = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_embedding[0],
-                query_filter=filter_condition,
-                limit=limit,
-                with_payload=True
-            )
+            fetch_limit = limit if keyword_hits is None else max(limit, self.hybrid.candidates)
+            with self.metrics.search_stage("vector_search"):
+                search_results = self._search_vector(query_embedding[0], user_role, fetch_limit)
             
             end_time = time.time()
             
             # Process results
-            processed_results = []
-            for result in search_results:
-                processed_results.append({
-                    "content": result.payload["content"],
-                    "filename": result.payload["filename"],
-                    "access_level": result.payload["access_level"],
-                    "chunk_id": result.payload["chunk_id"],
-                    "document_type": result.payload["document_type"],
-                    "score": result.score,
-                    "search_time": end_time - start_time
-                })
+            with self.metrics.search_stage("postprocess"):
+                if keyword_hits is None:
+                    processed_results = self._process_results(search_results, end_time - start_time)
+                else:
+                    processed_results = self._fuse_results(search_results, keyword_hits, limit, end_time - start_time)
+                    self.fast_path_stats.record_full_path(end_time - start_time)
+                
+                if semantic_cache is not None and processed_results:
+                    semantic_cache.put(query_embedding[0], query, user_role, limit, processed_results,
+                                       generation, end_time - search_start)
             
+            self.metrics.count_search("vector")
             return processed_results
             
         except Exception as e:
+            self.metrics.count_search("error")
             print(f"Error during search: {e}")
             return []
     
+    def search_batch(self, queries: List[str], user_role: str = "user", limit: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        Search many queries with one embedding pass and one Qdrant round trip
+        
+        Returns one result list per query, aligned with `queries`. A query whose
+        embedding failed gets an empty list; a failed batch gets all empty lists.
+        In hybrid mode queries the keyword index answers decisively are not embedded.
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not queries:
+            return results
+        # How each query was answered; whatever is still "error" when we leave failed
+        paths = ["error"] * len(queries)
+        try:
+            with self.metrics.search_stage("batch_total"):
+                start_time = time.time()
+                
+                keyword_hits = None
+                pending = list(range(len(queries)))
+                fetch_limit = limit
+                if self.keyword_index is not None:
+                    fetch_limit = max(limit, self.hybrid.candidates)
+                    with self.metrics.search_stage("batch_keyword"):
+                        keyword_hits = [self.keyword_index.search(query, fetch_limit, user_role) for query in queries]
+                        pending = [i for i in pending if not self._keyword_decisive(queries[i], keyword_hits[i])]
+                    keyword_time = time.time() - start_time
+                    for i in set(range(len(queries))) - set(pending):
+                        results[i] = self._keyword_results(keyword_hits[i][:limit], keyword_time)
+                        paths[i] = "keyword"
+                    if not pending:
+                        return results
+                
+                with self.metrics.search_stage("batch_embed"):
+                    pending_embeddings = self.get_embeddings([queries[i] for i in pending]).vectors
+                embeddings = dict(zip(pending, pending_embeddings))
+                embedded = [i for i in pending if embeddings[i] is not None]
+                for i in pending:
+                    if embeddings[i] is None:
+                        paths[i] = "empty"
+                if not embedded:
+                    return results
+                
+                with self.metrics.search_stage("batch_vector_search"):
+                    if self.layout == "shared":
+                        query_filter = self._role_filter(user_role)
+                        batch_results = self.client.search_batch(
+                            collection_name=self.collection_name,
+                            requests=[
+                                SearchRequest(vector=embeddings[i], filter=query_filter, params=self.search_params,
+                                              limit=fetch_limit, with_payload=True)
+                                for i in embedded
+                            ]
+                        )
+                    else:
+                        # One batch per partition, then merge each query's per-partition hits
+                        requests = [
+                            SearchRequest(vector=embeddings[i], params=self.search_params, limit=fetch_limit,
+                                          with_payload=True)
+                            for i in embedded
+                        ]
+                        per_partition = self.router.search(
+                            partitions_for_role(user_role),
+                            lambda level: self.client.search_batch(
+                                collection_name=self.partition_collections[level], requests=requests
+                            )
+                        )
+                        batch_results = [
+                            self.router.merge([hits[j] for hits in per_partition], fetch_limit, key=_hit_score)
+                            for j in range(len(embedded))
+                        ]
+                
+                # search_time is the whole batch's wall time, shared by every query in it
+                elapsed = time.time() - start_time
+                with self.metrics.search_stage("batch_postprocess"):
+                    for i, hits in zip(embedded, batch_results):
+                        if keyword_hits is None:
+                            results[i] = self._process_results(hits, elapsed)
+                        else:
+                            results[i] = self._fuse_results(hits, keyword_hits[i], limit, elapsed)
+                        paths[i] = "vector"
+            
+            return results
+            
+        except Exception as e:
+            print(f"Error during batch search: {e}")
+            return results
+        finally:
+            self.metrics.count_searches(paths)
+    
+    def _search_vector(self, query_vector: List[float], user_role: str, limit: int) -> List[Any]:
+        """Nearest points for a role: one filtered search, or routed to the role's partitions"""
+        if self.layout == "shared":
+            return self.client.search(
+                collection_name=self.collection_name,
+                query_vector=query_vector,
+                query_filter=self._role_filter(user_role),
+                search_params=self.search_params,
+                limit=limit,
+                with_payload=True
+            )
+        # Each partition holds a single access level, so no payload filter is needed
+        per_partition = self.router.search(
+            partitions_for_role(user_role),
+            lambda level: self.client.search(
+                collection_name=self.partition_collections[level],
+                query_vector=query_vector,
+                search_params=self.search_params,
+                limit=limit,
+                with_payload=True
+            )
+        )
+        return self.router.merge(per_partition, limit, key=_hit_score)
+    
+    def _role_filter(self, user_role: str) -> Optional[Filter]:
+        """Payload filter for a role; admins see everything, so they get no filter at all"""
+        if user_role.lower() == "admin":
+            return None
+        # Regular users can only see user content
+        return Filter(
+            must=[
+                FieldCondition(key="access_level", match=MatchValue(value="user"))
+            ]
+        )
+    
+    def _keyword_decisive(self, query: str, keyword_hits: List[Any]) -> bool:
+        """Whether the keyword result is confident enough to skip the embedding and dense search"""
+        if not self.hybrid.fast_path or not keyword_hits:
+            return False
+        confidence = self.keyword_index.confidence(query, keyword_hits)
+        return confidence["coverage"] >= self.hybrid.min_coverage and confidence["margin"] >= self.hybrid.min_margin
+    
+    def _keyword_results(self, keyword_hits: List[Any], search_time: float) -> List[Dict[str, Any]]:
+        """Search results straight from the keyword index (score = BM25 score)"""
+        return [
+            SearchResult.from_payload(payload, score, search_time, "keyword")
+            for _, payload, score in keyword_hits
+        ]
+    
+    def _fuse_results(self, dense_hits: List[Any], keyword_hits: List[Any], limit: int,
+                      search_time: float) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion of dense and keyword hits (score = RRF score)"""
+        payloads = {}
+        dense_ids = []
+        for hit in dense_hits:
+            key = str(hit.id)
+            payloads[key] = hit.payload
+            dense_ids.append(key)
+        keyword_ids = []
+        for doc_id, payload, _ in keyword_hits:
+            payloads.setdefault(doc_id, payload)
+            keyword_ids.append(doc_id)
+        dense_rank = {key: rank for rank, key in enumerate(dense_ids, 1)}
+        keyword_rank = {key: rank for rank, key in enumerate(keyword_ids, 1)}
+        
+        processed_results = []
+        for key, score in reciprocal_rank_fusion([dense_ids, keyword_ids], self.hybrid.rrf_k)[:limit]:
+            sources = []
+            if key in dense_rank:
+                sources.append(f"dense #{dense_rank[key]}")
+            if key in keyword_rank:
+                sources.append(f"keyword #{keyword_rank[key]}")
+            processed_results.append(SearchResult.from_payload(payloads[key], score, search_time, " + ".join(sources)))
+        return processed_results
+    
+    def _process_results(self, search_results: List[Any], search_time: float) -> List[Dict[str, Any]]:
+        """Convert scored points to search results"""
+        processed_results = []
+        for result in search_results:
+            processed_results.append(SearchResult.from_payload(result.payload, result.score, search_time))
+        return processed_results
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get simple statistics"""
         try:
-            info = self.client.get_collection(self.collection_name)
-            return {
-                "total_chunks": info.points_count,
-                "vector_dimension": info.config.params.vectors.size
+            sizes = {}
+            for collection_name in self._collection_names():
+                info = self.client.get_collection(collection_name)
+                sizes[collection_name] = info.points_count or 0
+            stats = {
+                "total_chunks": sum(sizes.values()),
+                "vector_dimension": info.config.params.vectors.size,
+                "quantization": self.quantization.describe(),
+                "index": self.index.describe(),
+                "layout": self.layout
             }
+            if self.router is not None:
+                stats["partitions"] = self.router.get_stats(sizes)
+            if self.keyword_index is not None:
+                stats["keyword_index"] = {**self.keyword_index.get_stats(), **self.fast_path_stats.get_stats()}
+            stats["metrics"] = self.metrics.get_stats()
+            if self.embedding_cache is not None:
+                stats["embedding_cache"] = self.embedding_cache.get_stats()
+            if self.query_cache is not None:
+                stats["query_cache"] = self.query_cache.get_stats()
+            if self.semantic_cache is not None:
+                stats["semantic_cache"] = self.semantic_cache.get_stats()
+            return stats
         except Exception as e:
             print(f"Error getting stats: {e}")
             return {"total_chunks": 0}
     
     def close(self):
         """Close the Qdrant client connection"""
+        if self.router is not None:
+            self.router.close()
+        self.embedder.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
         self.client.close()
 
 
+def _hit_score(hit: Any) -> float:
+    """Merge key for scored points from different partitions (cosine scores are comparable)"""
+    return hit.score
+
+
 def main():
     """Main function to demonstrate the RAG system"""
     print("🚀 Starting Qdrant RAG System...")
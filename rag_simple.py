@@ -1,127 +1,127 @@
-import weaviate
 import weaviate.classes as wvc
-import os
-import re
-from typing import List, Dict, Any
+import json
+from collections import Counter
+from functools import partial
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 import time
 
+from chunker import Chunker, parse_files
+from ingest_manifest import IngestManifest, default_manifest_path
+from ingest_pipeline import PipelineConfig, StreamingIngest
+from metrics import MetricsRegistry, RAGMetrics
+from partitioning import ACCESS_LEVELS, PartitionRouter, check_layout, partitions_for_role
+from query_cache import QueryResultCache, search_with_cache
+from records import SearchResult
+from transport import TransportConfig, weaviate_client_from_config
+
 class SimpleRAGSystem:
-    def __init__(self):
-        """Initialize the RAG system with Weaviate client"""
+    def __init__(self, incremental: bool = False, manifest_path: Optional[str] = None,
+                 batch_size: int = 100, concurrent_requests: int = 2,
+                 query_cache_size: int = 1024, query_cache_ttl: float = 300.0,
+                 transport: Optional[TransportConfig] = None, chunker: Optional[Chunker] = None,
+                 parse_workers: int = 1, layout: str = "shared", metrics: Optional[MetricsRegistry] = None):
+        """
+        Initialize the RAG system with Weaviate client
+        
+        Args:
+            incremental: keep the existing collection and only re-ingest changed chunks
+            manifest_path: where file/chunk hashes are tracked between runs
+            batch_size: objects per batch request during ingestion
+            concurrent_requests: batch requests in flight at once
+            query_cache_size: search results kept in the in-process result cache (0 disables it)
+            query_cache_ttl: seconds a cached search result stays valid
+            transport: protocol="grpc" (default) searches through the v4 gRPC query API,
+                "rest" sends GraphQL over HTTP; also ports, timeouts and pool size
+            chunker: how documents are split (default: paragraphs packed into 300-character chunks)
+            parse_workers: processes that parse and chunk files during ingest_documents
+            layout: "shared" (one collection, filtered per object) or "partitioned" (a
+                multi-tenant collection with one tenant per access level; user queries search
+                only the "user" tenant, admin queries fan out to every tenant and merge the top-k)
+            metrics: registry for the per-stage search/ingest histograms and counters
+                (default: the process-wide metrics.REGISTRY)
+        """
         print("Connecting to Weaviate...")
-        self.client = weaviate.connect_to_local(
-            host="localhost",
-            port=8080,
-            grpc_port=50051,
-            skip_init_checks=True
-        )
+        self.transport = transport or TransportConfig(protocol="grpc")
+        self.client = weaviate_client_from_config(self.transport)
         print("Connected successfully!")
         
+        self.incremental = incremental
+        self.layout = check_layout(layout)
+        # Multi-tenancy is fixed when a collection is created, so each layout has its own
+        self.collection_name = "Document" if self.layout == "shared" else "DocumentPartitioned"
+        self.router = PartitionRouter() if self.layout == "partitioned" else None
+        # Push the access_level restriction into the query (False = legacy over-fetch and discard)
+        self.server_side_filter = True
+        self.batch_size = batch_size
+        self.concurrent_requests = concurrent_requests
+        self.failed_objects: List[Dict[str, Any]] = []
+        self.chunker = chunker or Chunker(max_size=300)
+        self.parse_workers = parse_workers
+        self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl) if query_cache_size > 0 else None
+        self.metrics = RAGMetrics("weaviate", metrics)
+        self.manifest = IngestManifest(
+            manifest_path or default_manifest_path("weaviate", self.collection_name),
+            signature=self.chunker.signature
+        )
         self.initialize_schema()
     
     def initialize_schema(self):
         """Initialize the Weaviate schema"""
         try:
             # Check if collection already exists
-            if self.client.collections.exists("Document"):
-                print("Document collection already exists. Deleting and recreating...")
-                self.client.collections.delete("Document")
+            if self.client.collections.exists(self.collection_name):
+                if self.incremental:
+                    print(f"Keeping existing {self.collection_name} collection (incremental mode)")
+                    return
+                print(f"{self.collection_name} collection already exists. Deleting and recreating...")
+                self.client.collections.delete(self.collection_name)
             
             # Create the collection using v4 syntax
             self.client.collections.create(
-                name="Document",
+                name=self.collection_name,
                 vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_transformers(),
                 properties=[
                     wvc.config.Property(name="content", data_type=wvc.config.DataType.TEXT),
                     wvc.config.Property(name="filename", data_type=wvc.config.DataType.TEXT),
-                    wvc.config.Property(name="access_level", data_type=wvc.config.DataType.TEXT),
+                    # Field tokenization + filterable index so role filters run inside the query
+                    wvc.config.Property(
+                        name="access_level",
+                        data_type=wvc.config.DataType.TEXT,
+                        tokenization=wvc.config.Tokenization.FIELD,
+                        index_filterable=True,
+                        skip_vectorization=True
+                    ),
                     wvc.config.Property(name="chunk_id", data_type=wvc.config.DataType.INT),
                     wvc.config.Property(name="document_type", data_type=wvc.config.DataType.TEXT),
-                ]
+                ],
+                multi_tenancy_config=(
+                    wvc.config.Configure.multi_tenancy(enabled=True) if self.layout == "partitioned" else None
+                )
             )
-            print("Document collection created successfully!")
+            if self.layout == "partitioned":
+                # One tenant (its own shard and HNSW index) per access level
+                self.client.collections.get(self.collection_name).tenants.create(
+                    [wvc.tenants.Tenant(name=level) for level in ACCESS_LEVELS]
+                )
+            # Everything in the old manifest refers to objects that no longer exist
+            self.manifest.reset()
+            self.manifest.save()
+            print(f"{self.collection_name} collection created successfully!")
             
         except Exception as e:
             print(f"Error initializing schema: {e}")
     
     def parse_document_content(self, content: str, filename: str) -> List[Dict[str, Any]]:
-        """Parse document content and extract access-controlled sections"""
-        documents = []
-        
-        # Split content by access level markers
-        sections = re.split(r'=== ACCESS: (user|admin) ===', content)
-        
-        if len(sections) == 1:
-            # No access markers found, default to user access
-            return self._chunk_content(sections[0].strip(), filename, "user")
-        
-        for i in range(1, len(sections), 2):
-            if i < len(sections):
-                access_level = sections[i].strip()
-                if i + 1 < len(sections):
-                    section_content = sections[i + 1].strip()
-                    if section_content:
-                        documents.extend(self._chunk_content(section_content, filename, access_level))
-        
-        return documents
+        """Parse document content into access-controlled chunks"""
+        return list(self.chunker.parse(content, filename))
     
-    def _chunk_content(self, content: str, filename: str, access_level: str, chunk_size: int = 300) -> List[Dict[str, Any]]:
-        """Split content into smaller, manageable chunks"""
-        chunks = []
-        
-        # Split by paragraphs first
-        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-        current_chunk = ""
-        chunk_id = 0
-        
-        for paragraph in paragraphs:
-            # If adding this paragraph would exceed chunk size, save current chunk
-            if len(current_chunk) + len(paragraph) > chunk_size and current_chunk.strip():
-                chunks.append({
-                    "content": current_chunk.strip(),
-                    "filename": filename,
-                    "access_level": access_level,
-                    "chunk_id": chunk_id,
-                    "document_type": self._get_document_type(filename)
-                })
-                chunk_id += 1
-                current_chunk = paragraph + "\n\n"
-            else:
-                current_chunk += paragraph + "\n\n"
-        
-        # Add the last chunk
-        if current_chunk.strip():
-            chunks.append({
-                "content": current_chunk.strip(),
-                "filename": filename,
-                "access_level": access_level,
-                "chunk_id": chunk_id,
-                "document_type": self._get_document_type(filename)
-            })
-        
-        return chunks
-    
-    def _get_document_type(self, filename: str) -> str:
-        """Determine document type from filename"""
-        filename_lower = filename.lower()
-        if "benefits" in filename_lower:
-            return "benefits"
-        elif "handbook" in filename_lower:
-            return "handbook"
-        elif "leave" in filename_lower:
-            return "leave_policy"
-        elif "performance" in filename_lower:
-            return "performance"
-        elif "compensation" in filename_lower:
-            return "compensation"
-        elif "termination" in filename_lower:
-            return "termination"
-        else:
-            return "policy"
+    def parse_document_file(self, file_path: Path) -> List[Dict[str, Any]]:
+        """Parse a document straight from disk, memory-mapped (same chunks as parse_document_content)"""
+        return list(self.chunker.parse_file(str(file_path), Path(file_path).name))
     
     def ingest_documents(self, data_folder: str):
-        """Ingest all documents from the data folder"""
+        """Ingest new and changed documents from the data folder using batched inserts"""
         data_path = Path(data_folder)
         
         if not data_path.exists():
@@ -138,88 +138,379 @@ class SimpleRAGSystem:
         print(f"Found {len(txt_files)} text files to process...")
         
         total_chunks = 0
-        documents_collection = self.client.collections.get("Document")
+        queued_chunks = 0
+        deleted_objects = 0
+        plans = []
+        start_time = time.time()
+        
+        # Hash every file first so unchanged files are never parsed; the rest are
+        # chunked in order, on parse_workers processes when > 1
+        changed_files, skipped_files = self.manifest.changed_files(txt_files)
+        parsed_files = self.metrics.timed_iter(
+            "parse", parse_files(self.chunker, [file_path for file_path, _ in changed_files], self.parse_workers)
+        )
+        
+        # One batch context for the whole run: objects from all files share
+        # fixed-size batches that are sent concurrently and vectorized server-side
+        with self.client.batch.fixed_size(
+            batch_size=self.batch_size,
+            concurrent_requests=self.concurrent_requests
+        ) as batch:
+            for (file_path, file_hash), parsed in zip(changed_files, parsed_files):
+                try:
+                    if parsed.error:
+                        raise RuntimeError(parsed.error)
+                    
+                    print(f"Processing {file_path.name}...")
+                    
+                    # Diff the parsed chunks against the manifest
+                    chunks = parsed.to_chunks()
+                    plan = self.manifest.plan_file(file_path.name, file_hash, chunks)
+                    print(f"  - Created {len(chunks)} chunks ({len(plan.upserts)} new or changed)")
+                    
+                    # A batch write with an existing UUID replaces that object; adding blocks
+                    # while earlier batches are still being vectorized and written
+                    with self.metrics.ingest_stage("upsert"):
+                        for object_id, chunk in plan.upserts:
+                            batch.add_object(collection=self.collection_name, properties=dict(chunk), uuid=object_id,
+                                             tenant=self._tenant(chunk))
+                    
+                    if plan.stale_ids:
+                        with self.metrics.ingest_stage("delete"):
+                            self._delete_objects(plan.stale_ids)
+                        deleted_objects += len(plan.stale_ids)
+                    
+                    plans.append(plan)
+                    total_chunks += len(chunks)
+                    queued_chunks += len(plan.upserts)
+                    
+                except Exception as e:
+                    print(f"Error processing {file_path.name}: {e}")
+            flush_start = time.perf_counter()
+        # Leaving the batch context sends the remaining objects and waits for them
+        self.metrics.observe_ingest("flush", time.perf_counter() - flush_start)
+        
+        # Collect failures per object instead of printing them as they happen
+        failed_by_id = {
+            str(failed.object_.uuid): failed.message
+            for failed in self.client.batch.failed_objects
+        }
+        self.failed_objects = []
+        for plan in plans:
+            failed_ids = []
+            for object_id, chunk in plan.upserts:
+                if object_id in failed_by_id:
+                    failed_ids.append(object_id)
+                    self.failed_objects.append({
+                        "id": object_id,
+                        "filename": chunk["filename"],
+                        "chunk_id": chunk["chunk_id"],
+                        "access_level": chunk["access_level"],
+                        "error": failed_by_id[object_id]
+                    })
+            self.manifest.commit(plan, failed_ids)
         
-        for file_path in txt_files:
+        # Remove objects for files that were deleted from the folder
+        for filename in self.manifest.removed_files(f.name for f in txt_files):
+            stale_ids = self.manifest.forget_file(filename)
             try:
-                print(f"Processing {file_path.name}...")
-                
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                
-                # Parse and chunk the document
-                chunks = self.parse_document_content(content, file_path.name)
-                print(f"  - Created {len(chunks)} chunks")
-                
-                # Insert chunks one by one with progress
-                for i, chunk in enumerate(chunks):
-                    try:
-                        documents_collection.data.insert(chunk)
-                        if (i + 1) % 5 == 0:  # Progress every 5 chunks
-                            print(f"    - Inserted {i + 1}/{len(chunks)} chunks")
-                    except Exception as e:
-                        print(f"    - Error inserting chunk {i}: {e}")
-                
-                total_chunks += len(chunks)
-                print(f"  - Completed {file_path.name}")
-                
+                with self.metrics.ingest_stage("delete"):
+                    self._delete_objects(stale_ids)
+                deleted_objects += len(stale_ids)
+                print(f"Removed {len(stale_ids)} chunks of deleted file {filename}")
             except Exception as e:
-                print(f"Error processing {file_path.name}: {e}")
+                print(f"Error removing chunks of {filename}: {e}")
+        
+        self.manifest.save()
+        # Cached search results may reference replaced or deleted chunks
+        if self.query_cache is not None:
+            self.query_cache.bump_generation()
+        
+        end_time = time.time()
+        self.metrics.observe_ingest("total", end_time - start_time)
+        self.metrics.count_chunks("written", queued_chunks - len(self.failed_objects))
+        self.metrics.count_chunks("failed", len(self.failed_objects))
+        self.metrics.count_chunks("deleted", deleted_objects)
+        print(f"\nIngestion complete!")
+        print(f"Total chunks processed: {total_chunks}")
+        print(f"Chunks inserted: {queued_chunks - len(self.failed_objects)}")
+        if skipped_files:
+            print(f"Unchanged files skipped: {skipped_files}")
+        if deleted_objects:
+            print(f"Stale chunks deleted: {deleted_objects}")
+        if self.failed_objects:
+            print(f"Failed inserts: {len(self.failed_objects)}")
+            errors = Counter(failed["error"] for failed in self.failed_objects)
+            for message, count in errors.most_common(3):
+                print(f"  - {count}x {message}")
+        print(f"Time taken: {end_time - start_time:.2f} seconds")
+        print(f"Speed: {total_chunks / (end_time - start_time):.2f} chunks/second")
+    
+    def ingest_documents_streaming(self, data_folder: str, config: Optional[PipelineConfig] = None) -> Dict[str, Any]:
+        """
+        Ingest with overlapping stages: file reads, chunking, and batched inserts run
+        concurrently with bounded queues in between. Honors the incremental manifest.
+        """
+        data_path = Path(data_folder)
+        
+        if not data_path.exists():
+            print(f"Data folder {data_folder} does not exist!")
+            return {}
+        
+        txt_files = list(data_path.glob("*.txt"))
+        
+        if not txt_files:
+            print("No .txt files found in the data folder!")
+            return {}
+        
+        print(f"Found {len(txt_files)} text files to stream...")
+        
+        def parse(file_path):
+            # Streamed: the pipeline pulls chunks a batch at a time; parse time is recorded per file
+            return self.metrics.timed_stream("parse", self.chunker.parse_file(str(file_path), file_path.name))
+        
+        def insert(batch):
+            # insert_many goes through the batch endpoint, which replaces existing IDs
+            by_tenant: Dict[Optional[str], List[Any]] = {}
+            for object_id, chunk in batch:
+                by_tenant.setdefault(self._tenant(chunk), []).append((object_id, chunk))
+            failed_ids = []
+            with self.metrics.ingest_stage("upsert"):
+                for tenant, items in by_tenant.items():
+                    response = self._documents(tenant).data.insert_many([
+                        wvc.data.DataObject(properties=dict(chunk), uuid=object_id) for object_id, chunk in items
+                    ])
+                    failed_ids.extend(items[i][0] for i in response.errors)
+            return failed_ids
+        
+        def delete(object_ids):
+            with self.metrics.ingest_stage("delete"):
+                self._delete_objects(object_ids)
         
-        print(f"\nIngestion complete! Total chunks processed: {total_chunks}")
+        ingest = StreamingIngest(self.manifest, parse, insert, delete, config=config)
+        result = ingest.run(txt_files)
+        # Cached search results may reference replaced or deleted chunks
+        if self.query_cache is not None:
+            self.query_cache.bump_generation()
+        self.metrics.observe_ingest("total", result["seconds"])
+        for key in ("written", "failed", "deleted"):
+            self.metrics.count_chunks(key, result[key])
+        return result
+    
+    def _tenant(self, chunk: Dict[str, Any]) -> Optional[str]:
+        """Tenant a chunk is stored in (None in the shared layout)"""
+        return chunk["access_level"] if self.layout == "partitioned" else None
+    
+    def _documents(self, tenant: Optional[str] = None):
+        """The Document collection, scoped to a tenant in the partitioned layout"""
+        documents_collection = self.client.collections.get(self.collection_name)
+        return documents_collection.with_tenant(tenant) if tenant else documents_collection
+    
+    def _partitions(self) -> List[Optional[str]]:
+        """Every tenant, or [None] for the single shared collection"""
+        return list(ACCESS_LEVELS) if self.layout == "partitioned" else [None]
+    
+    def _delete_objects(self, object_ids: List[str]):
+        """Delete objects by ID (in every tenant; IDs a tenant doesn't hold match nothing)"""
+        for tenant in self._partitions():
+            self._documents(tenant).data.delete_many(
+                where=wvc.query.Filter.by_id().contains_any(object_ids)
+            )
     
-    def search(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
-        """Perform search with role-based access control"""
+    def search(self, query: str, user_role: str = "user", limit: int = 3, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Perform search with role-based access control, served from the result cache when possible"""
+        with self.metrics.search_stage("total"):
+            return search_with_cache(self.query_cache, self._search, query, user_role, limit, use_cache,
+                                     on_hit=partial(self.metrics.count_search, "result_cache"))
+    
+    def _search(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
+        """Uncached search"""
+        if self.transport.protocol == "rest":
+            # GraphQL over HTTP instead of the gRPC query API (always filtered server-side);
+            # one round trip, so it is timed as a whole
+            try:
+                with self.metrics.search_stage("vector_search"):
+                    results = self._search_batch([query], user_role, limit)[0]
+            except Exception as e:
+                self.metrics.count_search("error")
+                print(f"Error during search: {e}")
+                return []
+            self.metrics.count_search("vector")
+            return results
+        if self.layout == "partitioned":
+            return self._search_partitions(query, user_role, limit)
         try:
-            documents_collection = self.client.collections.get("Document")
+            documents_collection = self.client.collections.get(self.collection_name)
             
-            # Simple vector search first
-            response = documents_collection.query.near_text(
-                query=query,
-                limit=limit * 3,  # Get more to filter
-                return_metadata=wvc.query.MetadataQuery(score=True)
-            )
+            if self.server_side_filter:
+                # Weaviate applies the role filter, so exactly `limit` authorized results come back
+                filters = self._role_filter(user_role)
+                fetch_limit = limit
+            else:
+                # Legacy path: get more results and filter them below
+                filters = None
+                fetch_limit = limit * 3
+            
+            # Weaviate vectorizes the query server-side, so this includes the embedding
+            with self.metrics.search_stage("vector_search"):
+                response = documents_collection.query.near_text(
+                    query=query,
+                    limit=fetch_limit,
+                    filters=filters,
+                    return_metadata=wvc.query.MetadataQuery(score=True)
+                )
             
             # Filter results based on user role
             processed_results = []
-            for item in response.objects:
-                access_level = item.properties["access_level"]
-                
-                # Apply role-based filtering
-                if user_role.lower() == "admin" or access_level == "user":
-                    processed_results.append({
-                        "content": item.properties["content"],
-                        "filename": item.properties["filename"],
-                        "access_level": item.properties["access_level"],
-                        "chunk_id": item.properties["chunk_id"],
-                        "document_type": item.properties["document_type"],
-                        "score": item.metadata.score if item.metadata.score else 0
-                    })
+            with self.metrics.search_stage("postprocess"):
+                for item in response.objects:
+                    access_level = item.properties["access_level"]
                     
-                    if len(processed_results) >= limit:
-                        break
+                    # Apply role-based filtering (a no-op when the server already filtered)
+                    if user_role.lower() == "admin" or access_level == "user":
+                        processed_results.append(SearchResult.from_payload(item.properties, item.metadata.score if item.metadata.score else 0))
+                        
+                        if len(processed_results) >= limit:
+                            break
             
+            self.metrics.count_search("vector")
             return processed_results
             
         except Exception as e:
+            self.metrics.count_search("error")
+            print(f"Error during search: {e}")
+            return []
+    
+    def _search_partitions(self, query: str, user_role: str = "user", limit: int = 3) -> List[Dict[str, Any]]:
+        """Search the role's tenants (unfiltered: each holds one access level) and merge by distance"""
+        try:
+            with self.metrics.search_stage("vector_search"):
+                per_tenant = self.router.search(
+                    partitions_for_role(user_role),
+                    lambda tenant: self._documents(tenant).query.near_text(
+                        query=query,
+                        limit=limit,
+                        return_metadata=wvc.query.MetadataQuery(score=True, distance=True)
+                    ).objects
+                )
+            with self.metrics.search_stage("postprocess"):
+                merged = self.router.merge(per_tenant, limit, key=_closeness)
+                results = [
+                    SearchResult.from_payload(item.properties, item.metadata.score if item.metadata.score else 0)
+                    for item in merged
+                ]
+            self.metrics.count_search("vector")
+            return results
+        except Exception as e:
+            self.metrics.count_search("error")
             print(f"Error during search: {e}")
             return []
     
+    def search_batch(self, queries: List[str], user_role: str = "user", limit: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        Search many queries in one GraphQL request
+        
+        The v4 query API has no batch call, so each query becomes an aliased
+        Get.Document nearText field (q0, q1, ...) in a single raw GraphQL query;
+        Weaviate vectorizes and searches them all in one round trip (one per tenant
+        in the partitioned layout). Results are aligned with `queries`; a failed
+        request gives all empty lists.
+        """
+        try:
+            # One GraphQL round trip: vectorizing and searching are timed as a whole
+            with self.metrics.search_stage("batch_total"):
+                results = self._search_batch(queries, user_role, limit)
+            self.metrics.count_search("vector", len(queries))
+            return results
+        except Exception as e:
+            self.metrics.count_search("error", len(queries))
+            print(f"Error during batch search: {e}")
+            return [[] for _ in queries]
+    
+    def _search_batch(self, queries: List[str], user_role: str = "user", limit: int = 3) -> List[List[Dict[str, Any]]]:
+        """search_batch, raising on a failed request instead of returning empty lists"""
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not queries:
+            return results
+        if self.layout == "partitioned":
+            per_tenant = self.router.search(
+                partitions_for_role(user_role),
+                lambda tenant: self._graphql_near_text(queries, limit, tenant=tenant)
+            )
+            items_per_query = [
+                self.router.merge([items[i] for items in per_tenant], limit, key=_certainty)
+                for i in range(len(queries))
+            ]
+        else:
+            where = ""
+            if user_role.lower() != "admin":
+                where = ', where: {path: ["access_level"], operator: Equal, valueText: "user"}'
+            items_per_query = self._graphql_near_text(queries, limit, where=where)
+        
+        for i, items in enumerate(items_per_query):
+            for item in items:
+                certainty = _certainty(item)
+                results[i].append(SearchResult.from_payload(item, certainty if certainty else 0))
+        return results
+    
+    def _graphql_near_text(self, queries: List[str], limit: int, where: str = "",
+                           tenant: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """Raw Get.Document items for each query, from one aliased GraphQL request"""
+        if tenant:
+            where += f", tenant: {json.dumps(tenant)}"
+        fields = "content filename access_level chunk_id document_type _additional { certainty }"
+        # json.dumps gives a valid, escaped GraphQL string literal
+        aliased = "\n".join(
+            f"q{i}: {self.collection_name}(nearText: {{concepts: [{json.dumps(query)}]}}, limit: {limit}{where}) {{ {fields} }}"
+            for i, query in enumerate(queries)
+        )
+        response = self.client.graphql_raw_query(f"{{ Get {{ {aliased} }} }}")
+        if response.errors:
+            raise RuntimeError(response.errors)
+        return [response.get.get(f"q{i}") or [] for i in range(len(queries))]
+    
+    def _role_filter(self, user_role: str):
+        """Server-side access_level filter for a role; admins see everything"""
+        if user_role.lower() == "admin":
+            return None
+        return wvc.query.Filter.by_property("access_level").equal("user")
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get simple statistics"""
         try:
-            documents_collection = self.client.collections.get("Document")
-            total_response = documents_collection.aggregate.over_all(total_count=True)
-            return {"total_chunks": total_response.total_count}
+            sizes = {}
+            for tenant in self._partitions():
+                total_response = self._documents(tenant).aggregate.over_all(total_count=True)
+                sizes[tenant or self.collection_name] = total_response.total_count
+            stats = {"total_chunks": sum(sizes.values()), "layout": self.layout}
+            if self.router is not None:
+                stats["partitions"] = self.router.get_stats(sizes)
+            if self.query_cache is not None:
+                stats["query_cache"] = self.query_cache.get_stats()
+            stats["metrics"] = self.metrics.get_stats()
+            return stats
         except Exception as e:
             print(f"Error getting stats: {e}")
             return {"total_chunks": 0}
     
     def close(self):
         """Close the Weaviate client connection"""
+        if self.router is not None:
+            self.router.close()
         self.client.close()
 
 
+def _closeness(item: Any) -> float:
+    """Merge key for near_text hits from different tenants (smaller distance is better)"""
+    distance = item.metadata.distance
+    return -distance if distance is not None else float("-inf")
+
+
+def _certainty(item: Dict[str, Any]) -> float:
+    """Certainty of a raw GraphQL hit (0 when missing)"""
+    return (item.get("_additional") or {}).get("certainty") or 0.0
+
+
 def main():
     """Main function to demonstrate the RAG system"""
     print("🚀 Starting Simple RAG System...")
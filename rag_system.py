@@ -1,20 +1,49 @@
-import weaviate
 import weaviate.classes as wvc
-import os
-import re
 from typing import List, Dict, Any, Optional
 import json
 from pathlib import Path
+import time
+from functools import partial
+
+from chunker import Chunker, parse_files
+from ingest_manifest import IngestManifest, default_manifest_path
+from ingest_pipeline import PipelineConfig, StreamingIngest
+from metrics import MetricsRegistry, RAGMetrics
+from partitioning import check_layout
+from query_cache import QueryResultCache, search_with_cache
+from records import SearchResult
+from transport import TransportConfig, weaviate_client_from_config
 
 class RAGSystem:
-    def __init__(self, weaviate_url: str = "http://localhost:8080"):
-        """Initialize the RAG system with Weaviate client"""
-        self.client = weaviate.connect_to_local(
-            host="localhost",
-            port=8080,
-            grpc_port=50051,
-            skip_init_checks=True  # Skip gRPC health checks
-        )
+    def __init__(self, weaviate_url: str = "http://localhost:8080", incremental: bool = False,
+                 manifest_path: Optional[str] = None, query_cache_size: int = 1024,
+                 query_cache_ttl: float = 300.0, transport: Optional[TransportConfig] = None,
+                 chunker: Optional[Chunker] = None, parse_workers: int = 1,
+                 metrics: Optional[MetricsRegistry] = None, layout: str = "shared"):
+        """
+        Initialize the RAG system with Weaviate client
+        
+        Args:
+            weaviate_url: Weaviate endpoint
+            incremental: keep the existing collection and only re-ingest changed chunks
+            manifest_path: where file/chunk hashes are tracked between runs
+            query_cache_size: search results kept in the in-process result cache (0 disables it)
+            query_cache_ttl: seconds a cached search result stays valid
+            transport: ports, timeouts and pool size (hybrid queries always use the gRPC API)
+            chunker: how documents are split (default: paragraphs packed into 1000-character chunks)
+            parse_workers: processes that parse and chunk files during ingest_documents
+            metrics: registry for the per-stage search/ingest histograms and counters, labelled
+                system="weaviate_full" (default: the process-wide metrics.REGISTRY)
+            layout: only "shared" is supported. Hybrid scores are fused and normalized per
+                result set, so per-tenant top-k lists cannot be merged by score; use
+                SimpleRAGSystem for the role-partitioned layout
+        """
+        if check_layout(layout) != "shared":
+            raise ValueError("RAGSystem supports only layout='shared' (hybrid scores are not comparable "
+                             "across tenants); use SimpleRAGSystem(layout='partitioned')")
+        self.layout = layout
+        self.transport = transport or TransportConfig(protocol="grpc")
+        self.client = weaviate_client_from_config(self.transport)
         
         # Define the schema for our document collection
         self.schema = {
@@ -85,6 +114,17 @@ class RAGSystem:
             ]
         }
         
+        self.incremental = incremental
+        # Push the access_level restriction into the query (False = legacy over-fetch and discard)
+        self.server_side_filter = True
+        self.chunker = chunker or Chunker(max_size=1000)
+        self.parse_workers = parse_workers
+        self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl) if query_cache_size > 0 else None
+        self.metrics = RAGMetrics("weaviate_full", metrics)
+        self.manifest = IngestManifest(
+            manifest_path or default_manifest_path("weaviate", "Document"),
+            signature=self.chunker.signature
+        )
         self.initialize_schema()
     
     def initialize_schema(self):
@@ -92,6 +132,9 @@ class RAGSystem:
         try:
             # Check if collection already exists
             if self.client.collections.exists("Document"):
+                if self.incremental:
+                    print("Keeping existing Document collection (incremental mode)")
+                    return
                 print("Document collection already exists. Deleting and recreating...")
                 self.client.collections.delete("Document")
             
@@ -102,95 +145,36 @@ class RAGSystem:
                 properties=[
                     wvc.config.Property(name="content", data_type=wvc.config.DataType.TEXT),
                     wvc.config.Property(name="filename", data_type=wvc.config.DataType.TEXT),
-                    wvc.config.Property(name="access_level", data_type=wvc.config.DataType.TEXT),
+                    # Field tokenization + filterable index so role filters run inside the query
+                    wvc.config.Property(
+                        name="access_level",
+                        data_type=wvc.config.DataType.TEXT,
+                        tokenization=wvc.config.Tokenization.FIELD,
+                        index_filterable=True,
+                        skip_vectorization=True
+                    ),
                     wvc.config.Property(name="chunk_id", data_type=wvc.config.DataType.INT),
                     wvc.config.Property(name="document_type", data_type=wvc.config.DataType.TEXT),
                 ]
             )
+            # Everything in the old manifest refers to objects that no longer exist
+            self.manifest.reset()
+            self.manifest.save()
             print("Document collection created successfully!")
             
         except Exception as e:
             print(f"Error initializing schema: {e}")
     
     def parse_document_content(self, content: str, filename: str) -> List[Dict[str, Any]]:
-        """Parse document content and extract access-controlled sections"""
-        documents = []
-        
-        # Split content by access level markers
-        sections = re.split(r'=== ACCESS: (user|admin) ===', content)
-        
-        if len(sections) == 1:
-            # No access markers found, default to user access
-            return self._chunk_content(sections[0].strip(), filename, "user")
-        
-        current_access = "user"  # Default access level
-        
-        for i in range(1, len(sections), 2):
-            if i < len(sections):
-                access_level = sections[i].strip()
-                if i + 1 < len(sections):
-                    section_content = sections[i + 1].strip()
-                    if section_content:
-                        documents.extend(self._chunk_content(section_content, filename, access_level))
-        
-        return documents
+        """Parse document content into access-controlled chunks"""
+        return list(self.chunker.parse(content, filename))
     
-    def _chunk_content(self, content: str, filename: str, access_level: str, chunk_size: int = 1000) -> List[Dict[str, Any]]:
-        """Split content into chunks while preserving context"""
-        chunks = []
-        
-        # Split by paragraphs or sections first
-        paragraphs = content.split('\n\n')
-        current_chunk = ""
-        chunk_id = 0
-        
-        for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) < chunk_size:
-                current_chunk += paragraph + "\n\n"
-            else:
-                if current_chunk.strip():
-                    chunks.append({
-                        "content": current_chunk.strip(),
-                        "filename": filename,
-                        "access_level": access_level,
-                        "chunk_id": chunk_id,
-                        "document_type": self._get_document_type(filename)
-                    })
-                    chunk_id += 1
-                current_chunk = paragraph + "\n\n"
-        
-        # Add the last chunk
-        if current_chunk.strip():
-            chunks.append({
-                "content": current_chunk.strip(),
-                "filename": filename,
-                "access_level": access_level,
-                "chunk_id": chunk_id,
-                "document_type": self._get_document_type(filename)
-            })
-        
-        return chunks
-    
-    def _get_document_type(self, filename: str) -> str:
-        """Determine document type from filename"""
-        filename_lower = filename.lower()
-        if "benefits" in filename_lower:
-            return "benefits"
-        elif "handbook" in filename_lower:
-            return "handbook"
-        elif "leave" in filename_lower:
-            return "leave_policy"
-        elif "performance" in filename_lower:
-            return "performance"
-        elif "compensation" in filename_lower:
-            return "compensation"
-        elif "termination" in filename_lower:
-            return "termination"
-        else:
-            return "policy"
+    def parse_document_file(self, file_path: Path) -> List[Dict[str, Any]]:
+        """Parse a document straight from disk, memory-mapped (same chunks as parse_document_content)"""
+        return list(self.chunker.parse_file(str(file_path), Path(file_path).name))
     
     def ingest_documents(self, data_folder: str):
-        """Ingest all documents from the data folder"""
+        """Ingest new and changed documents from the data folder"""
         data_path = Path(data_folder)
         
         if not data_path.exists():
@@ -207,34 +191,136 @@ class RAGSystem:
         print(f"Found {len(txt_files)} text files to process...")
         
         total_chunks = 0
+        deleted_objects = 0
+        start_time = time.time()
         documents_collection = self.client.collections.get("Document")
         
-        for file_path in txt_files:
+        # Hash every file first so unchanged files are never parsed; the rest are
+        # chunked in order, on parse_workers processes when > 1
+        changed_files, skipped_files = self.manifest.changed_files(txt_files)
+        parsed_files = self.metrics.timed_iter(
+            "parse", parse_files(self.chunker, [file_path for file_path, _ in changed_files], self.parse_workers)
+        )
+        
+        for (file_path, file_hash), parsed in zip(changed_files, parsed_files):
             try:
-                print(f"Processing {file_path.name}...")
+                if parsed.error:
+                    raise RuntimeError(parsed.error)
                 
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
+                print(f"Processing {file_path.name}...")
                 
-                # Parse and chunk the document
-                chunks = self.parse_document_content(content, file_path.name)
+                # Diff the parsed chunks against the manifest
+                chunks = parsed.to_chunks()
+                plan = self.manifest.plan_file(file_path.name, file_hash, chunks)
                 
-                # Insert chunks into Weaviate using v4 batch insert
+                # Insert into Weaviate using v4 batch insert; a batch write with
+                # an existing UUID replaces that object
                 with documents_collection.batch.dynamic() as batch:
-                    for chunk in chunks:
-                        batch.add_object(
-                            properties=chunk
-                        )
+                    with self.metrics.ingest_stage("upsert"):
+                        for object_id, chunk in plan.upserts:
+                            batch.add_object(
+                                properties=dict(chunk),
+                                uuid=object_id
+                            )
+                    flush_start = time.perf_counter()
+                # Leaving the batch context sends the remaining objects and waits for them
+                self.metrics.observe_ingest("flush", time.perf_counter() - flush_start)
+                failed_ids = [str(failed.object_.uuid) for failed in documents_collection.batch.failed_objects]
                 
+                if plan.stale_ids:
+                    with self.metrics.ingest_stage("delete"):
+                        self._delete_objects(plan.stale_ids)
+                    deleted_objects += len(plan.stale_ids)
+                
+                self.manifest.commit(plan, failed_ids)
                 total_chunks += len(chunks)
-                print(f"  - Added {len(chunks)} chunks from {file_path.name}")
+                self.metrics.count_chunks("written", len(plan.upserts) - len(failed_ids))
+                self.metrics.count_chunks("failed", len(failed_ids))
+                print(f"  - Added {len(plan.upserts) - len(failed_ids)} new or changed chunks "
+                      f"({len(chunks)} total) from {file_path.name}")
                 
             except Exception as e:
                 print(f"Error processing {file_path.name}: {e}")
         
+        # Remove objects for files that were deleted from the folder
+        for filename in self.manifest.removed_files(f.name for f in txt_files):
+            stale_ids = self.manifest.forget_file(filename)
+            try:
+                with self.metrics.ingest_stage("delete"):
+                    self._delete_objects(stale_ids)
+                deleted_objects += len(stale_ids)
+                print(f"Removed {len(stale_ids)} chunks of deleted file {filename}")
+            except Exception as e:
+                print(f"Error removing chunks of {filename}: {e}")
+        
+        self.manifest.save()
+        # Cached search results may reference replaced or deleted chunks
+        if self.query_cache is not None:
+            self.query_cache.bump_generation()
+        
+        self.metrics.observe_ingest("total", time.time() - start_time)
+        self.metrics.count_chunks("deleted", deleted_objects)
         print(f"\nIngestion complete! Total chunks processed: {total_chunks}")
+        if skipped_files:
+            print(f"Unchanged files skipped: {skipped_files}")
+        if deleted_objects:
+            print(f"Stale chunks deleted: {deleted_objects}")
     
-    def search(self, query: str, user_role: str = "user", limit: int = 5) -> List[Dict[str, Any]]:
+    def ingest_documents_streaming(self, data_folder: str, config: Optional[PipelineConfig] = None) -> Dict[str, Any]:
+        """
+        Ingest with overlapping stages: file reads, chunking, and batched inserts run
+        concurrently with bounded queues in between. Honors the incremental manifest.
+        """
+        data_path = Path(data_folder)
+        
+        if not data_path.exists():
+            print(f"Data folder {data_folder} does not exist!")
+            return {}
+        
+        txt_files = list(data_path.glob("*.txt"))
+        
+        if not txt_files:
+            print("No .txt files found in the data folder!")
+            return {}
+        
+        print(f"Found {len(txt_files)} text files to stream...")
+        
+        documents_collection = self.client.collections.get("Document")
+        
+        def parse(file_path):
+            # Streamed: the pipeline pulls chunks a batch at a time; parse time is recorded per file
+            return self.metrics.timed_stream("parse", self.chunker.parse_file(str(file_path), file_path.name))
+        
+        def insert(batch):
+            # insert_many goes through the batch endpoint, which replaces existing IDs
+            with self.metrics.ingest_stage("upsert"):
+                response = documents_collection.data.insert_many([
+                    wvc.data.DataObject(properties=dict(chunk), uuid=object_id) for object_id, chunk in batch
+                ])
+            return [batch[i][0] for i in response.errors]
+        
+        def delete(object_ids):
+            with self.metrics.ingest_stage("delete"):
+                self._delete_objects(object_ids)
+        
+        ingest = StreamingIngest(self.manifest, parse, insert, delete, config=config)
+        result = ingest.run(txt_files)
+        # Cached search results may reference replaced or deleted chunks
+        if self.query_cache is not None:
+            self.query_cache.bump_generation()
+        self.metrics.observe_ingest("total", result["seconds"])
+        for key in ("written", "failed", "deleted"):
+            self.metrics.count_chunks(key, result[key])
+        return result
+    
+    def _delete_objects(self, object_ids: List[str]):
+        """Delete objects by ID"""
+        documents_collection = self.client.collections.get("Document")
+        documents_collection.data.delete_many(
+            where=wvc.query.Filter.by_id().contains_any(object_ids)
+        )
+    
+    def search(self, query: str, user_role: str = "user", limit: int = 5, use_cache: bool = True) -> List[Dict[str, Any]]:
         """
         Perform hybrid search (vector + keyword) with role-based access control
         
@@ -242,44 +328,63 @@ class RAGSystem:
             query: Search query
             user_role: 'user' or 'admin'
             limit: Maximum number of results to return
+            use_cache: serve repeated queries from the in-process result cache
         """
+        with self.metrics.search_stage("total"):
+            return search_with_cache(self.query_cache, self._search, query, user_role, limit, use_cache,
+                                     on_hit=partial(self.metrics.count_search, "result_cache"))
+    
+    def _search(self, query: str, user_role: str = "user", limit: int = 5) -> List[Dict[str, Any]]:
+        """Uncached hybrid search"""
         try:
             documents_collection = self.client.collections.get("Document")
             
-            # Perform hybrid search first, then filter results
-            response = documents_collection.query.hybrid(
-                query=query,
-                limit=limit * 2,  # Get more results to filter
-                return_metadata=wvc.query.MetadataQuery(score=True)
-            )
+            if self.server_side_filter:
+                # Weaviate applies the role filter, so exactly `limit` authorized results come back
+                filters = self._role_filter(user_role)
+                fetch_limit = limit
+            else:
+                # Legacy path: get more results and filter them below
+                filters = None
+                fetch_limit = limit * 2
+            
+            # Weaviate vectorizes the query server-side, so this includes the embedding
+            with self.metrics.search_stage("vector_search"):
+                response = documents_collection.query.hybrid(
+                    query=query,
+                    limit=fetch_limit,
+                    filters=filters,
+                    return_metadata=wvc.query.MetadataQuery(score=True)
+                )
             
             # Filter results based on user role
             processed_results = []
-            for item in response.objects:
-                access_level = item.properties["access_level"]
-                
-                # Apply role-based filtering
-                if user_role.lower() == "admin" or access_level == "user":
-                    processed_results.append({
-                        "content": item.properties["content"],
-                        "filename": item.properties["filename"],
-                        "access_level": item.properties["access_level"],
-                        "chunk_id": item.properties["chunk_id"],
-                        "document_type": item.properties["document_type"],
-                        "score": item.metadata.score if item.metadata.score else 0,
-                        "relevance_explanation": ""
-                    })
+            with self.metrics.search_stage("postprocess"):
+                for item in response.objects:
+                    access_level = item.properties["access_level"]
                     
-                    # Stop when we have enough results
-                    if len(processed_results) >= limit:
-                        break
+                    # Apply role-based filtering (a no-op when the server already filtered)
+                    if user_role.lower() == "admin" or access_level == "user":
+                        processed_results.append(SearchResult.from_payload(item.properties, item.metadata.score if item.metadata.score else 0, relevance_explanation=""))
+                        
+                        # Stop when we have enough results
+                        if len(processed_results) >= limit:
+                            break
             
+            self.metrics.count_search("vector")
             return processed_results
             
         except Exception as e:
+            self.metrics.count_search("error")
             print(f"Error during search: {e}")
             return []
     
+    def _role_filter(self, user_role: str):
+        """Server-side access_level filter for a role; admins see everything"""
+        if user_role.lower() == "admin":
+            return None
+        return wvc.query.Filter.by_property("access_level").equal("user")
+    
     def get_document_stats(self) -> Dict[str, Any]:
         """Get statistics about the ingested documents"""
         try:
@@ -305,7 +410,9 @@ class RAGSystem:
                 "total_chunks": total_count,
                 "user_accessible_chunks": user_count,
                 "admin_only_chunks": admin_count,
-                "document_types": {}  # Simplified for v4
+                "document_types": {},  # Simplified for v4
+                "query_cache": self.query_cache.get_stats() if self.query_cache is not None else None,
+                "metrics": self.metrics.get_stats()
             }
             
         except Exception as e:
@@ -320,6 +427,10 @@ class RAGSystem:
             documents_collection.data.delete_many(
                 where=wvc.query.Filter.by_property("access_level").contains_any(["user", "admin"])
             )
+            self.manifest.reset()
+            self.manifest.save()
+            if self.query_cache is not None:
+                self.query_cache.bump_generation()
             print("All document data cleared successfully!")
         except Exception as e:
             print(f"Error clearing data: {e}")
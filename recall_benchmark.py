@@ -0,0 +1,379 @@
+"""
+Recall@k benchmark against exact nearest neighbours.
+
+Exact top-k is computed with NumPy over the very vectors stored in each
+backend, so recall measures only what the approximate (HNSW) index loses.
+For Qdrant the corpus is copied into scratch collections to sweep HNSW
+`m` / `ef_construct` and search-time `ef`, giving a recall-vs-latency frontier,
+to compare quantization settings (memory footprint vs recall and latency) and
+to time filtered search with and without payload indexes.
+"""
+
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import weaviate.classes as wvc
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue,
+    HnswConfigDiff, OptimizersConfigDiff, SearchParams, CollectionStatus
+)
+
+from bench_stats import summarize_latencies
+from collection_config import IndexConfig, QuantizationConfig, search_params
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (cosine similarity becomes a dot product)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int,
+                mask: Optional[np.ndarray] = None) -> List[List[int]]:
+    """Exact cosine top-k row indices for each query; `mask` restricts eligible rows"""
+    scores = normalize_rows(queries) @ normalize_rows(corpus).T
+    if mask is not None:
+        scores[:, ~mask] = -np.inf
+    k = min(k, corpus.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for row, candidates in enumerate(top):
+        ordered = candidates[np.argsort(-scores[row, candidates])]
+        results.append([int(i) for i in ordered if scores[row, i] != -np.inf])
+    return results
+
+
+def recall_at_k(approximate: Sequence[Any], exact: Sequence[Any]) -> float:
+    """Fraction of the exact top-k that the approximate search returned"""
+    if not exact:
+        return 1.0
+    return len(set(approximate) & set(exact)) / len(exact)
+
+
+def pareto_frontier(points: List[Dict[str, Any]], latency_key: str = "p50_ms") -> List[Dict[str, Any]]:
+    """Settings not beaten on both latency and recall by any other setting"""
+    ordered = sorted(points, key=lambda p: (p["latency"][latency_key], -p["recall"]))
+    frontier = []
+    best_recall = -1.0
+    for point in ordered:
+        if point["recall"] > best_recall:
+            frontier.append(point)
+            best_recall = point["recall"]
+    return frontier
+
+
+def role_mask(access_levels: Sequence[str], user_role: str) -> Optional[np.ndarray]:
+    """Rows visible to a role (None = everything)"""
+    if user_role.lower() == "admin":
+        return None
+    return np.array([level == "user" for level in access_levels], dtype=bool)
+
+
+def qdrant_role_filter(user_role: str) -> Optional[Filter]:
+    """Qdrant filter equivalent to role_mask"""
+    if user_role.lower() == "admin":
+        return None
+    return Filter(must=[FieldCondition(key="access_level", match=MatchValue(value="user"))])
+
+
+def load_qdrant_corpus(client: Any, collection_name: str, batch: int = 256) -> Tuple[List[Any], np.ndarray, List[Dict[str, Any]]]:
+    """Scroll every point with its vector and payload"""
+    ids, vectors, payloads = [], [], []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        for record in records:
+            ids.append(record.id)
+            vectors.append(record.vector)
+            payloads.append(record.payload)
+        if offset is None:
+            break
+    return ids, np.asarray(vectors, dtype=np.float32), payloads
+
+
+def wait_until_indexed(client: Any, collection_name: str, timeout: float = 120.0):
+    """Block until the optimizer has finished building the collection's index"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get_collection(collection_name)
+        if info.status == CollectionStatus.GREEN:
+            return
+        time.sleep(0.2)
+    print(f"Warning: {collection_name} still indexing after {timeout:.0f}s")
+
+
+def build_qdrant_collection(client: Any, collection_name: str, ids: List[Any], vectors: np.ndarray,
+                            payloads: List[Dict[str, Any]], batch: int = 256,
+                            payload_indexes: Optional[IndexConfig] = None, **collection_config: Any):
+    """
+    (Re)create a scratch collection holding the given points. Extra keyword arguments
+    (hnsw_config, quantization_config, ...) are passed to create_collection. Indexing
+    is forced even for small corpora so HNSW settings actually take effect. Payload
+    indexes from `payload_indexes` are created before the upload, as initialize_collection does.
+    """
+    try:
+        client.delete_collection(collection_name)
+    except Exception:
+        pass
+    collection_config.setdefault("optimizers_config", OptimizersConfigDiff(indexing_threshold=1))
+    vectors_config = collection_config.pop(
+        "vectors_config", VectorParams(size=vectors.shape[1], distance=Distance.COSINE)
+    )
+    client.create_collection(collection_name=collection_name, vectors_config=vectors_config, **collection_config)
+    if payload_indexes is not None:
+        payload_indexes.create_payload_indexes(client, collection_name)
+    for i in range(0, len(ids), batch):
+        client.upsert(
+            collection_name=collection_name,
+            points=[
+                PointStruct(id=ids[j], vector=vectors[j].tolist(), payload=payloads[j])
+                for j in range(i, min(i + batch, len(ids)))
+            ]
+        )
+    wait_until_indexed(client, collection_name)
+
+
+def measure_qdrant_search(client: Any, collection_name: str, query_vectors: np.ndarray,
+                          exact_ids: List[List[Any]], k: int, user_role: str = "user",
+                          search_params: Optional[SearchParams] = None, repetitions: int = 3,
+                          query_filter: Optional[Filter] = None) -> Dict[str, Any]:
+    """Latency and mean recall@k of one search configuration (query_filter overrides the role's filter)"""
+    if query_filter is None:
+        query_filter = qdrant_role_filter(user_role)
+    recalls = []
+    samples = []
+    for repetition in range(repetitions + 1):
+        for query_vector, expected in zip(query_vectors, exact_ids):
+            start_ns = time.perf_counter_ns()
+            hits = client.search(
+                collection_name=collection_name,
+                query_vector=query_vector.tolist(),
+                query_filter=query_filter,
+                search_params=search_params,
+                limit=k,
+                with_payload=False
+            )
+            elapsed = time.perf_counter_ns() - start_ns
+            if repetition == 0:
+                # First pass is warm-up; it also gives the (deterministic) recall
+                recalls.append(recall_at_k([hit.id for hit in hits], expected))
+            else:
+                samples.append(elapsed)
+    return {"recall": float(np.mean(recalls)) if recalls else 0.0, "latency": summarize_latencies(samples)}
+
+
+def sample_corpus_queries(vectors: np.ndarray, n: int, seed: int = 7) -> np.ndarray:
+    """Corpus vectors reused as extra queries, so recall is measured on more than a handful of questions"""
+    if n <= 0 or vectors.shape[0] == 0:
+        return np.zeros((0, vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(vectors.shape[0], size=min(n, vectors.shape[0]), replace=False)
+    return vectors[rows]
+
+
+def qdrant_hnsw_sweep(client: Any, ids: List[Any], vectors: np.ndarray, payloads: List[Dict[str, Any]],
+                      query_vectors: np.ndarray, k: int, user_role: str = "user",
+                      m_values: Sequence[int] = (8, 16, 32), ef_construct_values: Sequence[int] = (64, 128),
+                      ef_values: Sequence[int] = (16, 32, 64, 128), repetitions: int = 3,
+                      scratch_name: str = "documents_recall_sweep") -> List[Dict[str, Any]]:
+    """Build one scratch collection per (m, ef_construct) and search it at each ef"""
+    mask = role_mask([payload["access_level"] for payload in payloads], user_role)
+    exact_ids = [[ids[row] for row in rows] for rows in exact_top_k(vectors, query_vectors, k, mask)]
+
+    results = []
+    try:
+        for m in m_values:
+            for ef_construct in ef_construct_values:
+                print(f"  - Building m={m}, ef_construct={ef_construct}...")
+                build_start = time.perf_counter()
+                build_qdrant_collection(
+                    client, scratch_name, ids, vectors, payloads,
+                    hnsw_config=HnswConfigDiff(m=m, ef_construct=ef_construct, full_scan_threshold=10)
+                )
+                build_seconds = time.perf_counter() - build_start
+                for ef in ef_values:
+                    measured = measure_qdrant_search(
+                        client, scratch_name, query_vectors, exact_ids, k, user_role,
+                        SearchParams(hnsw_ef=ef, exact=False), repetitions
+                    )
+                    measured.update({"m": m, "ef_construct": ef_construct, "ef": ef, "build_seconds": build_seconds})
+                    print(f"    ef={ef:<4} recall@{k} {measured['recall']:.3f}  "
+                          f"p50 {measured['latency']['p50_ms']:.2f}ms  p99 {measured['latency']['p99_ms']:.2f}ms")
+                    results.append(measured)
+    finally:
+        try:
+            client.delete_collection(scratch_name)
+        except Exception:
+            pass
+    return results
+
+
+def expand_corpus(vectors: np.ndarray, payloads: List[Dict[str, Any]], target_points: int,
+                  noise: float = 0.5, seed: int = 11) -> Tuple[List[int], np.ndarray, List[Dict[str, Any]]]:
+    """
+    Grow a corpus to target_points by adding jittered copies of its vectors (payloads
+    repeat), so memory and latency can be measured at more than demo scale
+    """
+    count = max(target_points, vectors.shape[0])
+    rng = np.random.default_rng(seed)
+    rows = np.arange(count) % vectors.shape[0]
+    expanded = normalize_rows(vectors)[rows]
+    jitter = rng.standard_normal(expanded.shape).astype(np.float32) * (noise / np.sqrt(vectors.shape[1]))
+    # The first copy of each vector stays exact
+    jitter[:vectors.shape[0]] = 0.0
+    return list(range(count)), normalize_rows(expanded + jitter), [payloads[row] for row in rows]
+
+
+def default_quantization_settings(oversampling: float = 2.0) -> List[QuantizationConfig]:
+    """float32 baseline, then scalar and binary with and without rescoring and with originals on disk"""
+    return [
+        QuantizationConfig("none"),
+        QuantizationConfig("scalar", rescore=False),
+        QuantizationConfig("scalar", oversampling=oversampling),
+        QuantizationConfig("scalar", oversampling=oversampling, originals_on_disk=True),
+        QuantizationConfig("binary", rescore=False),
+        QuantizationConfig("binary", oversampling=oversampling),
+        QuantizationConfig("binary", oversampling=oversampling, originals_on_disk=True)
+    ]
+
+
+def qdrant_quantization_sweep(client: Any, ids: List[Any], vectors: np.ndarray, payloads: List[Dict[str, Any]],
+                              query_vectors: np.ndarray, k: int, user_role: str = "user",
+                              settings: Optional[Sequence[QuantizationConfig]] = None, repetitions: int = 3,
+                              scratch_name: str = "documents_quantization_sweep") -> List[Dict[str, Any]]:
+    """Build one scratch collection per quantization setting; measure recall@k, latency and vector RAM"""
+    settings = settings or default_quantization_settings()
+    mask = role_mask([payload["access_level"] for payload in payloads], user_role)
+    exact_ids = [[ids[row] for row in rows] for rows in exact_top_k(vectors, query_vectors, k, mask)]
+    dimension = vectors.shape[1]
+
+    results = []
+    try:
+        for config in settings:
+            print(f"  - Building {config.describe()}...")
+            build_start = time.perf_counter()
+            build_qdrant_collection(client, scratch_name, ids, vectors, payloads,
+                                    **config.collection_kwargs(dimension))
+            build_seconds = time.perf_counter() - build_start
+            measured = measure_qdrant_search(
+                client, scratch_name, query_vectors, exact_ids, k, user_role, config.search_params(), repetitions
+            )
+            measured.update({
+                "setting": config.describe(),
+                "mode": config.mode,
+                "rescore": config.rescore,
+                "oversampling": config.oversampling,
+                "originals_on_disk": config.originals_on_disk,
+                "vector_ram_mb": config.ram_bytes_per_vector(dimension) * len(ids) / 1e6,
+                "build_seconds": build_seconds
+            })
+            print(f"    recall@{k} {measured['recall']:.3f}  p99 {measured['latency']['p99_ms']:.2f}ms  "
+                  f"vector RAM ~{measured['vector_ram_mb']:.1f}MB")
+            results.append(measured)
+    finally:
+        try:
+            client.delete_collection(scratch_name)
+        except Exception:
+            pass
+    return results
+
+
+def qdrant_filter_comparison(client: Any, ids: List[Any], vectors: np.ndarray, payloads: List[Dict[str, Any]],
+                             query_vectors: np.ndarray, k: int, index: Optional[IndexConfig] = None,
+                             repetitions: int = 3,
+                             scratch_name: str = "documents_filter_bench") -> List[Dict[str, Any]]:
+    """
+    Filtered-search latency and recall@k per role, before (no payload indexes, admin
+    queries filtered with `user OR admin`) and after (payload indexes and `index`'s
+    HNSW settings, admin queries unfiltered)
+    """
+    index = index or IndexConfig()
+    # The filter admins used to get: matches every point, but is still evaluated per candidate
+    legacy_admin_filter = Filter(should=[
+        FieldCondition(key="access_level", match=MatchValue(value="user")),
+        FieldCondition(key="access_level", match=MatchValue(value="admin"))
+    ])
+    layouts = [
+        ("before", {}, None, legacy_admin_filter),
+        ("after", index.collection_kwargs(), index, None)
+    ]
+    exact_ids = {
+        role: [[ids[row] for row in rows] for rows in exact_top_k(
+            vectors, query_vectors, k, role_mask([payload["access_level"] for payload in payloads], role)
+        )]
+        for role in ("user", "admin")
+    }
+
+    results = []
+    try:
+        for layout, collection_config, payload_indexes, admin_filter in layouts:
+            print(f"  - Building '{layout}' collection "
+                  f"({index.describe() if payload_indexes is not None else 'no payload indexes'})...")
+            build_qdrant_collection(client, scratch_name, ids, vectors, payloads,
+                                    payload_indexes=payload_indexes, **collection_config)
+            params = search_params(index) if payload_indexes is not None else None
+            for role in ("user", "admin"):
+                query_filter = admin_filter if role == "admin" else None
+                measured = measure_qdrant_search(
+                    client, scratch_name, query_vectors, exact_ids[role], k, role, params, repetitions, query_filter
+                )
+                measured.update({
+                    "layout": layout,
+                    "role": role,
+                    "filter": "user OR admin" if query_filter is not None else
+                              ("none" if role == "admin" else "access_level = user")
+                })
+                print(f"    {role:<6} recall@{k} {measured['recall']:.3f}  p50 {measured['latency']['p50_ms']:.2f}ms  "
+                      f"p99 {measured['latency']['p99_ms']:.2f}ms")
+                results.append(measured)
+    finally:
+        try:
+            client.delete_collection(scratch_name)
+        except Exception:
+            pass
+    return results
+
+
+def load_weaviate_corpus(collection: Any) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]]]:
+    """Iterate every object with its vector and properties"""
+    ids, vectors, payloads = [], [], []
+    for item in collection.iterator(include_vector=True):
+        vector = item.vector.get("default") if isinstance(item.vector, dict) else item.vector
+        ids.append(str(item.uuid))
+        vectors.append(vector)
+        payloads.append(item.properties)
+    return ids, np.asarray(vectors, dtype=np.float32), payloads
+
+
+def measure_weaviate_recall(collection: Any, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]],
+                            query_vectors: np.ndarray, k: int, user_role: str = "user",
+                            repetitions: int = 3) -> Dict[str, Any]:
+    """Recall@k of Weaviate near_vector search at its configured HNSW settings"""
+    mask = role_mask([payload["access_level"] for payload in payloads], user_role)
+    exact_ids = [[ids[row] for row in rows] for rows in exact_top_k(vectors, query_vectors, k, mask)]
+    filters = None if mask is None else wvc.query.Filter.by_property("access_level").equal("user")
+
+    recalls = []
+    samples = []
+    for repetition in range(repetitions + 1):
+        for query_vector, expected in zip(query_vectors, exact_ids):
+            start_ns = time.perf_counter_ns()
+            response = collection.query.near_vector(
+                near_vector=query_vector.tolist(),
+                limit=k,
+                filters=filters
+            )
+            elapsed = time.perf_counter_ns() - start_ns
+            if repetition == 0:
+                recalls.append(recall_at_k([str(item.uuid) for item in response.objects], expected))
+            else:
+                samples.append(elapsed)
+    return {"recall": float(np.mean(recalls)) if recalls else 0.0, "latency": summarize_latencies(samples)}
@@ -0,0 +1,174 @@
+"""
+Compact records for chunks and search results.
+
+Chunk and SearchResult use __slots__ instead of a per-object dict and intern
+their repeated metadata strings (filename, access level, document type), so a
+million chunks share a handful of string objects. Both are read-only Mappings,
+so existing code that does chunk["content"], result.get("score") or dict(result)
+keeps working. ChunkBatch stores many chunks as parallel columns for bulk ingest.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+_intern = sys.intern
+
+
+class _Record(Mapping):
+    """Read-only mapping over a record's slots; fields set to None are left out"""
+    __slots__ = ()
+    _fields = ()
+    _field_set = frozenset()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self._fields if getattr(self, name) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for name in self._fields if getattr(self, name) is not None)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={self[name]!r}' for name in self)})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy (for client libraries that require a dict payload)"""
+        return {name: self[name] for name in self}
+
+
+class Chunk(_Record):
+    """One chunk of a document, as stored in the vector databases"""
+    __slots__ = ("content", "filename", "access_level", "chunk_id", "document_type")
+    _fields = __slots__
+    _field_set = frozenset(__slots__)
+
+    def __init__(self, content: str, filename: str, access_level: str, chunk_id: int, document_type: str):
+        self.content = content
+        self.filename = _intern(filename)
+        self.access_level = _intern(access_level)
+        self.chunk_id = chunk_id
+        self.document_type = _intern(document_type)
+
+    @classmethod
+    def from_mapping(cls, chunk: Mapping) -> "Chunk":
+        """Chunk from a chunk dict (or another Chunk, returned as is)"""
+        if isinstance(chunk, Chunk):
+            return chunk
+        return cls(chunk["content"], chunk["filename"], chunk["access_level"], chunk["chunk_id"],
+                   chunk["document_type"])
+
+
+class SearchResult(_Record):
+    """
+    One search hit. search_time (seconds for the whole query) is a reference to one
+    float shared by every hit of that query, not a copy per result
+    """
+    __slots__ = ("content", "filename", "access_level", "chunk_id", "document_type", "score",
+                 "search_time", "relevance_explanation")
+    _fields = __slots__
+    _field_set = frozenset(__slots__)
+
+    def __init__(self, content: str, filename: str, access_level: str, chunk_id: int, document_type: str,
+                 score: float, search_time: Optional[float] = None, relevance_explanation: Optional[str] = None):
+        self.content = content
+        self.filename = _intern(filename)
+        self.access_level = _intern(access_level)
+        self.chunk_id = chunk_id
+        self.document_type = _intern(document_type)
+        self.score = score
+        self.search_time = search_time
+        self.relevance_explanation = relevance_explanation
+
+    @classmethod
+    def from_payload(cls, payload: Mapping, score: float, search_time: Optional[float] = None,
+                     relevance_explanation: Optional[str] = None) -> "SearchResult":
+        """Result for a stored chunk payload (dict or Chunk)"""
+        return cls(payload["content"], payload["filename"], payload["access_level"], payload["chunk_id"],
+                   payload["document_type"], score, search_time, relevance_explanation)
+
+
+def json_default(value: Any) -> Any:
+    """
+    json.dump default: records (and other mappings) become JSON objects, anything else its str()
+
+    >>> import json
+    >>> hit = SearchResult("text", "a.txt", "user", 0, "policy", 0.5)
+    >>> json.loads(json.dumps({"results": [hit]}, default=json_default))["results"][0]["score"]
+    0.5
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def copy_results(results: Iterable[Mapping]) -> List[Mapping]:
+    """Copies safe to hand out from a cache: records are read-only and shared, dicts are copied"""
+    return [result if isinstance(result, _Record) else dict(result) for result in results]
+
+
+class ChunkBatch:
+    """Chunks as parallel columns (one list per field) for bulk ingestion"""
+    __slots__ = ("contents", "filenames", "access_levels", "chunk_ids", "document_types")
+
+    def __init__(self):
+        self.contents: List[str] = []
+        self.filenames: List[str] = []
+        self.access_levels: List[str] = []
+        self.chunk_ids: List[int] = []
+        self.document_types: List[str] = []
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Mapping]) -> "ChunkBatch":
+        batch = cls()
+        batch.extend(chunks)
+        return batch
+
+    def append(self, chunk: Mapping):
+        self.contents.append(chunk["content"])
+        self.filenames.append(_intern(chunk["filename"]))
+        self.access_levels.append(_intern(chunk["access_level"]))
+        self.chunk_ids.append(chunk["chunk_id"])
+        self.document_types.append(_intern(chunk["document_type"]))
+
+    def extend(self, chunks: Iterable[Mapping]):
+        for chunk in chunks:
+            self.append(chunk)
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, index: int) -> Chunk:
+        return Chunk(self.contents[index], self.filenames[index], self.access_levels[index],
+                     self.chunk_ids[index], self.document_types[index])
+
+    def __setitem__(self, index: int, chunk: Mapping):
+        self.contents[index] = chunk["content"]
+        self.filenames[index] = _intern(chunk["filename"])
+        self.access_levels[index] = _intern(chunk["access_level"])
+        self.chunk_ids[index] = chunk["chunk_id"]
+        self.document_types[index] = _intern(chunk["document_type"])
+
+    def __iter__(self) -> Iterator[Chunk]:
+        for i in range(len(self.contents)):
+            yield self[i]
+
+    def pop(self) -> Chunk:
+        """Remove and return the last row"""
+        return Chunk(self.contents.pop(), self.filenames.pop(), self.access_levels.pop(),
+                     self.chunk_ids.pop(), self.document_types.pop())
+
+    def slice(self, start: int, stop: int) -> "ChunkBatch":
+        """Rows start..stop as a new batch (e.g. one embedding request)"""
+        batch = ChunkBatch()
+        batch.contents = self.contents[start:stop]
+        batch.filenames = self.filenames[start:stop]
+        batch.access_levels = self.access_levels[start:stop]
+        batch.chunk_ids = self.chunk_ids[start:stop]
+        batch.document_types = self.document_types[start:stop]
+        return batch
@@ -0,0 +1,140 @@
+"""
+Semantic cache of search() results.
+Recent query embeddings are kept in a small matrix per (role, limit) scope; a new
+query whose cosine similarity to a cached one reaches the threshold is answered
+with that query's results, skipping the vector search. Paraphrases hit, but a
+threshold set too low serves results for a different question, so the
+benchmark reports how often that happens.
+"""
+
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from records import copy_results
+
+
+class _Scope:
+    """Cached queries for one (role, limit) pair"""
+
+    def __init__(self, dimension: int, capacity: int):
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.stored_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        # row -> (query, results, compute_seconds)
+        self.entries: List[Tuple[str, List[Dict[str, Any]], float]] = []
+        self.size = 0
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, max_entries: int = 256, ttl_seconds: float = 300.0):
+        """
+        Empty cache
+
+        Args:
+            threshold: minimum cosine similarity for a cached query to answer a new one
+            max_entries: cached queries per (role, limit) scope; least recently used are evicted
+            ttl_seconds: seconds an entry stays valid (<= 0 means no expiry)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        self._similarity_sum = 0.0
+        self._scopes: Dict[Tuple[str, int], _Scope] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def lookup(self, vector: List[float], user_role: str, limit: int) -> Optional[Dict[str, Any]]:
+        """
+        Closest cached query in the caller's scope if it clears the threshold:
+        {"results", "similarity", "query"}; None on a miss
+        """
+        query_vector = self._normalize(vector)
+        with self._lock:
+            scope = self._scopes.get((user_role.lower(), limit))
+            if scope is None or scope.size == 0 or scope.vectors.shape[1] != query_vector.shape[0]:
+                self.misses += 1
+                return None
+
+            now = time.monotonic()
+            scores = scope.vectors[:scope.size] @ query_vector
+            if self.ttl_seconds > 0:
+                scores = np.where(now - scope.stored_at[:scope.size] > self.ttl_seconds, -np.inf, scores)
+            row = int(np.argmax(scores))
+            similarity = float(scores[row])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            scope.last_used[row] = now
+            query, results, compute_seconds = scope.entries[row]
+            self.hits += 1
+            self.saved_seconds += compute_seconds
+            self._similarity_sum += similarity
+            return {"results": copy_results(results), "similarity": similarity, "query": query}
+
+    def put(self, vector: List[float], query: str, user_role: str, limit: int,
+            results: List[Dict[str, Any]], generation: int, compute_seconds: float):
+        """Cache results computed under `generation`; stale generations are dropped"""
+        query_vector = self._normalize(vector)
+        with self._lock:
+            if generation != self.generation or self.max_entries <= 0:
+                return
+            key = (user_role.lower(), limit)
+            scope = self._scopes.get(key)
+            if scope is None or scope.vectors.shape[1] != query_vector.shape[0]:
+                scope = self._scopes[key] = _Scope(query_vector.shape[0], self.max_entries)
+
+            now = time.monotonic()
+            entry = (query, copy_results(results), compute_seconds)
+            if scope.size < self.max_entries:
+                row = scope.size
+                scope.size += 1
+                scope.entries.append(entry)
+            else:
+                row = int(np.argmin(scope.last_used[:scope.size]))
+                scope.entries[row] = entry
+                self.evictions += 1
+            scope.vectors[row] = query_vector
+            scope.stored_at[row] = now
+            scope.last_used[row] = now
+
+    def bump_generation(self):
+        """Invalidate every cached result (call after the collection changes)"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += sum(scope.size for scope in self._scopes.values())
+            self._scopes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit ratio, saved latency and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(scope.size for scope in self._scopes.values()),
+            "scopes": len(self._scopes),
+            "threshold": self.threshold,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "avg_hit_similarity": self._similarity_sum / self.hits if self.hits else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "saved_seconds": self.saved_seconds,
+            "avg_saved_ms": self.saved_seconds * 1000 / self.hits if self.hits else 0.0
+        }
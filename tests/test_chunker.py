@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+
+from chunker import Chunker, parse_files
+from ingest_benchmark import legacy_parse, time_parse_files, write_synthetic_corpus, write_synthetic_file
+
+DATA_FOLDER = Path(__file__).resolve().parent.parent / "data"
+SAMPLE_FILES = sorted(DATA_FOLDER.glob("*.txt"))
+
+MIXED_DOCUMENT = (
+    "Preamble before the first marker is dropped.\n\n"
+    "=== ACCESS: user ===\n"
+    "Short paragraph.\n\n"
+    + "A much longer user paragraph that keeps going. " * 8 + "\n\n\n"
+    "  Indented paragraph after extra blank lines.  \n\n"
+    "=== ACCESS: admin ===\n\n"
+    "Admin only: salary bands.\n\n"
+    + "Admin detail sentence. " * 20 + "\n\n"
+    "=== ACCESS: user ===\n"
+    "Second user section.\n"
+)
+
+
+def content_and_access(chunks):
+    return [(chunk["content"], chunk["access_level"]) for chunk in chunks]
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES, ids=lambda path: path.name)
+def test_parse_matches_legacy_on_sample_files(path):
+    content = path.read_text(encoding="utf-8")
+    expected = content_and_access(legacy_parse(content, path.name))
+    assert expected
+    assert content_and_access(Chunker().parse(content, path.name)) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [40, 120, 300])
+def test_parse_matches_legacy_across_sections(chunk_size):
+    expected = content_and_access(legacy_parse(MIXED_DOCUMENT, "mixed.txt", chunk_size))
+    assert {access for _, access in expected} == {"user", "admin"}
+    assert content_and_access(Chunker(max_size=chunk_size).parse(MIXED_DOCUMENT, "mixed.txt")) == expected
+
+
+def test_unmarked_document_is_user_content():
+    text = "First paragraph.\n\nSecond paragraph."
+    chunks = list(Chunker().parse(text, "plain.txt"))
+    assert content_and_access(chunks) == content_and_access(legacy_parse(text, "plain.txt"))
+    assert {chunk["access_level"] for chunk in chunks} == {"user"}
+
+
+def as_dicts(chunks):
+    return [dict(chunk) for chunk in chunks]
+
+
+@pytest.mark.parametrize("crlf", [False, True], ids=["lf", "crlf"])
+@pytest.mark.parametrize("block_size", [64, 1 << 20])
+def test_parse_file_matches_parse(tmp_path, crlf, block_size):
+    path = tmp_path / "large.txt"
+    write_synthetic_file(str(DATA_FOLDER), str(path), 200_000, crlf=crlf)
+    if crlf:
+        assert b"\r\n" in path.read_bytes()
+    chunker = Chunker()
+    # parse_file decodes like open(..., "r"), so CRLF becomes LF before chunking
+    expected = as_dicts(chunker.parse(path.read_text(encoding="utf-8"), path.name))
+    assert expected
+    assert as_dicts(chunker.parse_file(str(path), block_size=block_size)) == expected
+
+
+@pytest.mark.parametrize("crlf", [False, True], ids=["lf", "crlf"])
+def test_parse_file_matches_parse_across_sections(tmp_path, crlf):
+    path = tmp_path / "mixed.txt"
+    path.write_text(MIXED_DOCUMENT, encoding="utf-8", newline="\r\n" if crlf else "\n")
+    chunker = Chunker(max_size=120, overlap=40)
+    expected = as_dicts(chunker.parse(MIXED_DOCUMENT, path.name))
+    assert as_dicts(chunker.parse_file(str(path), block_size=16)) == expected
+
+
+def test_parse_file_empty(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(Chunker().parse_file(str(path))) == []
+
+
+def test_parse_files_same_ordered_output_for_any_worker_count(tmp_path):
+    paths = write_synthetic_corpus(str(DATA_FOLDER), str(tmp_path), file_count=10, file_bytes=8_000)
+    chunker = Chunker()
+    runs = [time_parse_files(chunker, paths, workers) for workers in (1, 2, 4)]
+    assert runs[0]["chunks"] > 0
+    assert all(run["errors"] == 0 for run in runs)
+    assert len({run["chunks"] for run in runs}) == 1
+    assert len({run["digest"] for run in runs}) == 1
+
+
+def test_parse_files_keeps_input_order_and_records_errors(tmp_path):
+    paths = write_synthetic_corpus(str(DATA_FOLDER), str(tmp_path), file_count=5, file_bytes=2_000)
+    paths.insert(2, tmp_path / "missing.txt")
+    parsed = list(parse_files(Chunker(), paths, workers=2, files_per_task=2))
+    assert [item.path for item in parsed] == [str(path) for path in paths]
+    assert parsed[2].error is not None and len(parsed[2]) == 0
+    for item, path in zip(parsed, paths):
+        if item.error is None:
+            expected = [(chunk["access_level"], chunk["chunk_id"], chunk["content"])
+                        for chunk in Chunker().parse_file(str(path))]
+            assert list(zip(item.access_levels, item.chunk_ids, item.contents)) == expected
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+from qdrant_client import QdrantClient
+
+import rag_qdrant
+from embedders import FakeEmbedder
+
+DATA_FOLDER = Path(__file__).resolve().parent.parent / "data"
+QUERIES = ["vacation policy", "salary bands for executives", "security incident response",
+           "performance review process", "termination severance"]
+
+
+@pytest.fixture(params=["shared", "partitioned"])
+def qdrant_rag(request, tmp_path, monkeypatch):
+    """QdrantRAGSystem on an in-memory Qdrant, with the sample documents ingested"""
+    monkeypatch.setattr(rag_qdrant, "qdrant_client_from_config", lambda *args, **kwargs: QdrantClient(":memory:"))
+    rag_system = rag_qdrant.QdrantRAGSystem(embedder=FakeEmbedder(), embedding_cache_path=None,
+                                            manifest_path=str(tmp_path / "manifest.json"), layout=request.param)
+    rag_system.ingest_documents(str(DATA_FOLDER))
+    yield rag_system
+    rag_system.close()
+
+
+def test_user_search_returns_only_user_chunks(qdrant_rag):
+    for query in QUERIES:
+        # The admin search runs first so a role-blind cache would hand its results to the user
+        assert qdrant_rag.search(query, "admin", 20)
+        results = qdrant_rag.search(query, "user", 20)
+        assert results
+        assert {result["access_level"] for result in results} == {"user"}
+
+
+def test_user_search_batch_returns_only_user_chunks(qdrant_rag):
+    admin_batches = qdrant_rag.search_batch(QUERIES, "admin", 20)
+    assert any(result["access_level"] == "admin" for results in admin_batches for result in results)
+    batches = qdrant_rag.search_batch(QUERIES, "user", 20)
+    assert len(batches) == len(QUERIES)
+    for results in batches:
+        assert results
+        assert {result["access_level"] for result in results} == {"user"}
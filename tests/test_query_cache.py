@@ -0,0 +1,54 @@
+from query_cache import QueryResultCache, search_with_cache
+
+USER_RESULTS = [{"content": "Vacation policy", "access_level": "user", "score": 0.9}]
+ADMIN_RESULTS = [{"content": "Salary bands", "access_level": "admin", "score": 0.8}]
+
+
+def test_admin_entries_are_never_served_to_users():
+    cache = QueryResultCache()
+    cache.put("salary bands", "admin", 5, ADMIN_RESULTS, cache.generation, 0.01)
+    assert cache.get("salary bands", "admin", 5) == ADMIN_RESULTS
+    assert cache.get("salary bands", "user", 5) is None
+    assert cache.get("Salary  Bands", "USER", 5) is None
+
+
+def test_search_with_cache_keeps_roles_apart():
+    cache = QueryResultCache()
+    calls = []
+
+    def search(query, user_role, limit):
+        calls.append(user_role)
+        return ADMIN_RESULTS if user_role == "admin" else USER_RESULTS
+
+    assert search_with_cache(cache, search, "pay", "admin", 5) == ADMIN_RESULTS
+    assert search_with_cache(cache, search, "pay", "user", 5) == USER_RESULTS
+    assert search_with_cache(cache, search, "pay", "user", 5) == USER_RESULTS
+    assert calls == ["admin", "user"]
+
+
+def test_bump_generation_drops_results():
+    cache = QueryResultCache()
+    cache.put("vacation", "user", 5, USER_RESULTS, cache.generation, 0.01)
+    assert cache.get("vacation", "user", 5) == USER_RESULTS
+    cache.bump_generation()
+    assert cache.get("vacation", "user", 5) is None
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_put_with_stale_generation_is_a_no_op():
+    cache = QueryResultCache()
+    generation = cache.generation
+    cache.bump_generation()
+    cache.put("vacation", "user", 5, USER_RESULTS, generation, 0.01)
+    assert cache.get("vacation", "user", 5) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_cached_results_are_copies():
+    cache = QueryResultCache()
+    results = [dict(result) for result in USER_RESULTS]
+    cache.put("vacation", "user", 5, results, cache.generation, 0.01)
+    results[0]["content"] = "changed"
+    cached = cache.get("vacation", "user", 5)
+    cached[0]["content"] = "changed again"
+    assert cache.get("vacation", "user", 5) == USER_RESULTS
@@ -0,0 +1,41 @@
+from semantic_cache import SemanticCache
+
+USER_RESULTS = [{"content": "Vacation policy", "access_level": "user", "score": 0.9}]
+ADMIN_RESULTS = [{"content": "Salary bands", "access_level": "admin", "score": 0.8}]
+VECTOR = [1.0, 0.0, 0.0, 0.0]
+PARAPHRASE = [0.99, 0.05, 0.0, 0.0]
+UNRELATED = [0.0, 1.0, 0.0, 0.0]
+
+
+def test_admin_entries_are_never_served_to_users():
+    cache = SemanticCache(threshold=0.9)
+    cache.put(VECTOR, "salary bands", "admin", 5, ADMIN_RESULTS, cache.generation, 0.01)
+    assert cache.lookup(PARAPHRASE, "admin", 5)["results"] == ADMIN_RESULTS
+    assert cache.lookup(VECTOR, "user", 5) is None
+    assert cache.lookup(PARAPHRASE, "USER", 5) is None
+
+
+def test_threshold_separates_paraphrases_from_other_queries():
+    cache = SemanticCache(threshold=0.9)
+    cache.put(VECTOR, "vacation days", "user", 5, USER_RESULTS, cache.generation, 0.01)
+    hit = cache.lookup(PARAPHRASE, "user", 5)
+    assert hit["query"] == "vacation days" and hit["similarity"] >= 0.9
+    assert cache.lookup(UNRELATED, "user", 5) is None
+
+
+def test_bump_generation_drops_results():
+    cache = SemanticCache(threshold=0.9)
+    cache.put(VECTOR, "vacation days", "user", 5, USER_RESULTS, cache.generation, 0.01)
+    assert cache.lookup(VECTOR, "user", 5) is not None
+    cache.bump_generation()
+    assert cache.lookup(VECTOR, "user", 5) is None
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_put_with_stale_generation_is_a_no_op():
+    cache = SemanticCache(threshold=0.9)
+    generation = cache.generation
+    cache.bump_generation()
+    cache.put(VECTOR, "vacation days", "user", 5, USER_RESULTS, generation, 0.01)
+    assert cache.lookup(VECTOR, "user", 5) is None
+    assert cache.get_stats()["entries"] == 0
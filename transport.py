@@ -0,0 +1,78 @@
+"""
+Transport settings for the vector database clients.
+
+Qdrant serves REST on 6333 and gRPC on 6334; with protocol="grpc" the client
+sends points/search calls over gRPC (prefer_grpc). Weaviate's v4 client always
+opens both ports and its query API runs over gRPC; protocol="rest" makes
+SimpleRAGSystem send its searches as GraphQL over HTTP instead.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+
+import httpx
+import weaviate
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from weaviate.config import AdditionalConfig, ConnectionConfig, Timeout
+
+PROTOCOLS = ("rest", "grpc")
+
+
+@dataclass
+class TransportConfig:
+    """How a backend client talks to its server; ports left as None use the backend's defaults"""
+    protocol: Optional[str] = None
+    host: str = "localhost"
+    http_port: Optional[int] = None
+    grpc_port: Optional[int] = None
+    timeout: float = 30.0
+    pool_size: int = 16
+    grpc_options: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.protocol is not None and self.protocol not in PROTOCOLS:
+            raise ValueError(f"protocol must be one of {PROTOCOLS}, got {self.protocol!r}")
+
+    def describe(self, default_protocol: str) -> str:
+        """Short label such as 'grpc, timeout 30s, pool 16'"""
+        return f"{self.protocol or default_protocol}, timeout {self.timeout:g}s, pool {self.pool_size}"
+
+
+def qdrant_client_from_config(config: Optional[TransportConfig] = None, async_client: bool = False):
+    """QdrantClient (or AsyncQdrantClient) for a transport; REST unless protocol='grpc'"""
+    config = config or TransportConfig()
+    client_class = AsyncQdrantClient if async_client else QdrantClient
+    return client_class(
+        host=config.host,
+        port=config.http_port or 6333,
+        grpc_port=config.grpc_port or 6334,
+        prefer_grpc=config.protocol == "grpc",
+        timeout=int(max(1, round(config.timeout))),
+        grpc_options=config.grpc_options or None,
+        # Keep-alive pool for the REST transport (the default client keeps no idle connections)
+        limits=httpx.Limits(max_connections=config.pool_size, max_keepalive_connections=config.pool_size)
+    )
+
+
+def weaviate_additional_config(config: TransportConfig) -> AdditionalConfig:
+    """Timeouts and HTTP pool sizes for the Weaviate v4 client"""
+    return AdditionalConfig(
+        timeout=Timeout(query=config.timeout, insert=max(config.timeout, 90), init=min(config.timeout, 10)),
+        connection=ConnectionConfig(
+            session_pool_connections=config.pool_size,
+            session_pool_maxsize=config.pool_size
+        )
+    )
+
+
+def weaviate_client_from_config(config: Optional[TransportConfig] = None, async_client: bool = False):
+    """Weaviate v4 client for a transport (connected, unless async_client)"""
+    config = config or TransportConfig()
+    connect = weaviate.use_async_with_local if async_client else weaviate.connect_to_local
+    return connect(
+        host=config.host,
+        port=config.http_port or 8080,
+        grpc_port=config.grpc_port or 50051,
+        additional_config=weaviate_additional_config(config),
+        skip_init_checks=True
+    )